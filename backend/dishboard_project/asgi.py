@@ -1,6 +1,6 @@
 import os
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dishboard_project.settings.production')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dishboard_project.settings')
 
 application = get_asgi_application()
\ No newline at end of file
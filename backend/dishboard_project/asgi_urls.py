@@ -0,0 +1,10 @@
+from django.contrib import admin
+from django.urls import path, include
+
+from record_app.urls import asgi_urlpatterns
+
+# SERVER_MODE=asgi のときのURL設定（検索・食堂メニュー一覧が非同期Viewになる）
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('api/', include(asgi_urlpatterns)),
+]
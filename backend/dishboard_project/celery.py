@@ -1,6 +1,7 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 # Django設定モジュールを指定
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dishboard_project.settings')
@@ -10,6 +11,14 @@ app = Celery('dishboard_project')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
+
+@worker_process_init.connect
+def reset_db_pools(**kwargs):
+    """preforkの子プロセスでは親のコネクションプールを使わず、子プロセスごとに作る"""
+    from record_app.db_pool import reset_inherited_pools
+    reset_inherited_pools()
+
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
\ No newline at end of file
@@ -18,12 +18,102 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Tokyo'
 
 CELERY_BEAT_SCHEDULE = {
-    'update-cafeteria-menus-weekly': {
+    # 詳細ページは条件付きリクエストで取得するため、毎日実行しても変更分しかパースしない
+    'update-cafeteria-menus-daily': {
         'task': 'record_app.tasks.update_cafeteria_menus_task',
-        'schedule': crontab(hour=8, minute=0, day_of_week='monday'),
+        'schedule': crontab(hour=8, minute=0),
+    },
+    'prune-deleted-records-daily': {
+        'task': 'record_app.tasks.prune_deleted_records_task',
+        'schedule': crontab(hour=4, minute=0),
+    },
+}
+
+# サーバーの実行方式（'wsgi': gunicorn gthread / 'asgi': gunicorn + uvicornワーカー）
+# asgi では検索・食堂メニュー一覧を非同期Viewで処理する（gunicorn.conf.py・asgi_urls.py を参照）
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+
+# Cache
+# Celeryと同じRedisを全プロセス共有のキャッシュとして使う（未指定ならブローカーと同じ）
+REDIS_URL = os.getenv('REDIS_URL', CELERY_BROKER_URL)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'dishboard',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            # Redisが応答しない場合にリクエストを長く止めない
+            'socket_connect_timeout': 2,
+            'socket_timeout': 2,
+        },
     },
 }
 
+# Database connections
+# PROCESS_TYPE: 'web'（gunicorn）または 'celery'（worker / beat）。プールの大きさの既定値を決める
+# DB_POOL_MODE:
+#   'pool'       Django標準のpsycopgコネクションプール（プロセスごと）。既定
+#   'pgbouncer'  PgBouncer（transactionモード）経由。サーバー側カーソル・プリペアドステートメントを使わない
+#   'persistent' プールなしでスレッドごとに接続を保持（CONN_MAX_AGE）
+PROCESS_TYPE = os.getenv('PROCESS_TYPE', 'web')
+DB_POOL_MODES = ('pool', 'pgbouncer', 'persistent')
+
+# プロセスの種類ごとのプールの (最小, 最大) 接続数
+# web は gthread のスレッド数、celery は prefork の子プロセスごと（1タスクずつ処理）に合わせる
+DB_POOL_SIZES = {
+    'web': (2, int(os.getenv('GUNICORN_THREADS', 4))),
+    'celery': (1, 2),
+}
+
+
+def postgres_database(**connection):
+    """
+    環境変数に従ってPostgreSQLの接続設定（DATABASES['default']）を作成
+
+    Args:
+        connection: NAME, USER, PASSWORD, HOST, PORT
+    """
+    from django.core.exceptions import ImproperlyConfigured
+
+    mode = os.getenv('DB_POOL_MODE', 'pool')
+    if mode not in DB_POOL_MODES:
+        raise ImproperlyConfigured(f'DB_POOL_MODE は {DB_POOL_MODES} のいずれかです: {mode}')
+    if PROCESS_TYPE not in DB_POOL_SIZES:
+        raise ImproperlyConfigured(f'PROCESS_TYPE は {tuple(DB_POOL_SIZES)} のいずれかです: {PROCESS_TYPE}')
+
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        **connection,
+        # プールから貸し出す前・持続接続を再利用する前に、接続が生きているか確認する
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 10)),
+        },
+    }
+
+    if mode == 'pool':
+        min_size, max_size = DB_POOL_SIZES[PROCESS_TYPE]
+        # プールが接続を管理するため、CONN_MAX_AGE は 0 にする（Djangoの要件）
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', min_size)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', max_size)),
+            # 接続が空くまで待つ時間（秒）。超えるとリクエストはエラーになる
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+            'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+        }
+    else:
+        database['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 600))
+        if mode == 'pgbouncer':
+            # transactionモードでは同じサーバー接続を使い続けられない
+            database['DISABLE_SERVER_SIDE_CURSORS'] = True
+            database['OPTIONS']['prepare_threshold'] = None
+
+    return database
+
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -40,8 +130,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # 他のミドルウェアを含めた処理時間を計測するため先頭に置く
+    'record_app.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoiseMiddleware の非同期対応版（ASGIでチェーン全体を非同期のまま処理するため）
+    'record_app.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,7 +144,14 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'dishboard_project.urls'
+# 性能計測（record_app.middleware.PerformanceMiddleware）
+# この時間（ミリ秒）を超えたリクエストはクエリのフィンガープリントとともにログに記録する
+PERFORMANCE_SLOW_REQUEST_MS = int(os.getenv('PERFORMANCE_SLOW_REQUEST_MS', 500))
+# /api/metrics/ の取得用トークン（Authorization: Bearer <token>、未設定ならスタッフユーザーのみ）
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# URL設定はリクエストごとに読まれるため、実行方式に応じて切り替える
+ROOT_URLCONF = 'dishboard_project.asgi_urls' if SERVER_MODE == 'asgi' else 'dishboard_project.urls'
 
 TEMPLATES = [
     {
@@ -105,7 +205,8 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # トークン→ユーザーの解決をキャッシュし、認証ごとのDBアクセスを省く
+        'record_app.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -116,6 +217,22 @@ REST_FRAMEWORK = {
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Logging
+# 書き込みはキュー経由で別スレッドが行う（record_app/log_handlers.py）。レベルは環境変数で変える
+def log_level(name, default):
+    import logging
+    from django.core.exceptions import ImproperlyConfigured
+    level = os.getenv(name, default).upper()
+    if not isinstance(logging.getLevelName(level), int):
+        raise ImproperlyConfigured(f'{name} はログレベル（DEBUG / INFO / WARNING / ERROR）で指定してください: {level}')
+    return level
+
+
+LOG_LEVEL = log_level('LOG_LEVEL', 'INFO')
+# record_app のレベル（DEBUGにすると1件ごとのデバッグログも出る）
+APP_LOG_LEVEL = log_level('APP_LOG_LEVEL', LOG_LEVEL)
+# DEBUGのログを出力する割合（0〜1）。APP_LOG_LEVEL=DEBUG の本番調査で量を抑える
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -125,6 +242,12 @@ LOGGING = {
             'style': '{',
         },
     },
+    'filters': {
+        'debug_sample': {
+            '()': 'record_app.log_handlers.DebugSampleFilter',
+            'rate': LOG_DEBUG_SAMPLE_RATE,
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
@@ -132,26 +255,32 @@ LOGGING = {
         },
         'file': {
             'class': 'logging.handlers.RotatingFileHandler',
-            'filename': os.path.join(BASE_DIR, 'logs', 'django.log'),
+            'filename': os.getenv('LOG_FILE', os.path.join(BASE_DIR, 'logs', 'django.log')),
             'maxBytes': 1024 * 1024 * 10,  # 10MB
             'backupCount': 5,
             'formatter': 'verbose',
         },
+        # console・file より後に作られるよう、名前の順序に注意（dictConfigは名前順に作る）
+        'queue': {
+            'class': 'record_app.log_handlers.QueueListenerHandler',
+            'handlers': ['cfg://handlers.console', 'cfg://handlers.file'],
+            'filters': ['debug_sample'],
+        },
     },
     'root': {
-        'handlers': ['console', 'file'],
-        'level': 'INFO',
+        'handlers': ['queue'],
+        'level': LOG_LEVEL,
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file'],
-            'level': 'INFO',
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
             'propagate': False,
         },
         'record_app': {
-            'handlers': ['console', 'file'],
-            'level': 'DEBUG',
+            'handlers': ['queue'],
+            'level': APP_LOG_LEVEL,
             'propagate': False,
         },
     },
-}
\ No newline at end of file
+}
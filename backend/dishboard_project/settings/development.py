@@ -35,14 +35,13 @@ def resolve_db_host(preferred_host):
 if POSTGRES_DB:
     db_host = resolve_db_host(DB_HOST)
     DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.postgresql',
-            'NAME': POSTGRES_DB,
-            'USER': POSTGRES_USER or '',
-            'PASSWORD': POSTGRES_PASSWORD or '',
-            'HOST': db_host,
-            'PORT': DB_PORT,
-        }
+        'default': postgres_database(
+            NAME=POSTGRES_DB,
+            USER=POSTGRES_USER or '',
+            PASSWORD=POSTGRES_PASSWORD or '',
+            HOST=db_host,
+            PORT=DB_PORT,
+        )
     }
 else:
     DATABASES = {
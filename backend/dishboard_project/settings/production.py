@@ -34,18 +34,13 @@ def resolve_db_host(preferred_host):
 if POSTGRES_DB:
     db_host = resolve_db_host(DB_HOST)
     DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.postgresql',
-            'NAME': POSTGRES_DB,
-            'USER': POSTGRES_USER or '',
-            'PASSWORD': POSTGRES_PASSWORD or '',
-            'HOST': db_host,
-            'PORT': DB_PORT,
-            'CONN_MAX_AGE': 600,
-            'OPTIONS': {
-                'connect_timeout': 10,
-            }
-        }
+        'default': postgres_database(
+            NAME=POSTGRES_DB,
+            USER=POSTGRES_USER or '',
+            PASSWORD=POSTGRES_PASSWORD or '',
+            HOST=db_host,
+            PORT=DB_PORT,
+        )
     }
 else:
     raise Exception('PostgreSQLの設定が必須です')
@@ -0,0 +1,28 @@
+"""
+gunicorn設定（本番）
+
+SERVER_MODE=wsgi（既定）: WSGIアプリをgthreadワーカーで動かす
+SERVER_MODE=asgi       : ASGIアプリをuvicornワーカーで動かす。OCRジョブのロングポーリング・
+                         検索・食堂メニュー一覧は非同期Viewになり、待ち時間にワーカーを占有しない
+
+比較は manage.py load_test で行う。
+"""
+import multiprocessing
+import os
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 3)))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'dishboard_project.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'dishboard_project.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+accesslog = '-'
+errorlog = '-'
@@ -10,6 +10,8 @@ class RecordAppConfig(AppConfig):
         初回起動時に食堂メニューが存在しない場合、非同期で取得処理を開始する
         runserver時のみ実行
         """
+        from . import signals  # noqa: F401
+
         if os.environ.get('RUN_MAIN'):
             from .models import CafeteriaMenu
             from .tasks import update_cafeteria_menus_task
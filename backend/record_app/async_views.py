@@ -0,0 +1,224 @@
+"""
+I/O待ちの長いエンドポイントの非同期View
+
+ASGI（uvicornワーカー）で動かすと、OCRジョブのロングポーリングや検索の待ち時間に
+スレッドを占有しない（ミドルウェアもすべて非同期対応のため、チェーン全体が非同期のまま
+処理される）。DRFのViewは同期のみのため、認証・レスポンスの生成は
+ここで最小限に行う（認証はCachedTokenAuthenticationの非同期版を使う）。
+
+WSGIで動かす場合、OCRジョブの状態取得は待機せずにすぐ返す（ロングポーリングすると
+待機中はワーカーのスレッドを占有するため）。
+"""
+import asyncio
+import logging
+import math
+import uuid
+from functools import wraps
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+
+from .authentication import CachedTokenAuthentication
+from .business_logic.nutrition_calculator import NutritionCalculatorService
+from .cache import CacheNamespace, build_key
+from .services import CafeteriaMenuListService
+from .tasks import process_nutrition_label_task
+from .views import format_ocr_result, ocr_debug_requested, validate_ocr_image
+
+logger = logging.getLogger(__name__)
+
+# OCRジョブの所有者の保持時間（秒）と、ロングポーリングの最大待ち時間・確認間隔（秒）
+OCR_JOB_TTL = 60 * 60
+OCR_MAX_WAIT = 30
+OCR_POLL_INTERVAL = 0.5
+OCR_JOB_CACHE = CacheNamespace('ocr_job', timeout=OCR_JOB_TTL)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+async def _authenticate(request):
+    """
+    トークン認証（GETのみセッション認証も可）
+
+    Returns:
+        User | None: 認証できなければNone
+    """
+    try:
+        credentials = await CachedTokenAuthentication().aauthenticate(request)
+    except exceptions.AuthenticationFailed:
+        return None
+    if credentials is not None:
+        return credentials[0]
+    # CSRF検証を行わないため、セッション認証は安全なメソッドに限る
+    if request.method in SAFE_METHODS and hasattr(request, 'auser'):
+        user = await request.auser()
+        if user.is_authenticated:
+            return user
+    return None
+
+
+def async_api_view(methods):
+    """
+    認証必須の非同期Viewにするデコレータ（@api_view + IsAuthenticated 相当）
+
+    未認証は401、許可していないメソッドは405を返す。
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return _json_response(
+                    {'detail': f'メソッド "{request.method}" は許可されていません。'}, status=405
+                )
+            user = await _authenticate(request)
+            if user is None:
+                response = _json_response({'detail': '認証情報が含まれていません。'}, status=401)
+                response['WWW-Authenticate'] = 'Token'
+                return response
+            request.user = user
+            return await view(request, *args, **kwargs)
+        return csrf_exempt(wrapper)
+    return decorator
+
+
+# =============================================================================
+# 食品検索・食堂メニュー
+# =============================================================================
+
+@async_api_view(['GET'])
+async def search_foods(request):
+    """データベースから食品を検索（views.search_foods の非同期版）"""
+    query = request.GET.get('q', '')
+    if not query:
+        return _json_response({'error': '検索キーワードが必要です'}, status=400)
+
+    if len(query) < 2:
+        return _json_response({'foods': []})
+
+    results = await NutritionCalculatorService().asearch_foods(query)
+    return _json_response({'foods': results})
+
+
+@async_api_view(['GET'])
+async def list_cafeteria_menus(request):
+    """食堂メニュー一覧を取得（views.list_cafeteria_menus の非同期版）"""
+    category = request.GET.get('category') or None
+    cafeteria = request.GET.get('cafeteria')
+    cafeteria_id = None
+    if cafeteria:
+        if not cafeteria.isdigit():
+            return _json_response({'error': 'cafeteria は食堂IDで指定してください'}, status=400)
+        cafeteria_id = int(cafeteria)
+
+    payload = await CafeteriaMenuListService.aget_payload(cafeteria_id, category)
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and payload['etag'] in parse_etags(if_none_match):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(payload['body'], content_type='application/json')
+    response['ETag'] = payload['etag']
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# =============================================================================
+# OCRジョブ
+# =============================================================================
+
+def _save_upload(image_file):
+    """アップロード画像をワーカーと共有するメディアディレクトリに保存"""
+    upload_dir = Path(settings.MEDIA_ROOT) / 'ocr_uploads'
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    path = upload_dir / f'{uuid.uuid4().hex}{Path(image_file.name).suffix or ".jpg"}'
+    with open(path, 'wb') as f:
+        for chunk in image_file.chunks():
+            f.write(chunk)
+    return str(path)
+
+
+def _job_key(job_id):
+    return build_key(OCR_JOB_CACHE.name, job_id)
+
+
+@async_api_view(['POST'])
+async def submit_ocr_job(request):
+    """
+    栄養成分表示のOCRジョブを登録
+
+    OCRはCeleryワーカーで実行し、すぐに 202 とジョブIDを返す。
+    結果は GET /api/ocr/jobs/<job_id>/ で取得する。
+
+    Request:
+        POST /api/ocr/jobs/
+        Content-Type: multipart/form-data
+
+        image: 栄養成分表示の画像ファイル (JPEG/PNG/WebP, 10MB以下)
+
+    スタッフユーザーは ?debug=true で結果に段階ごとの所要時間（timings）を含められる。
+    """
+    image_file, error = validate_ocr_image(request.FILES)
+    if error:
+        return _json_response({'error': error, 'success': False}, status=400)
+
+    path = await sync_to_async(_save_upload, thread_sensitive=False)(image_file)
+    result = await sync_to_async(process_nutrition_label_task.delay, thread_sensitive=False)(
+        path, debug=ocr_debug_requested(request)
+    )
+    await OCR_JOB_CACHE.aset(_job_key(result.id), request.user.pk)
+    logger.info("OCRジョブ登録: job_id=%s user=%s", result.id, request.user.pk)
+    return _json_response({'job_id': result.id, 'status': 'pending'}, status=202)
+
+
+@async_api_view(['GET'])
+async def ocr_job_status(request, job_id):
+    """
+    OCRジョブの状態・結果を取得（ロングポーリング）
+
+    wait（秒、最大30）を指定すると、完了するまでその時間だけ待ってから返す。
+    待機中はイベントループに制御を返すため、スレッドを占有しない。
+    WSGI（SERVER_MODE が 'asgi' 以外）では wait を無視して待機しない。
+
+    Request:
+        GET /api/ocr/jobs/<job_id>/?wait=20
+
+    Response:
+        {'job_id', 'status': 'pending'} または {'job_id', 'status': 'done', 'success', 'nutrition', ...}
+    """
+    if await OCR_JOB_CACHE.aget(_job_key(job_id)) != request.user.pk:
+        return _json_response({'error': 'ジョブが見つかりません'}, status=404)
+
+    try:
+        wait = float(request.GET.get('wait', 0))
+    except ValueError:
+        wait = math.nan
+    # nan は min/max をすり抜けて待機が終わらなくなるため、有限の数値以外は受け付けない
+    if not math.isfinite(wait):
+        return _json_response({'error': 'wait は秒数で指定してください'}, status=400)
+    wait = min(max(wait, 0), OCR_MAX_WAIT)
+    if settings.SERVER_MODE != 'asgi':
+        wait = 0
+
+    async_result = process_nutrition_label_task.AsyncResult(job_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while not await sync_to_async(async_result.ready, thread_sensitive=False)():
+        if loop.time() >= deadline:
+            return _json_response({'job_id': job_id, 'status': 'pending'})
+        await asyncio.sleep(OCR_POLL_INTERVAL)
+
+    result = await sync_to_async(async_result.get, thread_sensitive=False)(propagate=False)
+    if not isinstance(result, dict):
+        # タスク自体が例外で終了した場合
+        result = {'success': False, 'error': str(result), 'nutrition': None}
+    return _json_response({'job_id': job_id, 'status': 'done', **format_ocr_result(result)})
@@ -0,0 +1,134 @@
+"""
+API認証
+"""
+import hashlib
+import logging
+import pickle
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+from .cache import CacheNamespace, LocalLRUCache, build_key
+
+logger = logging.getLogger(__name__)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    トークン→ユーザーの解決結果をキャッシュするTokenAuthentication
+
+    標準のTokenAuthenticationはリクエストごとにToken・Userを結合して取得する。
+    ここではプロセス内のLRU（短いTTL）と共有キャッシュ（Redis）の2段で
+    (ユーザー, トークン) を保持し、ヒットした場合はDBに問い合わせない。
+
+    ログアウト・トークンの作り直し・ユーザーの更新や削除の際はシグナルから
+    invalidate() を呼び、両方のキャッシュから削除する。他のプロセスのLRUには
+    削除が伝わらないため、LOCAL_TTL秒までは古い結果が使われうる。
+
+    共有キャッシュ（Redis）に接続できない場合は、キャッシュなしでDBから解決する
+    （削除できなかった共有キャッシュの結果は SHARED_TIMEOUT 秒で切れる）。
+    """
+
+    LOCAL_TTL = 10
+    LOCAL_MAX_SIZE = 1024
+    SHARED_TIMEOUT = 300
+
+    shared_cache = CacheNamespace('auth_token', timeout=SHARED_TIMEOUT)
+    local_cache = LocalLRUCache(max_size=LOCAL_MAX_SIZE, ttl=LOCAL_TTL)
+
+    def authenticate_credentials(self, key):
+        cache_key = self.cache_key(key)
+
+        # リクエスト間で同じインスタンスを共有しないよう、プロセス内ではpickleで保持する
+        pickled = self.local_cache.get(cache_key)
+        if pickled is not None:
+            return pickle.loads(pickled)
+
+        credentials = self._shared_get(cache_key)
+        if credentials is None:
+            # 無効なトークン・無効化されたユーザーはここで AuthenticationFailed になる
+            credentials = super().authenticate_credentials(key)
+            self._shared_set(cache_key, credentials)
+        self.local_cache.set(cache_key, pickle.dumps(credentials))
+        return credentials
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() の非同期版（非同期Viewから使う）
+
+        キャッシュにない場合は非同期ORMでトークンを取得する。
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        if len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. Token string should not contain invalid characters.')
+            )
+
+        cache_key = self.cache_key(key)
+        pickled = self.local_cache.get(cache_key)
+        if pickled is not None:
+            return pickle.loads(pickled)
+
+        credentials = await self._ashared_get(cache_key)
+        if credentials is None:
+            model = self.get_model()
+            try:
+                token = await model.objects.select_related('user').aget(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+            credentials = (token.user, token)
+            await self._ashared_set(cache_key, credentials)
+        self.local_cache.set(cache_key, pickle.dumps(credentials))
+        return credentials
+
+    def _shared_get(self, cache_key):
+        try:
+            return self.shared_cache.get(cache_key)
+        except Exception as e:
+            logger.warning("認証キャッシュを参照できないためDBで認証します: %s", e)
+            return None
+
+    def _shared_set(self, cache_key, credentials):
+        try:
+            self.shared_cache.set(cache_key, credentials)
+        except Exception as e:
+            logger.warning("認証キャッシュに保存できません: %s", e)
+
+    async def _ashared_get(self, cache_key):
+        try:
+            return await self.shared_cache.aget(cache_key)
+        except Exception as e:
+            logger.warning("認証キャッシュを参照できないためDBで認証します: %s", e)
+            return None
+
+    async def _ashared_set(self, cache_key, credentials):
+        try:
+            await self.shared_cache.aset(cache_key, credentials)
+        except Exception as e:
+            logger.warning("認証キャッシュに保存できません: %s", e)
+
+    @classmethod
+    def invalidate(cls, key):
+        """トークンのキャッシュを削除"""
+        cache_key = cls.cache_key(key)
+        cls.local_cache.delete(cache_key)
+        try:
+            cls.shared_cache.delete(cache_key)
+        except Exception as e:
+            logger.warning("認証キャッシュから削除できません: %s", e)
+
+    @classmethod
+    def cache_key(cls, key):
+        # トークンそのものはキャッシュのキーに含めない
+        return build_key(cls.shared_cache.name, hashlib.sha256(key.encode('utf-8')).hexdigest()[:32])
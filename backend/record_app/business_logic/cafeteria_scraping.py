@@ -1,14 +1,214 @@
+import logging
 import requests
-from bs4 import BeautifulSoup
-import re
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+import hashlib
+import math
+import threading
 import time
-from ..models import CafeteriaMenu
+from ..cache import CacheNamespace, build_key
+from ..models import Cafeteria, CafeteriaMenu, CafeteriaMenuDetailCache, CafeteriaMenuHistory
+from ..services import CafeteriaMenuListService
+from .html_parsing import parse_menu_list, parse_nutrition
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapingError(Exception):
+    """メニュー取得の失敗"""
+
+
+class RateLimiter:
+    """
+    スレッド間で共有するリクエスト間隔の制御
+
+    固定のsleepではなく、全スレッド合計で毎秒 rate 回を超えないよう
+    各リクエストの発行時刻を予約する。
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        """次のリクエスト枠まで待機"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class SharedRateLimiter:
+    """
+    プロセス間（Celeryワーカー間）で共有するホストごとのリクエスト間隔の制御
+
+    時刻を 1/rate 秒ごとの枠に区切り、共有キャッシュ（Redis）の add（SET NX）で枠を取り合う。
+    枠を取れたリクエストだけを送るため、食堂ごとのタスクを並行に実行しても、
+    同じホストへのリクエストは全体でおよそ毎秒 rate 回に収まる。
+    プロセス内のスレッドは先に RateLimiter で間隔を空け、キャッシュへの問い合わせを減らす。
+    共有キャッシュに接続できない場合はプロセス内の制限だけで送る。
+    """
+
+    KEY_PREFIX = 'scrape_rate'
+
+    def __init__(self, host, rate):
+        self.host = host
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.local = RateLimiter(rate)
+        # 枠のキーは過ぎれば不要（キャッシュのTTLは秒単位）
+        self._key_timeout = max(1, math.ceil(self.interval * 2))
+
+    def wait(self):
+        """このホストへの次のリクエスト枠まで待機"""
+        if not self.interval:
+            return
+        self.local.wait()
+        while True:
+            # 枠は全プロセスで共通の壁時計で区切る
+            now = time.time()
+            slot = int(now / self.interval)
+            try:
+                if cache.add(build_key(self.KEY_PREFIX, self.host, slot), 1, timeout=self._key_timeout):
+                    return
+            except Exception as e:
+                logger.warning("共有のレート制限を使えないため、プロセス内の制限のみで取得します: %s", e)
+                return
+            time.sleep(max(0.0, (slot + 1) * self.interval - now))
+
+
+class RateLimitedRetry(Retry):
+    """再試行のリクエストもレート制限に従わせるurllib3のRetry（バックオフの後に枠を待つ）"""
+
+    def __init__(self, *args, rate_limiter=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter
+
+    def new(self, **kw):
+        kw.setdefault('rate_limiter', self.rate_limiter)
+        return super().new(**kw)
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait()
+
+
+class ScrapeMetrics:
+    """
+    スクレイピング1回分の計測値
+
+    フェーズ（カテゴリー/詳細の取得・パース、DB書き込み）ごとの所要時間と、
+    リクエスト数・転送バイト数・エラー数を集計する。取得とパースはワーカースレッドで
+    並行に行うため、その時間はスレッド合計になる。
+    """
+
+    TIMINGS = ('category_fetch', 'category_parse', 'detail_fetch', 'detail_parse', 'db_write')
+    COUNTERS = (
+        'category_requests', 'category_bytes', 'category_errors',
+        'detail_requests', 'detail_bytes', 'detail_errors',
+        # 304で返った件数 / 200だが内容が前回と同じだった件数 / チェックポイントから再利用した件数
+        'detail_not_modified', 'detail_unchanged', 'detail_checkpoint_hits',
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.elapsed = 0.0
+        self.timings = dict.fromkeys(self.TIMINGS, 0.0)
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+
+    @contextmanager
+    def timer(self, name):
+        """with ブロックの所要時間を name に加算"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.timings[name] += elapsed
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def finish(self):
+        """開始からの経過時間を確定"""
+        self.elapsed = time.perf_counter() - self._start
+
+    def as_dict(self):
+        """
+        計測値をdictで返す（時間はミリ秒）
+
+        Returns:
+            dict: elapsed_ms、timings_ms（フェーズごと）と各カウンター
+        """
+        return {
+            'elapsed_ms': round(self.elapsed * 1000, 1),
+            'timings_ms': {name: round(value * 1000, 1) for name, value in self.timings.items()},
+            **self.counters,
+        }
+
+    @classmethod
+    def combine(cls, metrics_dicts):
+        """
+        複数食堂の as_dict() を合算
+
+        食堂ごとのタスクは並列に動くため、elapsed_ms は最大値、それ以外は合計とする。
+        """
+        combined = {
+            'elapsed_ms': 0.0,
+            'timings_ms': dict.fromkeys(cls.TIMINGS, 0.0),
+            **dict.fromkeys(cls.COUNTERS, 0),
+        }
+        for metrics in metrics_dicts:
+            combined['elapsed_ms'] = max(combined['elapsed_ms'], metrics['elapsed_ms'])
+            for name in cls.TIMINGS:
+                combined['timings_ms'][name] = round(
+                    combined['timings_ms'][name] + metrics['timings_ms'][name], 1
+                )
+            for name in cls.COUNTERS:
+                combined[name] += metrics[name]
+        return combined
+
+    def __str__(self):
+        values = {'elapsed_ms': round(self.elapsed * 1000, 1)}
+        values.update({f'{name}_ms': round(value * 1000, 1) for name, value in self.timings.items()})
+        values.update(self.counters)
+        return ' '.join(f'{name}={value}' for name, value in values.items())
+
 
 class CafeteriaScraper:
     """食堂メニュースクレイピング"""
     
-    BASE_URL = 'https://west2-univ.jp/sp/menu.php?t=650118'
+    # 同時接続数とサイト全体へのリクエスト上限（回/秒、全食堂・全ワーカーの合計）
+    MAX_WORKERS = 8
+    REQUESTS_PER_SECOND = 4.0
+    
+    # 1リクエストのタイムアウト（秒）と、失敗時の再試行回数・バックオフ係数（0.5, 1, 2秒…）
+    TIMEOUT = 10
+    MAX_RETRIES = 3
+    RETRY_BACKOFF = 0.5
+    
+    # 取得済みの詳細をチェックポイントに保存する間隔（件）と保持時間（秒）
+    CHECKPOINT_INTERVAL = 20
+    CHECKPOINT_TTL = 6 * 60 * 60
+    CHECKPOINT_CACHE = CacheNamespace('cafeteria_scrape_checkpoint', timeout=CHECKPOINT_TTL)
+    
+    # {site_id} には Cafeteria.site_id（URLの t パラメータ）が入る
+    BASE_URL = 'https://west2-univ.jp/sp/menu.php?t={site_id}'
     MENU_LOAD_URL = 'https://west2-univ.jp/sp/menu_load.php'
+    DETAIL_URL = 'https://west2-univ.jp/sp/detail.php?t={site_id}&c={menu_id}'
     
     # データベースのカテゴリー値のマッピング
     CATEGORY_MAP = {
@@ -23,9 +223,29 @@ class CafeteriaScraper:
         'on_bunrui4': 'night',
     }
     
-    def __init__(self):
-        """セッションを初期化"""
+    def __init__(self, cafeteria=None, max_workers=None, requests_per_second=None):
+        """
+        セッションを初期化
+        
+        Args:
+            cafeteria: 対象の食堂（省略時は既定の食堂）
+        """
+        self.cafeteria = cafeteria or Cafeteria.get_default()
+        self.max_workers = max_workers or self.MAX_WORKERS
+        # 食堂ごとのタスクは同じホストに並行して送るため、上限はホスト単位で共有する
+        self.rate_limiter = SharedRateLimiter(
+            urlsplit(self.MENU_LOAD_URL).hostname,
+            self.REQUESTS_PER_SECOND if requests_per_second is None else requests_per_second
+        )
+        self.metrics = ScrapeMetrics()
         self.session = requests.Session()
+        # ワーカースレッド数分のコネクションをkeep-aliveで使い回し、
+        # 一時的なエラーは指数バックオフで再試行する
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.max_workers, max_retries=self._build_retry()
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -33,194 +253,392 @@ class CafeteriaScraper:
             'Connection': 'keep-alive',
         })
     
+    def _build_retry(self):
+        """接続エラー・429・5xxを再試行するurllib3のRetry設定（再試行もレート制限に従う）"""
+        return RateLimitedRetry(
+            rate_limiter=self.rate_limiter,
+            total=self.MAX_RETRIES,
+            backoff_factor=self.RETRY_BACKOFF,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=['GET'],
+            respect_retry_after_header=True,
+        )
+    
     def fetch_and_update_menus(self):
-        """メニュー情報を取得してデータベースを更新"""
+        """
+        メニュー情報を取得してデータベースを更新
+        
+        取得に失敗したカテゴリー・詳細ページがあっても既存データを劣化させない。
+        失敗したカテゴリーのメニューは削除せず、詳細の取得に失敗したメニューは
+        前回の栄養素を使う。取得済みの詳細はチェックポイントに保存し、
+        タスクが再試行された場合は続きから取得する。
+        
+        計測値は self.metrics（ScrapeMetrics）に記録される。
+        """
+        self.metrics = ScrapeMetrics()
         try:
-            print("=== スクレイピング開始 ===")
-            menus = []
+            logger.info("スクレイピング開始: %s", self.cafeteria)
             
-            for category_id, category_code in self.CATEGORY_MAP.items():
-                print(f"\nカテゴリー処理中: {category_id} ({category_code})")
-                
-                # 各カテゴリーのメニューを動的に取得
-                category_menus = self._fetch_category_menus(category_id, category_code)
-                menus.extend(category_menus)
-                print(f"  → {len(category_menus)}件のメニューを取得")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # 1. 全カテゴリーの一覧を並行取得（失敗したカテゴリーはNone）
+                category_results = dict(zip(self.CATEGORY_MAP.values(), executor.map(
+                    lambda args: self._fetch_category_menus(*args),
+                    self.CATEGORY_MAP.items()
+                )))
+                failed_categories = {code for code, result in category_results.items() if result is None}
+                if len(failed_categories) == len(category_results):
+                    raise ScrapingError("全カテゴリーの取得に失敗しました")
+                entries = [
+                    entry for category_menus in category_results.values() if category_menus
+                    for entry in category_menus
+                ]
                 
-                # サーバーに負荷をかけないよう少し待機
-                time.sleep(0.5)
+                # 2. 詳細ページ（栄養素）を並行取得。同じメニューIDは1回だけ取得し、
+                #    前回取得時から変わっていないページはパースしない
+                menu_ids = list(dict.fromkeys(entry['menu_id'] for entry in entries))
+                details, cache_updates = self._fetch_details(executor, menu_ids)
             
-            print(f"\n=== 合計 {len(menus)}件のメニューを取得 ===")
+            with self.metrics.timer('db_write'):
+                self._save_detail_cache(cache_updates)
+                failed_details = self._fill_failed_details(details)
+            logger.info(
+                "詳細ページ: %d件中 %d件は前回から変更なし（取得失敗 %d件）",
+                len(menu_ids), len(menu_ids) - len(cache_updates), len(failed_details)
+            )
+            
+            # 詳細が取得できず、前回の値もない新規メニューは今回は登録しない
+            menus = [
+                {**entry, **details[entry['menu_id']]}
+                for entry in entries if details.get(entry['menu_id']) is not None
+            ]
             
             # データベースを更新
             if menus:
-                CafeteriaMenu.objects.all().delete()
-                CafeteriaMenu.objects.bulk_create([
-                    CafeteriaMenu(**menu) for menu in menus
-                ])
-                print("データベース更新完了")
+                with self.metrics.timer('db_write'):
+                    summary = self._save_menus(menus, failed_categories)
+                if summary['added'] or summary['changed'] or summary['removed']:
+                    # 一覧APIのエンコード済みJSONを作り直しておく
+                    cafeteria_id = self.cafeteria.id
+                    transaction.on_commit(lambda: CafeteriaMenuListService.refresh(cafeteria_id))
             else:
-                print("警告: メニューが1件も取得できませんでした")
+                # 取得失敗で既存データを消さないよう、何も書き込まない
+                logger.warning("メニューが1件も取得できませんでした: %s", self.cafeteria)
+                summary = {'total': 0, 'added': 0, 'changed': 0, 'removed': 0}
             
-            return len(menus)
+            self.CHECKPOINT_CACHE.delete(self._checkpoint_key())
+            self.metrics.finish()
+            logger.info(
+                "メニュー更新完了 [%s]: total=%d added=%d changed=%d removed=%d %s",
+                self.cafeteria.site_id, summary['total'], summary['added'], summary['changed'],
+                summary['removed'], self.metrics
+            )
+            return summary
             
         except Exception as e:
-            print(f"エラー発生: {str(e)}")
-            raise Exception(f"メニュー取得に失敗しました: {str(e)}")
+            self.metrics.finish()
+            logger.warning("メニュー取得失敗 [%s]: %s %s", self.cafeteria.site_id, e, self.metrics)
+            raise ScrapingError(f"メニュー取得に失敗しました: {str(e)}") from e
+    
+    def _fetch_details(self, executor, menu_ids):
+        """
+        詳細ページを並行取得
+        
+        チェックポイントにあるメニューは取得せず、新たに取得できた栄養素は
+        CHECKPOINT_INTERVAL件ごとにチェックポイントへ保存する。
+        
+        Returns:
+            tuple: (menu_id → 栄養素（取得失敗はNone）, 保存する詳細キャッシュのリスト)
+        """
+        checkpoint_key = self._checkpoint_key()
+        checkpoint = self.CHECKPOINT_CACHE.get(checkpoint_key) or {}
+        details = {menu_id: checkpoint[menu_id] for menu_id in menu_ids if menu_id in checkpoint}
+        pending = [menu_id for menu_id in menu_ids if menu_id not in checkpoint]
+        if details:
+            self.metrics.incr('detail_checkpoint_hits', len(details))
+            logger.info("チェックポイントから再開: %d件は取得済み", len(details))
+        
+        detail_cache = {
+            entry.menu_id: entry
+            for entry in CafeteriaMenuDetailCache.objects.filter(
+                cafeteria=self.cafeteria, menu_id__in=pending
+            )
+        }
+        results = executor.map(
+            lambda menu_id: self._fetch_nutrition_detail(menu_id, detail_cache.get(menu_id)),
+            pending
+        )
+        
+        cache_updates = []
+        for count, (menu_id, (nutrition, cache_entry)) in enumerate(zip(pending, results), 1):
+            details[menu_id] = nutrition
+            if nutrition is not None:
+                checkpoint[menu_id] = nutrition
+            elif menu_id in detail_cache:
+                # 取得に失敗したページは前回パースした栄養素を使う
+                details[menu_id] = detail_cache[menu_id].nutrition
+            if cache_entry is not None:
+                cache_updates.append(cache_entry)
+            if count % self.CHECKPOINT_INTERVAL == 0:
+                self.CHECKPOINT_CACHE.set(checkpoint_key, checkpoint)
+        
+        self.CHECKPOINT_CACHE.set(checkpoint_key, checkpoint)
+        return details, cache_updates
+    
+    def _fill_failed_details(self, details):
+        """
+        詳細キャッシュもない取得失敗メニューを、登録済みの栄養素で補う
+        
+        Returns:
+            list: 取得に失敗したメニューID
+        """
+        failed = [menu_id for menu_id, nutrition in details.items() if nutrition is None]
+        if failed:
+            fields = list(self._empty_nutrition())
+            existing = CafeteriaMenu.objects.filter(
+                cafeteria=self.cafeteria, menu_id__in=failed
+            ).values('menu_id', *fields)
+            for row in existing:
+                details[row.pop('menu_id')] = row
+        return failed
+    
+    def _checkpoint_key(self):
+        return self.CHECKPOINT_CACHE.key(self.cafeteria.id)
+    
+    @transaction.atomic
+    def _save_menus(self, menus, failed_categories=()):
+        """
+        メニューを差分でupsert（対象の食堂のメニューのみ）
+        
+        全削除→全件作成ではなく、追加・変更されたメニューのみmenu_idをキーにupsertし、
+        消えたメニューのみ削除する。提供履歴も同じトランザクションで差分を記録する。
+        1トランザクションで行うため、更新中も一覧APIが空になることはない。
+        
+        Args:
+            failed_categories: 一覧の取得に失敗したカテゴリー（削除の対象外）
+        
+        Returns:
+            dict: total / added / changed / removed の件数
+        """
+        # 複数カテゴリーに同じメニューが載っている場合は最初のものを採用
+        incoming = {}
+        for menu in menus:
+            incoming.setdefault(menu['menu_id'], menu)
+        
+        menus_qs = CafeteriaMenu.objects.filter(cafeteria=self.cafeteria)
+        existing = {menu.menu_id: menu for menu in menus_qs}
+        fields = [name for name in next(iter(incoming.values())) if name != 'menu_id']
+        
+        added = [menu_id for menu_id in incoming if menu_id not in existing]
+        changed = [
+            menu_id for menu_id, menu in incoming.items()
+            if menu_id in existing
+            and any(getattr(existing[menu_id], name) != menu[name] for name in fields)
+        ]
+        # 取得に失敗したカテゴリーのメニューは消えたとみなさない
+        removed = [
+            menu_id for menu_id, menu in existing.items()
+            if menu_id not in incoming and menu.category not in failed_categories
+        ]
+        
+        upserts = [
+            CafeteriaMenu(cafeteria=self.cafeteria, **incoming[menu_id]) for menu_id in added + changed
+        ]
+        if upserts:
+            CafeteriaMenu.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=['cafeteria', 'menu_id'],
+                update_fields=fields + ['updated_at'],
+            )
+        if removed:
+            menus_qs.filter(menu_id__in=removed).delete()
+        
+        self._record_history(incoming, added, changed, removed)
+        
+        return {
+            'total': len(incoming),
+            'added': len(added),
+            'changed': len(changed),
+            'removed': len(removed),
+        }
+    
+    def _record_history(self, incoming, added, changed, removed):
+        """
+        提供履歴に差分のみを書き込む
+        
+        追加されたメニューは提供中の行を作成し、変更されたメニューは提供中の行を
+        今日で終了して新しい行を作成、消えたメニューは提供中の行を今日で終了する。
+        今日開始した行の変更は期間が空の行を残さないよう、その行を書き換える。
+        """
+        touched = added + changed + removed
+        if not touched:
+            return
+        
+        today = timezone.localdate()
+        open_rows = {
+            row.menu_id: row
+            for row in CafeteriaMenuHistory.objects.filter(
+                cafeteria=self.cafeteria, valid_to__isnull=True, menu_id__in=touched
+            )
+        }
+        
+        to_close, to_rewrite, to_create = [], [], []
+        for menu_id in added + changed:
+            row = open_rows.get(menu_id)
+            if row is not None and row.valid_from == today:
+                for name, value in incoming[menu_id].items():
+                    setattr(row, name, value)
+                to_rewrite.append(row)
+                continue
+            if row is not None:
+                to_close.append(row.pk)
+            to_create.append(CafeteriaMenuHistory(
+                cafeteria=self.cafeteria, valid_from=today, **incoming[menu_id]
+            ))
+        to_close.extend(open_rows[menu_id].pk for menu_id in removed if menu_id in open_rows)
+        
+        if to_close:
+            CafeteriaMenuHistory.objects.filter(pk__in=to_close).update(valid_to=today)
+        if to_rewrite:
+            fields = [name for name in next(iter(incoming.values())) if name != 'menu_id']
+            CafeteriaMenuHistory.objects.bulk_update(to_rewrite, fields)
+        if to_create:
+            CafeteriaMenuHistory.objects.bulk_create(to_create)
+    
+    def _save_detail_cache(self, entries):
+        """詳細ページのキャッシュをmenu_idをキーにupsert"""
+        if not entries:
+            return
+        CafeteriaMenuDetailCache.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['cafeteria', 'menu_id'],
+            update_fields=['etag', 'last_modified', 'content_hash', 'nutrition', 'fetched_at'],
+        )
     
     def _fetch_category_menus(self, category_id, category_code):
-        """特定カテゴリーのメニューを取得"""
+        """
+        特定カテゴリーのメニューを取得（取得に失敗した場合はNone）
+        
+        一覧の読み込みマーカー（Loaded）のないページ（200で返るエラー・メンテナンスのページなど）も
+        取得失敗として扱う。Noneのカテゴリーは保存時に削除の対象外になる。
+        """
         try:
             # menu_load.phpを使用してカテゴリーのメニューを取得
             params = {
-                't': '650118',
+                't': self.cafeteria.site_id,
                 'a': category_id
             }
             
-            response = self.session.get(self.MENU_LOAD_URL, params=params, timeout=10)
+            response = self._get(self.MENU_LOAD_URL, params=params)
             response.encoding = 'utf-8'
             
             if not response.text or 'Loaded' not in response.text:
-                print(f"  警告: {category_id}のデータが空です")
-                return []
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
+                logger.warning("%sの一覧が読み込めません（前回のメニューを残します）", category_id)
+                self.metrics.incr('category_errors')
+                return None
             
-            # ulタグを探す
-            ul = soup.find('ul')
-            if not ul:
-                print(f"  警告: {category_id}にulタグが見つかりません")
+            with self.metrics.timer('category_parse'):
+                parsed = self._parse_menu_list(response.text)
+            if parsed is None:
+                logger.warning("%sにulタグが見つかりません", category_id)
                 return []
             
-            menu_items = ul.find_all('li')
-            print(f"  {len(menu_items)}個のli要素を発見")
+            logger.debug("%s (%s): %d件のメニューを発見", category_id, category_code, len(parsed))
             
-            menus = []
-            for item in menu_items:
-                menu_data = self._parse_menu_item(item, category_code)
-                if menu_data:
-                    menus.append(menu_data)
-                    print(f"    - {menu_data['name']}")
+            # 栄養素は詳細ページからまとめて並行取得する
+            menus = [{**menu, 'category': category_code} for menu in parsed]
             
             return menus
             
         except requests.exceptions.RequestException as e:
-            print(f"  エラー: {category_id}の取得に失敗 - {str(e)}")
-            return []
-    
-    def _parse_menu_item(self, item, category):
-        """個別メニュー項目をパース"""
-        link = item.find('a')
-        if not link:
-            return None
-        
-        detail_url = link.get('href', '')
-        if not detail_url:
-            return None
-        
-        # メニューIDを抽出
-        menu_id = None
-        if 'c=' in detail_url:
-            menu_id = detail_url.split('c=')[-1].split('&')[0]
-        
-        if not menu_id:
-            return None
-        
-        # メニュー名を取得
-        h3 = item.find('h3')
-        if not h3:
+            logger.warning("%sの取得に失敗: %s", category_id, e)
             return None
+    
+    def _fetch_nutrition_detail(self, menu_id, cached=None):
+        """
+        詳細ページから栄養素情報を取得
         
-        # h3の最初のテキストノードがメニュー名
-        name = h3.contents[0].strip() if h3.contents else None
-        if not name:
-            return None
+        前回のキャッシュがあれば条件付きリクエストを送り、304 Not Modified または
+        内容のハッシュが前回と同じ場合はパースせず前回の栄養素を返す。
         
-        # 詳細ページから栄養素情報を取得
-        nutrition = self._fetch_nutrition_detail(menu_id)
+        栄養素の表（ul.detail）がないページ（200で返るエラー・メンテナンスのページなど）は
+        取得失敗として扱い、キャッシュせずに前回の値を使わせる。
         
-        return {
-            'menu_id': menu_id,
-            'name': name,
-            'category': category,
-            **nutrition
-        }
-    
-    def _fetch_nutrition_detail(self, menu_id):
-        """詳細ページから栄養素情報を取得"""
+        Returns:
+            tuple: (栄養素dict。取得に失敗した場合はNone, 保存するキャッシュ。更新不要ならNone)
+        """
         try:
-            detail_url = f'https://west2-univ.jp/sp/detail.php?t=650118&c={menu_id}'
+            detail_url = self.DETAIL_URL.format(site_id=self.cafeteria.site_id, menu_id=menu_id)
             
-            response = self.session.get(detail_url, timeout=10)
-            response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
+            headers = {}
+            if cached is not None:
+                if cached.etag:
+                    headers['If-None-Match'] = cached.etag
+                if cached.last_modified:
+                    headers['If-Modified-Since'] = cached.last_modified
             
-            # ul.detailを探す
-            detail_list = soup.find('ul', class_='detail')
-            if not detail_list:
-                print(f"      警告: メニューID {menu_id} の栄養情報が見つかりません")
-                return self._empty_nutrition()
+            response = self._get(detail_url, headers=headers)
+            if cached is not None and response.status_code == 304:
+                self.metrics.incr('detail_not_modified')
+                return cached.nutrition, None
             
-            nutrition = {}
-            items = detail_list.find_all('li')
+            etag = response.headers.get('ETag', '')
+            last_modified = response.headers.get('Last-Modified', '')
+            content_hash = hashlib.sha256(response.content).hexdigest()
+            if cached is not None and content_hash == cached.content_hash:
+                self.metrics.incr('detail_unchanged')
+                if (etag, last_modified) == (cached.etag, cached.last_modified):
+                    return cached.nutrition, None
+                cached.etag, cached.last_modified = etag, last_modified
+                return cached.nutrition, cached
             
-            for li in items:
-                strong = li.find('strong')
-                if not strong:
-                    continue
-                
-                label = strong.text.strip()
-                
-                # span.priceから値を取得
-                price_span = li.find('span', class_='price')
-                if not price_span:
-                    continue
-                
-                value_text = price_span.text.strip()
-                
-                # 数値を抽出
-                try:
-                    number_match = re.search(r'([\d.]+)', value_text)
-                    if number_match:
-                        value = float(number_match.group(1))
-                    else:
-                        value = 0.0
-                except (ValueError, AttributeError):
-                    value = 0.0
-                
-                # フィールドマッピング
-                field_map = {
-                    'エネルギー': 'calories',
-                    'タンパク質': 'protein',
-                    'たんぱく質': 'protein',
-                    '脂質': 'fat',
-                    '炭水化物': 'carbohydrates',
-                    '食物繊維': 'dietary_fiber',
-                    '食塩相当量': 'sodium',
-                    'カルシウム': 'calcium',
-                    '鉄': 'iron',
-                    'ビタミン A': 'vitamin_a',
-                    'ビタミンA': 'vitamin_a',
-                    'ビタミン B1': 'vitamin_b1',
-                    'ビタミンB1': 'vitamin_b1',
-                    'ビタミン B2': 'vitamin_b2',
-                    'ビタミンB2': 'vitamin_b2',
-                    'ビタミン C': 'vitamin_c',
-                    'ビタミンC': 'vitamin_c',
-                }
-                
-                field = field_map.get(label)
-                if field:
-                    nutrition[field] = value
-            
-            # 少し待機
-            time.sleep(0.3)
+            response.encoding = 'utf-8'
+            with self.metrics.timer('detail_parse'):
+                nutrition = self._parse_nutrition(response.text)
+            if nutrition is None:
+                logger.warning("メニューID %s の栄養情報が見つかりません（前回の値を使います）", menu_id)
+                self.metrics.incr('detail_errors')
+                return None, None
             
-            return {**self._empty_nutrition(), **nutrition}
+            return nutrition, CafeteriaMenuDetailCache(
+                cafeteria=self.cafeteria,
+                menu_id=menu_id,
+                etag=etag,
+                last_modified=last_modified,
+                content_hash=content_hash,
+                nutrition=nutrition,
+            )
             
         except requests.exceptions.RequestException as e:
-            print(f"      エラー: メニューID {menu_id} の栄養素取得失敗 - {str(e)}")
-            return self._empty_nutrition()
+            logger.warning("メニューID %s の栄養素取得失敗: %s", menu_id, e)
+            return None, None
+    
+    def _parse_menu_list(self, html):
+        """カテゴリーページのHTMLからメニューIDと名前を抽出（ulがなければNone）"""
+        return parse_menu_list(html)
+    
+    def _parse_nutrition(self, html):
+        """詳細ページのHTMLから栄養素を抽出（ul.detailがなければNone）"""
+        nutrition = parse_nutrition(html)
+        if nutrition is None:
+            return None
+        return {**self._empty_nutrition(), **nutrition}
+    
+    def _get(self, url, **kwargs):
+        """レート制限に従ってGETリクエストを送信し、リクエスト数・転送量・エラー数を記録"""
+        phase = 'category' if url == self.MENU_LOAD_URL else 'detail'
+        self.rate_limiter.wait()
+        self.metrics.incr(f'{phase}_requests')
+        with self.metrics.timer(f'{phase}_fetch'):
+            try:
+                response = self.session.get(url, timeout=self.TIMEOUT, **kwargs)
+                response.raise_for_status()
+            except requests.exceptions.RequestException:
+                self.metrics.incr(f'{phase}_errors')
+                raise
+        self.metrics.incr(f'{phase}_bytes', len(response.content))
+        return response
     
     def _empty_nutrition(self):
         """空の栄養素データを返す"""
@@ -0,0 +1,124 @@
+"""
+食堂ページのHTMLパース
+
+lxmlがインストールされていればC実装のパーサーを使い、なければ標準の
+html.parserにフォールバックする。SoupStrainerで必要なul要素のみを
+木として構築し、ページ全体のパースを避ける。
+"""
+import re
+from typing import Dict, List, Optional
+from bs4 import BeautifulSoup, NavigableString, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+
+
+# カテゴリーページはメニュー一覧のul、詳細ページはul.detailのみを構築する
+MENU_LIST_STRAINER = SoupStrainer('ul')
+DETAIL_STRAINER = SoupStrainer('ul', class_='detail')
+
+# 詳細ページのラベル → CafeteriaMenuのフィールド
+NUTRITION_FIELD_MAP = {
+    'エネルギー': 'calories',
+    'タンパク質': 'protein',
+    'たんぱく質': 'protein',
+    '脂質': 'fat',
+    '炭水化物': 'carbohydrates',
+    '食物繊維': 'dietary_fiber',
+    '食塩相当量': 'sodium',
+    'カルシウム': 'calcium',
+    '鉄': 'iron',
+    'ビタミン A': 'vitamin_a',
+    'ビタミンA': 'vitamin_a',
+    'ビタミン B1': 'vitamin_b1',
+    'ビタミンB1': 'vitamin_b1',
+    'ビタミン B2': 'vitamin_b2',
+    'ビタミンB2': 'vitamin_b2',
+    'ビタミン C': 'vitamin_c',
+    'ビタミンC': 'vitamin_c',
+}
+
+NUMBER_PATTERN = re.compile(r'([\d.]+)')
+
+
+def _make_soup(html: str, parser: Optional[str], strainer: SoupStrainer, partial: bool) -> BeautifulSoup:
+    return BeautifulSoup(html, parser or DEFAULT_PARSER, parse_only=strainer if partial else None)
+
+
+def parse_menu_list(
+    html: str, parser: Optional[str] = None, partial: bool = True
+) -> Optional[List[Dict[str, str]]]:
+    """
+    カテゴリーページからメニューIDとメニュー名を抽出
+
+    Args:
+        parser: BeautifulSoupのパーサー名（省略時はDEFAULT_PARSER）
+        partial: Falseの場合はページ全体の木を構築する（ベンチマークの比較用）
+
+    Returns:
+        list: [{'menu_id': ..., 'name': ...}, ...]（ulタグがなければNone）
+    """
+    soup = _make_soup(html, parser, MENU_LIST_STRAINER, partial)
+    ul = soup.find('ul')
+    if not ul:
+        return None
+
+    menus = []
+    for li in ul.find_all('li'):
+        link = li.find('a')
+        if not link:
+            continue
+
+        detail_url = link.get('href', '')
+        if 'c=' not in detail_url:
+            continue
+        menu_id = detail_url.split('c=')[-1].split('&')[0]
+        if not menu_id:
+            continue
+
+        # h3の最初のテキストノードがメニュー名
+        h3 = li.find('h3')
+        if not h3 or not h3.contents or not isinstance(h3.contents[0], NavigableString):
+            continue
+        name = h3.contents[0].strip()
+        if not name:
+            continue
+
+        menus.append({'menu_id': menu_id, 'name': name})
+    return menus
+
+
+def parse_nutrition(
+    html: str, parser: Optional[str] = None, partial: bool = True
+) -> Optional[Dict[str, float]]:
+    """
+    詳細ページから栄養素を抽出（引数はparse_menu_listと同じ）
+
+    Returns:
+        dict: フィールド名 → 値（ul.detailがなければNone）
+    """
+    soup = _make_soup(html, parser, DETAIL_STRAINER, partial)
+    detail_list = soup.find('ul', class_='detail')
+    if not detail_list:
+        return None
+
+    nutrition = {}
+    for li in detail_list.find_all('li'):
+        strong = li.find('strong')
+        price_span = li.find('span', class_='price')
+        if not strong or not price_span:
+            continue
+
+        field = NUTRITION_FIELD_MAP.get(strong.get_text(strip=True))
+        if not field:
+            continue
+
+        number_match = NUMBER_PATTERN.search(price_span.get_text(strip=True))
+        try:
+            nutrition[field] = float(number_match.group(1)) if number_match else 0.0
+        except ValueError:
+            nutrition[field] = 0.0
+    return nutrition
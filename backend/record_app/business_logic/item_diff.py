@@ -0,0 +1,124 @@
+"""
+明細アイテムの差分更新
+
+食事記録・Myメニューの編集時に、アイテムを全削除→全件作成するのではなく
+変更のあった行だけを書き込むための差分計算。
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Set
+
+
+@dataclass
+class ItemDiff:
+    """
+    既存アイテムと受信アイテムの差分
+
+    受信アイテムはまずidで既存行と対応付け、idがなければ、idで指定されていない
+    同じdisplay_orderの既存行と対応付ける（idの対応付けを先に済ませるため、
+    後ろのアイテムがidで指定した行をdisplay_orderで先に取ってしまうことはない）。
+    対応した行は値が変わったフィールドのみ更新し、対応しなかった受信アイテムは
+    新規作成、対応しなかった既存行は削除する。display_orderで対応付けた行は
+    別の食品に置き換わっている場合があるため、受信データにないフィールドは
+    既定値に戻す（前の食品の栄養素が残らないようにする）。
+    """
+    to_create: List[Any] = field(default_factory=list)
+    to_update: List[Any] = field(default_factory=list)
+    update_fields: Set[str] = field(default_factory=set)
+    to_delete: List[int] = field(default_factory=list)
+
+    @classmethod
+    def plan(
+        cls,
+        model,
+        parent_field: str,
+        parent,
+        existing: List[Any],
+        items_data: List[Dict[str, Any]],
+    ) -> 'ItemDiff':
+        """
+        差分を計算する（DBアクセスなし）
+
+        Raises:
+            ValueError: 親に属さないアイテムidが指定された場合
+        """
+        diff = cls()
+        by_id = {item.id: item for item in existing}
+        by_order: Dict[int, List[Any]] = {}
+        for item in existing:
+            by_order.setdefault(item.display_order, []).append(item)
+        matched = set()
+
+        # 1. idで対応付ける（同じidが重複した場合、2件目以降は新規作成）
+        pairs = []
+        for item_data in items_data:
+            item_data = dict(item_data)
+            item_id = item_data.pop('id', None)
+            current = None
+            if item_id is not None:
+                current = by_id.get(item_id)
+                if current is None:
+                    raise ValueError(f'アイテムが見つかりません: {item_id}')
+                if current.id in matched:
+                    current = None
+                else:
+                    matched.add(current.id)
+            pairs.append((item_id, current, item_data))
+
+        # 2. idのないアイテムは、残りの既存行とdisplay_orderで対応付ける
+        item_fields = [
+            f.attname for f in model._meta.concrete_fields
+            if not f.primary_key and f.name != parent_field
+        ]
+        for index, (item_id, current, item_data) in enumerate(pairs):
+            if item_id is not None:
+                continue
+            display_order = item_data.get('display_order', 0)
+            current = next(
+                (item for item in by_order.get(display_order, []) if item.id not in matched),
+                None
+            )
+            if current is not None:
+                matched.add(current.id)
+                # 新規作成した場合と同じ値にする（省略されたフィールドは既定値）
+                fresh = model(**{parent_field: parent}, **item_data)
+                item_data = {name: getattr(fresh, name) for name in item_fields}
+                pairs[index] = (item_id, current, item_data)
+
+        for _, current, item_data in pairs:
+            if current is None:
+                diff.to_create.append(model(**{parent_field: parent}, **item_data))
+                continue
+
+            changed = [
+                name for name, value in item_data.items()
+                if getattr(current, name) != value
+            ]
+            if changed:
+                for name in changed:
+                    setattr(current, name, item_data[name])
+                diff.to_update.append(current)
+                diff.update_fields.update(changed)
+
+        diff.to_delete = [item.id for item in existing if item.id not in matched]
+        return diff
+
+    def merge(self, other: 'ItemDiff') -> 'ItemDiff':
+        """複数の親の差分をまとめて1回で書き込むために結合する"""
+        self.to_create.extend(other.to_create)
+        self.to_update.extend(other.to_update)
+        self.update_fields.update(other.update_fields)
+        self.to_delete.extend(other.to_delete)
+        return self
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.to_create or self.to_update or self.to_delete)
+
+    def apply(self, model) -> None:
+        """必要な削除・更新・作成のみを実行する"""
+        if self.to_delete:
+            model.objects.filter(id__in=self.to_delete).delete()
+        if self.to_update:
+            model.objects.bulk_update(self.to_update, sorted(self.update_fields))
+        if self.to_create:
+            model.objects.bulk_create(self.to_create)
@@ -9,7 +9,17 @@ class NutritionCalculatorService:
         if not query:
             return []
         
-        results = []
+        return [self._format_search_result(food) for food in self._search_queryset(query)]
+    
+    async def asearch_foods(self, query):
+        """search_foods() の非同期版（非同期ORMで検索）"""
+        if not query:
+            return []
+        
+        return [self._format_search_result(food) async for food in self._search_queryset(query)]
+    
+    def _search_queryset(self, query):
+        """類似度の高い順に、全キーワードを含む標準食品を最大10件"""
         keywords = query.split()
         initial_candidates = (
             StandardFood.objects.annotate(
@@ -22,23 +32,19 @@ class NutritionCalculatorService:
         for keyword in keywords:
             final_query &= Q(name__icontains=keyword)
         
-        standard_foods = (
+        return (
             initial_candidates.filter(final_query)
             .order_by('-similarity') 
         )[:10]
-        
-        for food in standard_foods:
-            results.append({
-                'id': f'standard_{food.id}',
-                'name': food.name,
-                'category': food.category,
-                'type': 'standard',
-                'nutrition': self._get_nutrition_per_100g(food)
-            })
-        
-        
-        
-        return results
+    
+    def _format_search_result(self, food):
+        return {
+            'id': f'standard_{food.id}',
+            'name': food.name,
+            'category': food.category,
+            'type': 'standard',
+            'nutrition': self._get_nutrition_per_100g(food)
+        }
     
     def get_food_suggestions(self, query, limit=5):
         """食品名の候補を取得（オートコンプリート用）"""
@@ -104,7 +110,14 @@ class NutritionCalculatorService:
             user=user,
             record_date=target_date
         )
+        return self.summarize_meals(meals)
+    
+    def summarize_meals(self, meals):
+        """
+        食事記録の栄養素合計を計算
         
+        取得済みの食事記録を渡せば追加のクエリは発生しない。
+        """
         # 栄養素の合計を初期化
         daily_total = {
             'calories': 0,
@@ -0,0 +1,270 @@
+"""
+栄養成分表示OCRのベンチマーク用コーパス
+
+栄養成分表示の画像を合成し、正解の栄養素の値と文字の位置（ラベル）と一緒に保存する。
+保存したコーパスでOCR処理を段階ごとに実行し、処理時間と項目ごとの正解率を計測する。
+
+コーパスの構成:
+    <コーパス>/labels.json  … 画像ごとのレイアウト・加工・正解の値・文字の位置
+    <コーパス>/<番号>.png
+
+CorpusReader を使うと、EasyOCRの代わりにラベルの文字と位置を返すため、
+EasyOCRがない環境でもブロック形成以降の段を計測できる。
+"""
+import json
+import math
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from .ocr_processor import OCRTimings
+
+# 日本語を描画できるフォントの候補（--font で指定しない場合に順に探す）
+FONT_CANDIDATES = [
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/opentype/ipaexfont-gothic/ipaexg.ttf',
+    '/usr/share/fonts/truetype/fonts-japanese-gothic.ttf',
+    '/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc',
+    'C:/Windows/Fonts/meiryo.ttc',
+]
+
+# table: 表示名と値を左右に離す / compact: 表示名と値を1つの文字列にする /
+# inline: 「熱量123kcal、たんぱく質4.5g、…」の文
+LAYOUTS = ('table', 'compact', 'inline')
+VARIANTS = ('plain', 'inverted', 'red', 'skewed', 'noisy')
+
+# 表示名と単位（栄養素 -> (表示名, 単位)）
+LABEL_NAMES = {
+    'calories': ('エネルギー', 'kcal'),
+    'protein': ('たんぱく質', 'g'),
+    'fat': ('脂質', 'g'),
+    'carbohydrates': ('炭水化物', 'g'),
+    'sugar': ('糖質', 'g'),
+    'dietary_fiber': ('食物繊維', 'g'),
+    'sodium': ('食塩相当量', 'g'),
+}
+INLINE_NAMES = {'calories': '熱量'}
+
+IMAGE_WIDTH = 720
+FONT_SIZE = 30
+LINE_HEIGHT = 56
+MARGIN = 40
+
+
+def find_font(font_path: Optional[str] = None) -> str:
+    """描画に使うフォントのパス（見つからなければ ValueError）"""
+    candidates = [font_path] if font_path else FONT_CANDIDATES
+    for candidate in candidates:
+        if candidate and Path(candidate).is_file():
+            return candidate
+    raise ValueError('日本語フォントが見つかりません。フォントのパスを指定してください')
+
+
+def random_nutrition(rng: random.Random) -> Dict[str, float]:
+    """
+    もっともらしい栄養成分値（100gあたり）
+
+    エネルギーはAtwater係数から計算し、整合性検証を通る値にする。
+    半数は炭水化物を糖質と食物繊維に分けて表示する。
+    """
+    protein = round(rng.uniform(0, 30), 1)
+    fat = round(rng.uniform(0, 35), 1)
+    nutrition = {'protein': protein, 'fat': fat}
+    if rng.random() < 0.5:
+        sugar = round(rng.uniform(0, 60), 1)
+        fiber = round(rng.uniform(0, 8), 1)
+        nutrition.update(sugar=sugar, dietary_fiber=fiber, carbohydrates=round(sugar + fiber, 1))
+    else:
+        nutrition['carbohydrates'] = round(rng.uniform(0, 70), 1)
+    nutrition['calories'] = float(round(protein * 4 + fat * 9 + nutrition['carbohydrates'] * 4))
+    nutrition['sodium'] = round(rng.uniform(0, 3), 1)
+    return nutrition
+
+
+def _format_value(nutrient: str, value: float) -> str:
+    return f'{value:.0f}' if nutrient == 'calories' else f'{value:.1f}'
+
+
+def _label_lines(nutrition: Dict[str, float], layout: str) -> List[List[str]]:
+    """1行ごとの文字列（table は [表示名, 値]、それ以外は [文字列]）"""
+    nutrients = [key for key in LABEL_NAMES if key in nutrition]
+    if layout == 'table':
+        return [[LABEL_NAMES[key][0], f'{_format_value(key, nutrition[key])}{LABEL_NAMES[key][1]}'] for key in nutrients]
+    if layout == 'compact':
+        return [[f'{LABEL_NAMES[key][0]} {_format_value(key, nutrition[key])}{LABEL_NAMES[key][1]}'] for key in nutrients]
+
+    # インライン形式:「熱量123kcal、たんぱく質4.5g、…」を3項目ずつ改行する
+    parts = [
+        f'{INLINE_NAMES.get(key, LABEL_NAMES[key][0])}{_format_value(key, nutrition[key])}{LABEL_NAMES[key][1]}'
+        for key in nutrients
+    ]
+    return [['、'.join(parts[index:index + 3]) + ('、' if index + 3 < len(parts) else '')]
+            for index in range(0, len(parts), 3)]
+
+
+def render_label(
+    nutrition: Dict[str, float], layout: str, variant: str, font_path: str, seed: int = 0
+) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """
+    栄養成分表示の画像を描画
+
+    Returns:
+        (BGR画像, 文字のボックス [{'text': ..., 'bbox': [[x, y] × 4]}, ...])
+    """
+    rng = random.Random(seed)
+    font = ImageFont.truetype(font_path, FONT_SIZE)
+    lines = [['栄養成分表示（100gあたり）']] + _label_lines(nutrition, layout)
+    height = MARGIN * 2 + LINE_HEIGHT * len(lines)
+
+    background, foreground = {
+        'inverted': ((30, 30, 30), (245, 245, 245)),
+        'red': ((200, 30, 40), (255, 255, 255)),
+    }.get(variant, ((255, 255, 255), (20, 20, 20)))
+    image = Image.new('RGB', (IMAGE_WIDTH, height), background)
+    draw = ImageDraw.Draw(image)
+
+    boxes = []
+
+    def draw_text(x, y, text, anchor='ls'):
+        draw.text((x, y), text, font=font, fill=foreground, anchor=anchor)
+        left, top, right, bottom = draw.textbbox((x, y), text, font=font, anchor=anchor)
+        boxes.append({'text': text, 'bbox': [[left, top], [right, top], [right, bottom], [left, bottom]]})
+
+    for row, texts in enumerate(lines):
+        baseline = MARGIN + LINE_HEIGHT * row + FONT_SIZE + 8
+        draw_text(MARGIN, baseline, texts[0])
+        if len(texts) == 2:
+            draw_text(IMAGE_WIDTH - MARGIN, baseline, texts[1], anchor='rs')
+        if layout != 'inline' or row == 0:
+            # 表の罫線（傾き補正の手がかりにもなる）
+            line_y = MARGIN + LINE_HEIGHT * (row + 1)
+            draw.line([(MARGIN // 2, line_y), (IMAGE_WIDTH - MARGIN // 2, line_y)], fill=foreground, width=2)
+
+    # PILはRGB、OpenCVはBGR
+    array = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+
+    if variant == 'skewed':
+        angle = rng.choice([-1, 1]) * rng.uniform(1.5, 4.0)
+        matrix = cv2.getRotationMatrix2D((IMAGE_WIDTH / 2, height / 2), angle, 1.0)
+        array = cv2.warpAffine(array, matrix, (IMAGE_WIDTH, height), borderMode=cv2.BORDER_REPLICATE)
+        for box in boxes:
+            points = np.hstack([np.array(box['bbox'], dtype=float), np.ones((4, 1))])
+            box['bbox'] = (points @ matrix.T).round().astype(int).tolist()
+    elif variant == 'noisy':
+        noise = np.random.default_rng(seed).normal(0, 18, array.shape)
+        array = np.clip(array.astype(float) + noise, 0, 255).astype(np.uint8)
+        array = cv2.GaussianBlur(array, (3, 3), 0)
+
+    return array, boxes
+
+
+def generate_corpus(output_dir, count: int, font_path: str, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    コーパスを作成（レイアウトと加工の組み合わせを順に割り当てる）
+
+    Returns:
+        labels.json に保存したサンプルのリスト
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+
+    samples = []
+    for index in range(count):
+        layout = LAYOUTS[index % len(LAYOUTS)]
+        variant = VARIANTS[(index // len(LAYOUTS)) % len(VARIANTS)]
+        nutrition = random_nutrition(rng)
+        image, boxes = render_label(nutrition, layout, variant, font_path, seed=seed + index)
+
+        name = f'{index + 1:04d}.png'
+        cv2.imwrite(str(output_dir / name), image)
+        samples.append({'image': name, 'layout': layout, 'variant': variant, 'nutrition': nutrition, 'boxes': boxes})
+
+    (output_dir / 'labels.json').write_text(
+        json.dumps({'font': Path(font_path).name, 'seed': seed, 'samples': samples}, ensure_ascii=False, indent=1),
+        encoding='utf-8'
+    )
+    return samples
+
+
+def load_corpus(corpus_dir) -> List[Dict[str, Any]]:
+    """labels.json のサンプル（'path' に画像のパスを追加）"""
+    corpus_dir = Path(corpus_dir)
+    labels = json.loads((corpus_dir / 'labels.json').read_text(encoding='utf-8'))
+    return [{**sample, 'path': corpus_dir / sample['image']} for sample in labels['samples']]
+
+
+class CorpusReader:
+    """
+    EasyOCRの Reader の代わりにラベルの文字と位置を返す
+
+    use() で次に処理するサンプルを指定する。文字の位置は元画像の座標のため、
+    前処理で傾きが補正された画像とはずれることがある。
+    """
+
+    def __init__(self):
+        self._results = []
+
+    def use(self, sample: Dict[str, Any]) -> None:
+        self._results = [(box['bbox'], box['text'], 1.0) for box in sample['boxes']]
+
+    def readtext(self, image, **kwargs):
+        return list(self._results)
+
+
+@dataclass
+class StageResult:
+    """1画像分の段階ごとの処理時間（秒）と抽出結果"""
+    timings: Dict[str, float]
+    nutrition: Optional[Dict[str, Optional[float]]]
+    validation: Optional[Dict[str, Any]]
+
+
+def run_stages(processor, image_path) -> StageResult:
+    """
+    NutritionOCRProcessor.process_nutrition_label と同じ処理を段階ごとに計時して実行
+
+    None を 0.0 に置き換える前の抽出結果を返す（未検出と誤りを区別するため）。
+    テキストが検出されなければ、ブロック形成以降は実行しない。
+    """
+    timings = OCRTimings()
+    preprocessed = processor.preprocessor.preprocess(str(image_path), timings)
+    with timings.timer('readtext'):
+        text_boxes, image_height = processor.extract_text_with_positions(preprocessed)
+    if not text_boxes:
+        return StageResult(timings.timings, None, None)
+    with timings.timer('clustering'):
+        blocks = processor.block_builder.build_blocks(text_boxes, image_height)
+    with timings.timer('extraction'):
+        nutrition = processor.extractor.extract_from_blocks(blocks)
+    with timings.timer('validation'):
+        validation = processor.validator.validate(nutrition)
+    return StageResult(timings.timings, nutrition, validation)
+
+
+def score_fields(
+    expected: Dict[str, float], actual: Optional[Dict[str, Optional[float]]], tolerance: float = 0.01
+) -> Dict[str, str]:
+    """
+    ラベルの項目ごとの判定
+
+    Returns:
+        {栄養素: 'correct' | 'wrong' | 'missing'}
+    """
+    actual = actual or {}
+    scores = {}
+    for nutrient, value in expected.items():
+        found = actual.get(nutrient)
+        if found is None:
+            scores[nutrient] = 'missing'
+        elif math.isclose(found, value, abs_tol=tolerance):
+            scores[nutrient] = 'correct'
+        else:
+            scores[nutrient] = 'wrong'
+    return scores
@@ -15,10 +15,12 @@
 """
 
 import re
+import time
 import cv2
 import numpy as np
 from PIL import Image
 from pathlib import Path
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from typing import List, Dict, Tuple, Optional, Any
 from sklearn.cluster import DBSCAN
@@ -85,6 +87,62 @@ class SemanticBlock:
         self.top_left_y = min(box.bbox[0][1] for box in self.text_boxes)
 
 
+class OCRTimings:
+    """
+    OCR処理1回分の段階ごとの所要時間
+
+    前処理は読み込み・色判定・傾き補正・シャープ化・バイラテラルフィルタ・CLAHEに分けて計測する。
+    """
+
+    STAGES = (
+        'load', 'color_detection', 'skew_correction', 'sharpen', 'bilateral_filter', 'clahe',
+        'readtext', 'clustering', 'extraction', 'validation',
+    )
+    PREPROCESS_STAGES = STAGES[:6]
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self.elapsed = 0.0
+        self.timings = dict.fromkeys(self.STAGES, 0.0)
+        self.text_boxes = 0
+        self.blocks = 0
+
+    @contextmanager
+    def timer(self, name):
+        """with ブロックの所要時間を name に加算"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - start
+
+    def finish(self):
+        """開始からの経過時間を確定"""
+        self.elapsed = time.perf_counter() - self._start
+
+    def as_dict(self):
+        """
+        計測値をdictで返す（時間はミリ秒）
+
+        Returns:
+            dict: elapsed_ms、preprocess_ms（前処理の合計）、timings_ms（段階ごと）、
+                  text_boxes、blocks
+        """
+        return {
+            'elapsed_ms': round(self.elapsed * 1000, 1),
+            'preprocess_ms': round(sum(self.timings[name] for name in self.PREPROCESS_STAGES) * 1000, 1),
+            'timings_ms': {name: round(value * 1000, 1) for name, value in self.timings.items()},
+            'text_boxes': self.text_boxes,
+            'blocks': self.blocks,
+        }
+
+    def __str__(self):
+        values = {'elapsed_ms': round(self.elapsed * 1000, 1)}
+        values.update({f'{name}_ms': round(value * 1000, 1) for name, value in self.timings.items()})
+        values.update(text_boxes=self.text_boxes, blocks=self.blocks)
+        return ' '.join(f'{name}={value}' for name, value in values.items())
+
+
 # =============================================================================
 # OCR誤認識補正クラス（第4段階）- 強化版
 # =============================================================================
@@ -439,11 +497,11 @@ class AdaptiveImagePreprocessor:
             borderMode=cv2.BORDER_REPLICATE
         )
         
-        logger.info(f"Skew corrected: {median_angle:.2f} degrees")
+        logger.debug("Skew corrected: %.2f degrees", median_angle)
         return rotated
     
     @classmethod
-    def preprocess(cls, image_path: str) -> np.ndarray:
+    def preprocess(cls, image_path: str, timings: Optional[OCRTimings] = None) -> np.ndarray:
         """
         適応的前処理
         
@@ -457,40 +515,51 @@ class AdaptiveImagePreprocessor:
         7. コントラスト調整
         
         注意：画像拡大はフロントエンドで実施済みのため行わない
+        
+        Args:
+            timings: 指定すると各処理の所要時間を記録する
         """
+        timings = timings or OCRTimings()
+        
         # 画像読み込み
-        img = cv2.imread(str(image_path))
+        with timings.timer('load'):
+            img = cv2.imread(str(image_path))
         if img is None:
             raise ValueError(f"Failed to load image: {image_path}")
         
-        logger.info(f"Image loaded: {img.shape} (upscaling skipped - done in frontend)")
+        logger.debug("Image loaded: %s (upscaling skipped - done in frontend)", img.shape)
         
         # 赤背景検出と色反転
-        if cls.detect_red_background(img):
-            logger.info("Red background detected - applying special processing")
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            gray = cv2.bitwise_not(gray)
-        elif cls.detect_inverted_colors(img):
-            logger.info("Inverted colors detected - applying inversion")
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            gray = cv2.bitwise_not(gray)
-        else:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        with timings.timer('color_detection'):
+            if cls.detect_red_background(img):
+                logger.debug("Red background detected - applying special processing")
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+                gray = cv2.bitwise_not(gray)
+            elif cls.detect_inverted_colors(img):
+                logger.debug("Inverted colors detected - applying inversion")
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+                gray = cv2.bitwise_not(gray)
+            else:
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         
         # 傾き補正
-        gray = cls.correct_skew(gray)
+        with timings.timer('skew_correction'):
+            gray = cls.correct_skew(gray)
         
         # シャープ化（文字のエッジを強調）
-        gray = cls.sharpen_image(gray)
+        with timings.timer('sharpen'):
+            gray = cls.sharpen_image(gray)
         
         # ノイズ除去（バイラテラルフィルタ：エッジを保持しつつノイズ除去）
-        denoised = cv2.bilateralFilter(gray, 9, 75, 75)
+        with timings.timer('bilateral_filter'):
+            denoised = cv2.bilateralFilter(gray, 9, 75, 75)
         
         # コントラスト調整（CLAHE）
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(denoised)
+        with timings.timer('clahe'):
+            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+            enhanced = clahe.apply(denoised)
         
-        logger.info(f"Adaptive preprocessing completed. Output size: {enhanced.shape}")
+        logger.debug("Adaptive preprocessing completed. Output size: %s", enhanced.shape)
         return enhanced
 
 
@@ -567,7 +636,7 @@ class SemanticBlockBuilder:
             b.top_left_x  # X座標
         ))
         
-        logger.info(f"Built {len(blocks)} semantic blocks from {len(text_boxes)} text boxes")
+        logger.debug("Built %d semantic blocks from %d text boxes", len(blocks), len(text_boxes))
         return blocks
 
 
@@ -665,7 +734,7 @@ class NutritionExtractor:
         for block in blocks:
             # テキストの前処理（誤認識補正）
             text = self.post_processor.correct_text(block.combined_text)
-            logger.debug(f"Processing block: '{block.combined_text}' -> '{text}'")
+            logger.debug("Processing block: '%s' -> '%s'", block.combined_text, text)
             
             # インライン形式の分割処理
             # 「熱量16kcal、たんぱく質1.6g」→ 個別に処理
@@ -708,7 +777,7 @@ class NutritionExtractor:
                     
                     if value is not None:
                         nutrition[nutrient] = value
-                        logger.debug(f"Extracted {nutrient}: {value} from '{text}'")
+                        logger.debug("Extracted %s: %s from '%s'", nutrient, value, text)
                         break
 
 
@@ -819,7 +888,7 @@ class NutritionOCRProcessor:
         self.extractor = NutritionExtractor()
         self.validator = NutritionValidator()
         
-        logger.info("NutritionOCRProcessor initialized (lazy loading enabled)")
+        logger.debug("NutritionOCRProcessor initialized (lazy loading enabled)")
     
     @property
     def reader(self):
@@ -856,16 +925,17 @@ class NutritionOCRProcessor:
             adjust_contrast=0.7,  # コントラスト自動調整
         )
         
-        # デバッグ: 全検出結果をログ出力
-        logger.info(f"EasyOCR raw results count: {len(results)}")
-        for i, (bbox, text, confidence) in enumerate(results):
-            logger.info(f"  [{i}] conf={confidence:.3f} text='{text}'")
+        # デバッグ: 全検出結果をログ出力（DEBUGが無効なら1件ごとのループ自体を省く）
+        logger.debug("EasyOCR raw results count: %d", len(results))
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, (bbox, text, confidence) in enumerate(results):
+                logger.debug("  [%d] conf=%.3f text='%s'", i, confidence, text)
         
         text_boxes = []
         for bbox, text, confidence in results:
             # 閾値を0.1に下げる（後処理で補正するため）
             if confidence < 0.1:
-                logger.debug(f"Skipped low confidence: '{text}' ({confidence:.3f})")
+                logger.debug("Skipped low confidence: '%s' (%.3f)", text, confidence)
                 continue
             if not text.strip():
                 continue
@@ -876,19 +946,39 @@ class NutritionOCRProcessor:
                 confidence=confidence
             ))
         
-        logger.info(f"Detected {len(text_boxes)} text boxes (after filtering)")
+        logger.debug("Detected %d text boxes (after filtering)", len(text_boxes))
         return text_boxes, image.shape[0]
     
-    def process_nutrition_label(self, image_path: str) -> Dict[str, Any]:
+    def process_nutrition_label(self, image_path: str, debug: bool = False) -> Dict[str, Any]:
         """
         栄養成分表示画像を処理してデータを返す
+        
+        段階ごとの所要時間は毎回ログに出力する（extra の ocr_timings にも同じ値を付ける）。
+        
+        Args:
+            debug: Trueなら段階ごとの所要時間（OCRTimings.as_dict()）を 'timings' に含める
         """
+        timings = OCRTimings()
+        result = self._process(image_path, timings)
+        timings.finish()
+        
+        metrics = timings.as_dict()
+        logger.info(
+            "OCR処理時間: success=%s %s", result['success'], timings, extra={'ocr_timings': metrics}
+        )
+        if debug:
+            result['timings'] = metrics
+        return result
+    
+    def _process(self, image_path: str, timings: OCRTimings) -> Dict[str, Any]:
         try:
             # 1. 適応的前処理（拡大なし - フロントエンドで実施済み）
-            preprocessed = self.preprocessor.preprocess(image_path)
+            preprocessed = self.preprocessor.preprocess(image_path, timings)
             
             # 2. テキスト検出
-            text_boxes, image_height = self.extract_text_with_positions(preprocessed)
+            with timings.timer('readtext'):
+                text_boxes, image_height = self.extract_text_with_positions(preprocessed)
+            timings.text_boxes = len(text_boxes)
             
             if not text_boxes:
                 return {
@@ -898,13 +988,17 @@ class NutritionOCRProcessor:
                 }
             
             # 3. 意味ブロック形成
-            blocks = self.block_builder.build_blocks(text_boxes, image_height)
+            with timings.timer('clustering'):
+                blocks = self.block_builder.build_blocks(text_boxes, image_height)
+            timings.blocks = len(blocks)
             
             # 4. 栄養素抽出
-            nutrition = self.extractor.extract_from_blocks(blocks)
+            with timings.timer('extraction'):
+                nutrition = self.extractor.extract_from_blocks(blocks)
             
             # 5. 整合性検証
-            validation = self.validator.validate(nutrition)
+            with timings.timer('validation'):
+                validation = self.validator.validate(nutrition)
             
             # 最低限の栄養素が検出されたかチェック
             has_basic_nutrition = any([
@@ -937,7 +1031,7 @@ class NutritionOCRProcessor:
             }
             
         except Exception as e:
-            logger.exception(f"OCR processing error: {str(e)}")
+            logger.exception("OCR processing error: %s", e)
             return {
                 'success': False,
                 'error': f'処理中にエラーが発生しました: {str(e)}',
@@ -0,0 +1,85 @@
+"""
+食堂サイトのオフライン再生
+
+保存済みのカテゴリー・詳細ページHTMLをrequestsのトランスポートアダプタとして
+返すことで、実サイトにアクセスせずにCafeteriaScraperを動かす。
+計測やテストで使う。
+"""
+import hashlib
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+class FixtureAdapter(BaseAdapter):
+    """
+    フィクスチャディレクトリからレスポンスを返すアダプタ
+
+    ディレクトリ構成:
+        menu_load/<カテゴリーID>.html  … menu_load.php?a=<カテゴリーID>
+        detail/<メニューID>.html       … detail.php?c=<メニューID>
+
+    詳細ページには内容に基づくETagを付け、If-None-Matchが一致すれば304を返す。
+    フェーズ（category / detail）ごとのリクエスト数・転送バイト数を記録する。
+    """
+
+    def __init__(self, fixtures_dir, latency=0.0):
+        super().__init__()
+        self.fixtures_dir = Path(fixtures_dir)
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            phase: {'requests': 0, 'bytes': 0, 'not_modified': 0}
+            for phase in ('category', 'detail')
+        }
+
+    def send(self, request, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+
+        url = urlsplit(request.url)
+        query = parse_qs(url.query)
+        if url.path.endswith('menu_load.php'):
+            phase, path = 'category', self.fixtures_dir / 'menu_load' / f"{query.get('a', [''])[0]}.html"
+        elif url.path.endswith('detail.php'):
+            phase, path = 'detail', self.fixtures_dir / 'detail' / f"{query.get('c', [''])[0]}.html"
+        else:
+            return self._build_response(request, 404)
+
+        if not path.is_file():
+            return self._build_response(request, 404)
+
+        content = path.read_bytes()
+        headers = {}
+        status_code = 200
+        if phase == 'detail':
+            headers['ETag'] = f'"{hashlib.sha1(content).hexdigest()}"'
+            if request.headers.get('If-None-Match') == headers['ETag']:
+                status_code, content = 304, b''
+
+        with self._lock:
+            stats = self.stats[phase]
+            stats['requests'] += 1
+            stats['bytes'] += len(content)
+            stats['not_modified'] += status_code == 304
+        return self._build_response(request, status_code, content, headers)
+
+    def close(self):
+        pass
+
+    def _build_response(self, request, status_code, content=b'', headers=None):
+        response = Response()
+        response.status_code = status_code
+        response._content = content
+        response.headers = CaseInsensitiveDict(headers or {})
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
@@ -0,0 +1,289 @@
+"""
+キャッシュユーティリティ
+
+record_appでキャッシュを使う処理はこのモジュールを通し、キーの組み立て方・
+無効化の方法・シリアライズ形式を揃える。
+
+- CacheNamespace: 名前空間ごとのキーを組み立てる。名前空間とスコープ（ユーザー・
+  データセット）はそれぞれバージョン番号を持ち、バージョンを進めるだけで配下の
+  キーをまとめて無効にできる（古いキーは削除せずTTLで消える）
+- get_or_compute: キャッシュになければ計算して保存する。同じキーの計算はロックで
+  1つに絞り、他のプロセスは保存されるまで待つ
+- シリアライズは 'pickle'（キャッシュバックエンド既定、任意のPythonオブジェクト）と
+  'json'（デプロイやクライアントの言語をまたいで読める）から選ぶ
+- LocalLRUCache: 共有キャッシュへの問い合わせも省きたい値のためのプロセス内キャッシュ
+- request_cache_stats: リクエスト中の CacheNamespace のヒット・ミス数（PerformanceMiddlewareが集計）
+
+使用例:
+    DASHBOARD_CACHE = CacheNamespace('dashboard', timeout=300, serializer='json')
+
+    key = DASHBOARD_CACHE.key(target_date, scope=user_scope(user))
+    data = DASHBOARD_CACHE.get_or_compute(key, lambda: build_dashboard(user, target_date))
+
+    invalidate_scope(user_scope(user))   # このユーザーの全名前空間のキャッシュを無効化
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import date, datetime
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+# キーの1要素の最大長（超える場合・区切り文字を含む場合はハッシュ化する）
+MAX_KEY_PART_LENGTH = 64
+VERSION_PREFIX = 'cache_version'
+
+_MISSING = object()
+_DEFAULT_TIMEOUT = object()
+
+
+@dataclass
+class CacheStats:
+    """CacheNamespace の参照のヒット・ミス数"""
+    hits: int = 0
+    misses: int = 0
+
+
+# 集計中のリクエストの CacheStats（集計していなければNone）
+request_cache_stats: ContextVar[CacheStats | None] = ContextVar('request_cache_stats', default=None)
+
+
+def _record_lookup(hit: bool) -> None:
+    stats = request_cache_stats.get()
+    if stats is None:
+        return
+    if hit:
+        stats.hits += 1
+    else:
+        stats.misses += 1
+
+
+def key_part(value) -> str:
+    """
+    キーの要素を文字列に変換
+
+    Noneは 'all'、真偽値は '1' / '0'、日付はISO形式、モデルは主キーにする。
+    長い値や区切り文字・空白・非ASCII文字を含む値はSHA-1でハッシュ化する。
+    """
+    if value is None:
+        return 'all'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, models.Model):
+        value = value.pk
+    text = str(value)
+    if len(text) > MAX_KEY_PART_LENGTH or not text.isascii() or any(c in text for c in ': \t\n'):
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+    return text
+
+
+def build_key(*parts) -> str:
+    """要素を ':' で連結したキャッシュキーを作成"""
+    return ':'.join(key_part(part) for part in parts)
+
+
+def user_scope(user) -> str:
+    """ユーザー単位のスコープ（UserまたはユーザーID）"""
+    return f'user-{key_part(user)}'
+
+
+def dataset_scope(name: str) -> str:
+    """データセット単位のスコープ（食堂メニュー、標準食品など）"""
+    return f'dataset-{key_part(name)}'
+
+
+def get_version(name: str) -> int:
+    """名前空間・スコープのバージョンを取得（未作成の場合は作成）"""
+    key = f'{VERSION_PREFIX}:{name}'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+async def aget_version(name: str) -> int:
+    """get_version() の非同期版"""
+    key = f'{VERSION_PREFIX}:{name}'
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _initial_version(), timeout=None)
+        version = await cache.aget(key, 1)
+    return version
+
+
+def bump_version(name: str) -> int:
+    """名前空間・スコープのバージョンを進め、新しいバージョンを返す"""
+    key = f'{VERSION_PREFIX}:{name}'
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+        return cache.get(key, 1)
+
+
+def invalidate_scope(scope: str) -> int:
+    """スコープ配下のキャッシュを全名前空間で無効化"""
+    return bump_version(f'scope:{scope}')
+
+
+def _initial_version() -> int:
+    # バージョンのキーが追い出されても古いバージョンに戻らないよう、時刻を初期値にする
+    return int(time.time() * 1000)
+
+
+class CacheNamespace:
+    """
+    バージョン付きのキャッシュ名前空間
+
+    キーは '<名前空間>:v<バージョン>[:<スコープ>:v<スコープのバージョン>]:<要素...>'。
+    invalidate() で名前空間全体を、invalidate_scope() でスコープ配下を無効化する。
+    """
+
+    SERIALIZERS = ('pickle', 'json')
+
+    # ロックの保持上限・他プロセスの計算結果を待つ時間・確認間隔（秒）
+    LOCK_TIMEOUT = 30
+    LOCK_WAIT = 5.0
+    LOCK_POLL_INTERVAL = 0.05
+
+    def __init__(self, name: str, timeout: int | None = 300, serializer: str = 'pickle'):
+        """
+        Args:
+            name: 名前空間名（キーの先頭に付く）
+            timeout: 既定の保持時間（秒、Noneで無期限）
+            serializer: 'pickle' または 'json'
+        """
+        if serializer not in self.SERIALIZERS:
+            raise ValueError(f'serializer は {self.SERIALIZERS} のいずれかです: {serializer}')
+        self.name = key_part(name)
+        self.timeout = timeout
+        self.serializer = serializer
+
+    def version(self) -> int:
+        """名前空間のバージョン"""
+        return get_version(f'namespace:{self.name}')
+
+    async def aversion(self) -> int:
+        return await aget_version(f'namespace:{self.name}')
+
+    def invalidate(self) -> int:
+        """名前空間全体を無効化し、新しいバージョンを返す"""
+        return bump_version(f'namespace:{self.name}')
+
+    def key(self, *parts, scope: str | None = None) -> str:
+        """現在のバージョンを含むキーを作成"""
+        prefix = [self.name, f'v{self.version()}']
+        if scope is not None:
+            prefix += [scope, f'v{get_version(f"scope:{scope}")}']
+        return build_key(*prefix, *parts)
+
+    def get(self, key: str, default=None):
+        raw = cache.get(key, _MISSING)
+        _record_lookup(raw is not _MISSING)
+        if raw is _MISSING:
+            return default
+        return self._loads(raw)
+
+    async def aget(self, key: str, default=None):
+        raw = await cache.aget(key, _MISSING)
+        _record_lookup(raw is not _MISSING)
+        if raw is _MISSING:
+            return default
+        return self._loads(raw)
+
+    def set(self, key: str, value, timeout=_DEFAULT_TIMEOUT) -> None:
+        cache.set(key, self._dumps(value), self.timeout if timeout is _DEFAULT_TIMEOUT else timeout)
+
+    async def aset(self, key: str, value, timeout=_DEFAULT_TIMEOUT) -> None:
+        await cache.aset(key, self._dumps(value), self.timeout if timeout is _DEFAULT_TIMEOUT else timeout)
+
+    def delete(self, key: str) -> None:
+        cache.delete(key)
+
+    def get_or_compute(self, key: str, compute, timeout=_DEFAULT_TIMEOUT):
+        """
+        キャッシュの値を返し、なければ compute() の結果を保存して返す
+
+        同じキーを同時に計算しないよう、計算中はロックを保持する。ロックを取れなかった
+        場合は保存されるまで待ち、LOCK_WAIT秒を過ぎたら自分で計算する。
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        lock_key = f'{key}:lock'
+        if not cache.add(lock_key, 1, timeout=self.LOCK_TIMEOUT):
+            deadline = time.monotonic() + self.LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(self.LOCK_POLL_INTERVAL)
+                value = self.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+            return compute()
+
+        try:
+            value = compute()
+            self.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    def _dumps(self, value):
+        if self.serializer == 'json':
+            return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+        return value
+
+    def _loads(self, raw):
+        if self.serializer == 'json':
+            return json.loads(raw)
+        return raw
+
+
+class LocalLRUCache:
+    """
+    プロセス内のTTL付きLRUキャッシュ
+
+    リクエストごとに参照される小さな値を、共有キャッシュへの問い合わせなしで返す。
+    他のプロセスでの無効化は伝わらないため、TTLは数秒〜数十秒に留める。
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 10):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
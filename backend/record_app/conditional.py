@@ -0,0 +1,65 @@
+"""
+条件付きGET（ETag / Last-Modified）のサポート
+"""
+import hashlib
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import UserDataVersion
+
+
+class ConditionalGetMixin:
+    """
+    ユーザーデータの変更バージョンに基づく条件付きGETをViewSetに追加するMixin
+
+    ETagはユーザー・変更バージョン・リクエストパスから生成するため、
+    If-None-Matchの判定はUserDataVersionの1行を参照するだけで済み、
+    データ本体のテーブルにはアクセスしない。
+    """
+
+    def get_validators(self, request):
+        """リクエストに対応する (ETag, Last-Modified) を返す"""
+        data_version = UserDataVersion.get_for_user(request.user)
+        raw = f'{request.user.pk}:{data_version.version}:{request.get_full_path()}'
+        etag = '"%s"' % hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        return etag, data_version.updated_at
+
+    def is_not_modified(self, request, etag, last_modified):
+        """クライアントのキャッシュが最新かどうかを判定"""
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags
+
+        if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+        if if_modified_since:
+            since = parse_http_date_safe(if_modified_since)
+            return since is not None and int(last_modified.timestamp()) <= since
+
+        return False
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+
+        if self.is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+        # ユーザーごとの内容のため共有キャッシュには保存させず、毎回再検証させる
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
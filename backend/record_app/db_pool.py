@@ -0,0 +1,62 @@
+"""
+PostgreSQLコネクションプールの状態
+
+プールはプロセスごとに作られるため、値は呼び出したプロセスのもの。
+DB_POOL_MODE=pool 以外（SQLite・PgBouncer・持続接続）では None を返す。
+"""
+from django.db import connections
+
+
+def get_pool(alias: str = 'default'):
+    """
+    作成済みのコネクションプールを返す（未作成・プールなしの場合はNone）
+
+    DatabaseWrapper.pool は参照するとプールを作成するため、作成済みのものだけを見る。
+    """
+    pools = getattr(connections[alias], '_connection_pools', None)
+    if not pools:
+        return None
+    return pools.get(alias)
+
+
+def get_pool_stats(alias: str = 'default') -> dict | None:
+    """
+    プールの接続数と待ち時間の統計
+
+    Returns:
+        dict | None: psycopg_pool の get_stats() に、接続を待ったリクエストの平均待ち時間
+        （requests_wait_ms_avg）を加えたもの
+    """
+    pool = get_pool(alias)
+    if pool is None:
+        return None
+    stats = {
+        'pool_min': pool.min_size,
+        'pool_max': pool.max_size,
+        'pool_size': 0,
+        'pool_available': 0,
+        'requests_waiting': 0,
+        'requests_num': 0,
+        'requests_queued': 0,
+        'requests_wait_ms': 0,
+        'requests_errors': 0,
+        'connections_num': 0,
+        'connections_errors': 0,
+        'connections_lost': 0,
+        **pool.get_stats(),
+    }
+    queued = stats['requests_queued']
+    stats['requests_wait_ms_avg'] = round(stats['requests_wait_ms'] / queued, 1) if queued else 0.0
+    return stats
+
+
+def reset_inherited_pools() -> None:
+    """
+    fork元から引き継いだプールを破棄し、このプロセスで作り直させる
+
+    引き継いだ接続は親プロセスとソケットを共有しているため、閉じずに参照だけ外す。
+    """
+    for connection in connections.all():
+        pools = getattr(connection, '_connection_pools', None)
+        if pools:
+            pools.pop(connection.alias, None)
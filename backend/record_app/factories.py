@@ -0,0 +1,176 @@
+"""
+合成データの作成（テスト・ベンチマーク用）
+
+大量の記録を持つユーザーを bulk_create でまとめて作成する。乱数は seed で固定するため、
+同じ引数なら同じデータになる。bulk_create はシグナルを送らないため、ユーザーデータの
+変更バージョン（UserDataVersion）は更新されない。
+"""
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from .models import (
+    CustomFood, CustomMenu, CustomMenuItem, MealRecord, MealRecordItem, StandardFood, WeightRecord,
+)
+
+# 食品名の元データ（検索のベンチマークで部分一致・類似度検索が当たるように実在の名前を使う）
+FOOD_NAMES = [
+    ('白米', '穀類'), ('玄米', '穀類'), ('食パン', '穀類'), ('うどん', '穀類'), ('そば', '穀類'),
+    ('鶏むね肉', '肉類'), ('鶏もも肉', '肉類'), ('豚ロース', '肉類'), ('牛もも肉', '肉類'), ('ベーコン', '肉類'),
+    ('鮭', '魚介類'), ('さば', '魚介類'), ('まぐろ', '魚介類'), ('えび', '魚介類'), ('しらす', '魚介類'),
+    ('卵', '卵類'), ('牛乳', '乳類'), ('ヨーグルト', '乳類'), ('チーズ', '乳類'), ('豆腐', '豆類'),
+    ('納豆', '豆類'), ('ブロッコリー', '野菜類'), ('キャベツ', '野菜類'), ('にんじん', '野菜類'), ('トマト', '野菜類'),
+    ('ほうれん草', '野菜類'), ('たまねぎ', '野菜類'), ('バナナ', '果実類'), ('りんご', '果実類'), ('みかん', '果実類'),
+]
+FOOD_VARIANTS = ['', '（生）', '（ゆで）', '（焼き）', '（蒸し）', '（冷凍）', '（乾）', '（缶詰）']
+MEAL_TIMINGS = ['breakfast', 'lunch', 'dinner', 'snack']
+NUTRIENTS = [
+    'calories', 'protein', 'fat', 'carbohydrates', 'dietary_fiber', 'sodium',
+    'calcium', 'iron', 'vitamin_a', 'vitamin_b1', 'vitamin_b2', 'vitamin_c',
+]
+# StandardFood / CustomFood の100gあたりのフィールド名
+PER_100G_FIELDS = {
+    'calories': 'calories_per_100g', 'protein': 'protein_per_100g', 'fat': 'fat_per_100g',
+    'carbohydrates': 'carbs_per_100g', 'dietary_fiber': 'fiber_per_100g', 'sodium': 'sodium_per_100g',
+    'calcium': 'calcium_per_100g', 'iron': 'iron_per_100g', 'vitamin_a': 'vitamin_a_per_100g',
+    'vitamin_b1': 'vitamin_b1_per_100g', 'vitamin_b2': 'vitamin_b2_per_100g', 'vitamin_c': 'vitamin_c_per_100g',
+}
+BATCH_SIZE = 1000
+
+
+@dataclass
+class DatasetSize:
+    """1ユーザー分の合成データの量"""
+    days: int = 365 * 5
+    meals_per_day: int = 3
+    items_per_meal: int = 3
+    custom_foods: int = 100
+    custom_menus: int = 50
+    items_per_menu: int = 4
+
+
+def _nutrients(rng):
+    return {
+        'calories': round(rng.uniform(20, 400), 1),
+        'protein': round(rng.uniform(0, 25), 1),
+        'fat': round(rng.uniform(0, 20), 1),
+        'carbohydrates': round(rng.uniform(0, 60), 1),
+        'dietary_fiber': round(rng.uniform(0, 5), 1),
+        'sodium': round(rng.uniform(0, 800), 1),
+        'calcium': round(rng.uniform(0, 150), 1),
+        'iron': round(rng.uniform(0, 3), 2),
+        'vitamin_a': round(rng.uniform(0, 200), 1),
+        'vitamin_b1': round(rng.uniform(0, 0.5), 2),
+        'vitamin_b2': round(rng.uniform(0, 0.5), 2),
+        'vitamin_c': round(rng.uniform(0, 60), 1),
+    }
+
+
+def _per_100g(nutrients):
+    return {PER_100G_FIELDS[key]: value for key, value in nutrients.items()}
+
+
+def _sum_nutrients(items):
+    return {key: round(sum(getattr(item, key) for item in items), 2) for key in NUTRIENTS}
+
+
+def create_standard_foods(count: int, seed: int = 0, prefix: str = 'S') -> list[StandardFood]:
+    """
+    標準食品を作成（食品番号が重複するものは作成せず既存のものを使う）
+
+    食品番号は '<prefix><連番>'（最大10文字）。
+    """
+    rng = random.Random(seed)
+    foods = []
+    for index in range(count):
+        base, category = FOOD_NAMES[index % len(FOOD_NAMES)]
+        variant = FOOD_VARIANTS[(index // len(FOOD_NAMES)) % len(FOOD_VARIANTS)]
+        suffix = index // (len(FOOD_NAMES) * len(FOOD_VARIANTS))
+        name = f'{base}{variant}' + (f' {suffix + 1}' if suffix else '')
+        foods.append(StandardFood(
+            food_number=f'{prefix}{index:05d}', name=name, category=category, **_per_100g(_nutrients(rng))
+        ))
+    StandardFood.objects.bulk_create(foods, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    return list(StandardFood.objects.filter(food_number__startswith=prefix).order_by('food_number')[:count])
+
+
+def create_user_dataset(user, size: DatasetSize, standard_foods, seed: int = 0, end_date: date | None = None) -> dict:
+    """
+    ユーザーの食事記録（アイテム付き）・体重記録・Myアイテム・Myメニュー（アイテム付き）を作成
+
+    Args:
+        standard_foods: アイテムに使う標準食品
+        end_date: 最新の記録日（既定は今日）。ここから days 日分さかのぼって作成する
+
+    Returns:
+        dict: 作成した件数
+    """
+    rng = random.Random(seed)
+    end_date = end_date or date.today()
+    foods = list(standard_foods)
+
+    def build_items(model, parent_field, parent, count):
+        items = []
+        for order in range(1, count + 1):
+            food = rng.choice(foods)
+            grams = rng.choice([50, 80, 100, 150, 200])
+            items.append(model(**{
+                parent_field: parent,
+                'item_type': 'standard', 'item_id': food.id, 'item_name': food.name,
+                'amount_grams': grams, 'display_order': order,
+                **{key: round(getattr(food, PER_100G_FIELDS[key]) * grams / 100, 2) for key in NUTRIENTS},
+            }))
+        return items
+
+    # 食事記録（日付の古い順に作成）
+    meals = []
+    for day in range(size.days - 1, -1, -1):
+        record_date = end_date - timedelta(days=day)
+        for index in range(size.meals_per_day):
+            meals.append(MealRecord(
+                user=user, record_date=record_date, meal_timing=MEAL_TIMINGS[index % len(MEAL_TIMINGS)],
+                meal_name=f'食事 {record_date.isoformat()} {index + 1}',
+            ))
+    meal_items = []
+    for meal in meals:
+        items = build_items(MealRecordItem, 'meal_record', meal, size.items_per_meal)
+        for key, value in _sum_nutrients(items).items():
+            setattr(meal, key, value)
+        meal_items.append(items)
+    # 親の主キーは bulk_create で設定され、アイテムの保存時に外部キーへ反映される
+    MealRecord.objects.bulk_create(meals, batch_size=BATCH_SIZE)
+    MealRecordItem.objects.bulk_create(
+        [item for items in meal_items for item in items], batch_size=BATCH_SIZE
+    )
+
+    WeightRecord.objects.bulk_create([
+        WeightRecord(user=user, record_date=end_date - timedelta(days=day), weight=round(rng.uniform(55, 75), 1))
+        for day in range(size.days)
+    ], batch_size=BATCH_SIZE)
+
+    CustomFood.objects.bulk_create([
+        CustomFood(user=user, name=f'Myアイテム {index + 1}', **_per_100g(_nutrients(rng)))
+        for index in range(size.custom_foods)
+    ], batch_size=BATCH_SIZE)
+
+    menus = [
+        CustomMenu(user=user, name=f'Myメニュー {index + 1}', description='')
+        for index in range(size.custom_menus)
+    ]
+    menu_items = []
+    for menu in menus:
+        items = build_items(CustomMenuItem, 'custom_menu', menu, size.items_per_menu)
+        for key, value in _sum_nutrients(items).items():
+            setattr(menu, f'total_{key}', value)
+        menu_items.append(items)
+    CustomMenu.objects.bulk_create(menus, batch_size=BATCH_SIZE)
+    CustomMenuItem.objects.bulk_create([item for items in menu_items for item in items], batch_size=BATCH_SIZE)
+
+    return {
+        'meals': len(meals),
+        'meal_items': sum(len(items) for items in meal_items),
+        'weights': size.days,
+        'custom_foods': size.custom_foods,
+        'custom_menus': len(menus),
+        'custom_menu_items': sum(len(items) for items in menu_items),
+    }
@@ -0,0 +1,95 @@
+"""
+ログ出力の負荷を下げるハンドラーとフィルター
+
+- QueueListenerHandler: ログをキューに入れるだけにして、ファイル・コンソールへの書き込みは
+  別スレッド（QueueListener）で行う。リクエストを処理するスレッドがI/Oで待たない
+- DebugSampleFilter: DEBUGのログを一定の割合だけ通す（1件ごとのデバッグログの量を抑える）
+
+settings.LOGGING から使う。
+"""
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # 停止時にキューが一杯でも、書き込みが進んで空くのを待って終了の合図を入れる
+        self.queue.put(self._sentinel)
+
+
+class QueueListenerHandler(logging.Handler):
+    """
+    キュー経由で別スレッドから handlers に書き込むハンドラー
+
+    dictConfig では handlers に 'cfg://handlers.<名前>' を並べて指定する（書き込み先の
+    ハンドラーが先に作られるよう、このハンドラーの名前はそれらより後ろの順にする）。
+
+    Python 3.12以降の dictConfig は QueueHandler のサブクラスの 'handlers' を独自に解釈して
+    cfg:// の指定を受け付けないため、QueueHandler は継承せず、記録の準備（prepare）だけ借りる。
+
+    キューが一杯のときは、WARNING未満のログは捨ててリクエストを待たせない。
+    WARNING以上は空くまで待って必ず書き込む。
+    """
+
+    # メッセージを文字列にしてからキューに入れる（引数のオブジェクトを別スレッドに渡さない）
+    prepare = QueueHandler.prepare
+
+    def __init__(self, handlers, queue_size=10000):
+        super().__init__()
+        self.queue_size = queue_size
+        # dictConfig の ConvertingList は添字で取り出したときに cfg:// をハンドラーに変換する
+        self.targets = [handlers[index] for index in range(len(handlers))]
+        self.dropped = 0
+        self.listener = None
+        self.queue = queue.Queue(queue_size)
+        self._start_listener()
+        # 書き込みスレッドはfork先（gunicorn・Celeryのワーカー）に引き継がれないため、子で作り直す
+        os.register_at_fork(after_in_child=self._restart_in_child)
+
+    def _start_listener(self):
+        self.listener = _Listener(self.queue, *self.targets, respect_handler_level=True)
+        self.listener.start()
+
+    def _restart_in_child(self):
+        if self.listener is None:
+            return
+        self.queue = queue.Queue(self.queue_size)
+        self._start_listener()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record)
+            else:
+                self.dropped += 1
+
+    def emit(self, record):
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        # キューに残ったログを書き終えてから閉じる
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        super().close()
+
+
+class DebugSampleFilter(logging.Filter):
+    """DEBUGのログを rate の割合だけ通す（INFO以上はすべて通す）"""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        return random.random() < self.rate
@@ -0,0 +1,58 @@
+import time
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from record_app.business_logic.cafeteria_scraping import CafeteriaScraper
+from record_app.business_logic.scraper_replay import FixtureAdapter
+
+
+class Command(BaseCommand):
+    help = '保存済みHTMLを使って食堂メニュー更新処理全体を実行し、フェーズごとの処理量と時間を計測します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fixtures', type=str,
+            default=str(Path(settings.BASE_DIR) / 'data' / 'cafeteria_fixtures'),
+            help='menu_load/ と detail/ を含むフィクスチャディレクトリ'
+        )
+        parser.add_argument('--latency', type=float, default=0, help='1リクエストあたりの疑似レイテンシ（ミリ秒）')
+        parser.add_argument('--rps', type=float, default=0, help='リクエスト上限（回/秒、0で無制限）')
+        parser.add_argument('--workers', type=int, default=CafeteriaScraper.MAX_WORKERS, help='並行数')
+        parser.add_argument('--runs', type=int, default=2, help='実行回数（2回目以降は詳細キャッシュが効く）')
+
+    def handle(self, *args, **options):
+        adapter = FixtureAdapter(options['fixtures'], latency=options['latency'] / 1000)
+
+        # 計測用の書き込みは最後にロールバックし、実データに影響させない
+        with transaction.atomic():
+            for run in range(1, options['runs'] + 1):
+                scraper = CafeteriaScraper(
+                    max_workers=options['workers'], requests_per_second=options['rps']
+                )
+                scraper.session.mount('https://', adapter)
+
+                start = time.perf_counter()
+                summary = scraper.fetch_and_update_menus()
+                elapsed = time.perf_counter() - start
+                self._report(run, elapsed, summary, scraper.metrics.as_dict())
+            transaction.set_rollback(True)
+
+    def _report(self, run, elapsed, summary, metrics):
+        timings = metrics['timings_ms']
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n[{run}回目] 合計 {elapsed * 1000:.1f} ms'))
+        self.stdout.write(
+            f"  メニュー: {summary['total']}件（追加 {summary['added']} / 変更 {summary['changed']} / "
+            f"削除 {summary['removed']}）"
+        )
+        for phase, label in (('category', 'カテゴリー'), ('detail', '詳細')):
+            self.stdout.write(
+                f"  {label}: リクエスト {metrics[f'{phase}_requests']}件"
+                f"（エラー: {metrics[f'{phase}_errors']}件） {metrics[f'{phase}_bytes'] / 1024:.1f} KiB"
+                f"  取得 {timings[f'{phase}_fetch']:.1f} ms  パース {timings[f'{phase}_parse']:.1f} ms"
+            )
+        self.stdout.write(
+            f"  詳細の再利用: 304 {metrics['detail_not_modified']}件 / "
+            f"内容一致 {metrics['detail_unchanged']}件 / チェックポイント {metrics['detail_checkpoint_hits']}件"
+        )
+        self.stdout.write(f"  DB書き込み: {timings['db_write']:.1f} ms")
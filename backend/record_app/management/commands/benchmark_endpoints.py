@@ -0,0 +1,121 @@
+import logging
+import statistics
+import time
+import uuid
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from rest_framework.test import APIClient
+from record_app.factories import DatasetSize, create_standard_foods, create_user_dataset
+from record_app.models import CustomMenu, MealRecord
+from record_app.performance import percentile
+
+# (名前, パス) {meal_id} / {menu_id} は作成したデータの最新の記録に置き換える
+ENDPOINTS = [
+    ('meal-records', '/api/meal-records/'),
+    ('meal-record-detail', '/api/meal-records/{meal_id}/'),
+    ('daily-summary', '/api/nutrition/daily-summary/'),
+    ('food-search', '/api/foods/search/?q=鶏むね'),
+    ('custom-menus', '/api/custom-menus/'),
+    ('custom-menu-detail', '/api/custom-menus/{menu_id}/'),
+    ('dashboard', '/api/dashboard/'),
+    ('sync', '/api/sync/'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        '大量の記録を持つユーザーの合成データを作成し、主要なAPIの応答時間（p50/p95）とクエリ数を計測します。'
+        '作成したデータは最後にロールバックします'
+    )
+
+    def add_arguments(self, parser):
+        defaults = DatasetSize()
+        parser.add_argument('--days', type=int, default=defaults.days, help='記録の日数（既定は5年分）')
+        parser.add_argument('--meals-per-day', type=int, default=defaults.meals_per_day, help='1日あたりの食事記録数')
+        parser.add_argument('--items', type=int, default=defaults.items_per_meal, help='1食あたりのアイテム数')
+        parser.add_argument('--custom-foods', type=int, default=defaults.custom_foods, help='Myアイテムの件数')
+        parser.add_argument('--custom-menus', type=int, default=defaults.custom_menus, help='Myメニューの件数')
+        parser.add_argument('--menu-items', type=int, default=defaults.items_per_menu, help='Myメニュー1件あたりのアイテム数')
+        parser.add_argument('--standard-foods', type=int, default=2000, help='作成する標準食品の件数')
+        parser.add_argument('--repeat', type=int, default=30, help='エンドポイントごとの計測回数')
+        parser.add_argument('--warmup', type=int, default=3, help='計測前の空打ちの回数')
+        parser.add_argument(
+            '--endpoint', dest='endpoints', action='append', default=None,
+            choices=[name for name, _ in ENDPOINTS], help='計測するエンドポイント（複数指定可、既定はすべて）'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='合成データの乱数シード')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat は1以上を指定してください')
+        size = DatasetSize(
+            days=options['days'], meals_per_day=options['meals_per_day'], items_per_meal=options['items'],
+            custom_foods=options['custom_foods'], custom_menus=options['custom_menus'],
+            items_per_menu=options['menu_items'],
+        )
+        selected = options['endpoints'] or [name for name, _ in ENDPOINTS]
+
+        # APIClient（testserver）からのリクエストを受け付ける
+        setup_test_environment()
+        # 大きなレスポンスは毎回遅いリクエストとして記録されるため、計測中は出力しない
+        middleware_logger = logging.getLogger('record_app.middleware')
+        previous_level = middleware_logger.level
+        middleware_logger.setLevel(logging.ERROR)
+        try:
+            self._run(size, selected, options)
+        finally:
+            middleware_logger.setLevel(previous_level)
+
+    def _run(self, size, selected, options):
+        # 合成データは最後にロールバックし、実データに影響させない
+        with transaction.atomic():
+            start = time.perf_counter()
+            user = User.objects.create_user(username=f'benchmark_{uuid.uuid4().hex[:12]}')
+            foods = create_standard_foods(options['standard_foods'], seed=options['seed'], prefix='BENCH')
+            counts = create_user_dataset(user, size, foods, seed=options['seed'])
+            self.stdout.write(
+                f"合成データ（{connection.vendor}）: 食事記録 {counts['meals']}件 / アイテム {counts['meal_items']}件 / "
+                f"体重 {counts['weights']}件 / Myアイテム {counts['custom_foods']}件 / "
+                f"Myメニュー {counts['custom_menus']}件  作成 {time.perf_counter() - start:.1f}秒"
+            )
+
+            # エラーは例外にせず、ステータスコードとして報告する
+            client = APIClient(raise_request_exception=False)
+            client.force_authenticate(user=user)
+            ids = {
+                'meal_id': MealRecord.objects.filter(user=user).order_by('-record_date').values_list('id', flat=True).first(),
+                'menu_id': CustomMenu.objects.filter(user=user).values_list('id', flat=True).first(),
+            }
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"\n{'エンドポイント':<20} {'p50':>9} {'p95':>9} {'平均':>9} {'クエリ':>6} {'サイズ':>10}"
+            ))
+            for name, path in ENDPOINTS:
+                if name in selected:
+                    self._benchmark(client, name, path.format(**ids), options)
+            transaction.set_rollback(True)
+
+    def _benchmark(self, client, name, path, options):
+        for _ in range(options['warmup']):
+            client.get(path)
+
+        latencies, query_counts = [], []
+        for _ in range(options['repeat']):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = client.get(path)
+                latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                # 例: SQLiteでは食品検索の類似度検索（pg_trgm）が使えない
+                self.stdout.write(self.style.WARNING(f'{name:<20} HTTP {response.status_code}（{path}）'))
+                return
+            query_counts.append(len(queries))
+
+        latencies.sort()
+        self.stdout.write(
+            f'{name:<20} {percentile(latencies, 50) * 1000:>7.1f}ms {percentile(latencies, 95) * 1000:>7.1f}ms '
+            f'{statistics.fmean(latencies) * 1000:>7.1f}ms {statistics.median(query_counts):>6g} '
+            f'{len(response.content) / 1024:>8.1f}KB'
+        )
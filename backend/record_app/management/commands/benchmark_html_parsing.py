@@ -0,0 +1,64 @@
+import time
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from record_app.business_logic import html_parsing
+
+
+class Command(BaseCommand):
+    help = '保存済みの食堂ページHTMLに対してパーサーごとの1ページあたりのパース時間を計測します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fixtures', type=str,
+            default=str(Path(settings.BASE_DIR) / 'data' / 'cafeteria_fixtures'),
+            help='menu_load/ と detail/ を含むフィクスチャディレクトリ'
+        )
+        parser.add_argument('--iterations', type=int, default=20, help='各ページのパース回数')
+
+    def handle(self, *args, **options):
+        fixtures = Path(options['fixtures'])
+        iterations = options['iterations']
+
+        pages = {
+            'カテゴリー': (self._load(fixtures / 'menu_load'), html_parsing.parse_menu_list),
+            '詳細': (self._load(fixtures / 'detail'), html_parsing.parse_nutrition),
+        }
+
+        parsers = ['html.parser']
+        if html_parsing.DEFAULT_PARSER != 'html.parser':
+            parsers.append(html_parsing.DEFAULT_PARSER)
+        else:
+            self.stdout.write(self.style.WARNING('lxmlが見つからないため html.parser のみ計測します'))
+
+        for label, (documents, parse) in pages.items():
+            self.stdout.write(f'{label}ページ {len(documents)}件 × {iterations}回')
+
+            # 従来の実装相当（html.parserでページ全体を構築）
+            baseline = self._measure(
+                documents, iterations, lambda html: parse(html, parser='html.parser', partial=False)
+            )
+            self.stdout.write(f'  html.parser（ページ全体） : {baseline:.3f} ms/ページ')
+
+            for parser in parsers:
+                elapsed = self._measure(
+                    documents, iterations, lambda html: parse(html, parser=parser)
+                )
+                self.stdout.write(
+                    f'  {parser}（部分パース）{"":<{12 - len(parser)}}: {elapsed:.3f} ms/ページ'
+                    f'  ({baseline / elapsed:.1f}倍)'
+                )
+
+    def _load(self, directory):
+        documents = [path.read_text(encoding='utf-8') for path in sorted(directory.glob('*.html'))]
+        if not documents:
+            raise CommandError(f'HTMLが見つかりません: {directory}')
+        return documents
+
+    def _measure(self, documents, iterations, parse):
+        """1ページあたりの平均パース時間（ミリ秒）"""
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for html in documents:
+                parse(html)
+        return (time.perf_counter() - start) * 1000 / (iterations * len(documents))
@@ -0,0 +1,83 @@
+import time
+import uuid
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_test_environment
+from rest_framework.test import APIClient
+from record_app.models import MealRecord
+
+
+class Command(BaseCommand):
+    help = '食事記録の1件ずつの登録と一括登録APIのスループット（meals/秒）を比較します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meals', type=int, default=300, help='登録する食事記録の件数')
+        parser.add_argument('--items', type=int, default=3, help='1食あたりのアイテム数')
+        parser.add_argument('--batch-size', type=int, default=100, help='一括登録1リクエストあたりの件数')
+
+    def handle(self, *args, **options):
+        meals = options['meals']
+        items = options['items']
+        batch_size = options['batch_size']
+
+        # APIClient（testserver）からのリクエストを受け付ける
+        setup_test_environment()
+
+        user = User.objects.create_user(username=f'benchmark_{uuid.uuid4().hex[:12]}')
+        try:
+            client = APIClient()
+            client.force_authenticate(user=user)
+            payloads = [self._build_meal(i, items) for i in range(meals)]
+
+            # 1件ずつ登録（既存のPOST /api/meal-records/）
+            start = time.perf_counter()
+            for payload in payloads:
+                response = client.post('/api/meal-records/', payload, format='json')
+                if response.status_code != 201:
+                    raise RuntimeError(f'登録に失敗しました: {response.status_code} {response.data}')
+            single_elapsed = time.perf_counter() - start
+
+            MealRecord.objects.filter(user=user).delete()
+
+            # 一括登録（POST /api/meal-records/bulk/）
+            start = time.perf_counter()
+            for offset in range(0, meals, batch_size):
+                response = client.post(
+                    '/api/meal-records/bulk/', payloads[offset:offset + batch_size], format='json'
+                )
+                if response.status_code != 201:
+                    raise RuntimeError(f'一括登録に失敗しました: {response.status_code} {response.data}')
+            bulk_elapsed = time.perf_counter() - start
+        finally:
+            user.delete()
+
+        single_rate = meals / single_elapsed
+        bulk_rate = meals / bulk_elapsed
+        self.stdout.write(f'食事記録 {meals}件（アイテム {items}件/食）')
+        self.stdout.write(f'  1件ずつ : {single_elapsed:.2f}秒  {single_rate:.1f} meals/秒')
+        self.stdout.write(f'  一括登録: {bulk_elapsed:.2f}秒  {bulk_rate:.1f} meals/秒（{batch_size}件/リクエスト）')
+        self.stdout.write(self.style.SUCCESS(f'一括登録は {bulk_rate / single_rate:.1f}倍 高速です。'))
+
+    def _build_meal(self, index, items):
+        timings = ['breakfast', 'lunch', 'dinner', 'snack']
+        return {
+            'record_date': (date.today() - timedelta(days=index // len(timings))).isoformat(),
+            'meal_timing': timings[index % len(timings)],
+            'meal_name': f'ベンチマーク食事{index}',
+            'calories': 600,
+            'protein': 25,
+            'fat': 20,
+            'carbohydrates': 80,
+            'items': [
+                {
+                    'item_type': 'standard',
+                    'item_id': i + 1,
+                    'item_name': f'食品{i}',
+                    'amount_grams': 100,
+                    'display_order': i,
+                    'calories': 600 / items,
+                }
+                for i in range(items)
+            ],
+        }
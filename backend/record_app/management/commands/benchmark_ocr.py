@@ -0,0 +1,134 @@
+import logging
+import statistics
+from collections import Counter, defaultdict
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from record_app.business_logic.ocr_benchmark import (
+    LABEL_NAMES, LAYOUTS, VARIANTS, CorpusReader, find_font, generate_corpus, load_corpus, run_stages, score_fields,
+)
+from record_app.business_logic.ocr_processor import NutritionOCRProcessor, OCRTimings
+from record_app.performance import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        '合成した栄養成分表示のコーパスでOCR処理を段階ごと（前処理の各処理・readtext・ブロック形成・抽出・検証）に実行し、'
+        '処理時間と項目ごとの正解率を計測します'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corpus', type=str, default=str(Path(settings.BASE_DIR) / 'data' / 'ocr_corpus'),
+            help='labels.json と画像を含むコーパスのディレクトリ'
+        )
+        parser.add_argument('--generate', type=int, default=0, help='計測の前にこの枚数のコーパスを作り直す')
+        parser.add_argument('--font', type=str, default=None, help='コーパスの描画に使う日本語フォント')
+        parser.add_argument('--seed', type=int, default=0, help='コーパスの乱数シード')
+        parser.add_argument(
+            '--reader', choices=['easyocr', 'corpus'], default='easyocr',
+            help='easyocr: 実際に文字認識する / corpus: ラベルの文字と位置を使う（readtext以外の段の計測用）'
+        )
+        parser.add_argument('--repeat', type=int, default=1, help='画像ごとの実行回数（時間は全回、正解率は初回で集計）')
+        parser.add_argument('--limit', type=int, default=0, help='計測する画像数の上限（0で全件）')
+        parser.add_argument('--show-failures', action='store_true', help='正しく読み取れなかった項目を表示する')
+
+    def handle(self, *args, **options):
+        corpus_dir = Path(options['corpus'])
+        if options['generate']:
+            try:
+                font_path = find_font(options['font'])
+            except ValueError as e:
+                raise CommandError(f'{e}（--font）')
+            generate_corpus(corpus_dir, options['generate'], font_path, seed=options['seed'])
+            self.stdout.write(f"コーパスを作成しました: {corpus_dir}（{options['generate']}枚、フォント {Path(font_path).name}）")
+
+        if not (corpus_dir / 'labels.json').is_file():
+            raise CommandError(f'{corpus_dir}/labels.json がありません。--generate で作成してください')
+        samples = load_corpus(corpus_dir)
+        if options['limit']:
+            samples = samples[:options['limit']]
+
+        # 検出した文字ごとのログ出力まで計測しないよう、計測中はWARNING以上だけにする
+        ocr_logger = logging.getLogger('record_app.business_logic.ocr_processor')
+        previous_level = ocr_logger.level
+        ocr_logger.setLevel(logging.WARNING)
+        try:
+            self._run(samples, options)
+        finally:
+            ocr_logger.setLevel(previous_level)
+
+    def _run(self, samples, options):
+        processor = NutritionOCRProcessor()
+        corpus_reader = None
+        if options['reader'] == 'corpus':
+            corpus_reader = CorpusReader()
+            processor._reader = corpus_reader
+
+        timings = defaultdict(list)
+        field_scores = defaultdict(Counter)
+        group_scores = defaultdict(Counter)
+        failures = []
+        for sample in samples:
+            for run in range(options['repeat']):
+                if corpus_reader:
+                    corpus_reader.use(sample)
+                result = run_stages(processor, sample['path'])
+                for stage in OCRTimings.STAGES:
+                    timings[stage].append(result.timings[stage])
+                timings['total'].append(sum(result.timings.values()))
+                if run:
+                    continue
+
+                scores = score_fields(sample['nutrition'], result.nutrition)
+                for nutrient, score in scores.items():
+                    field_scores[nutrient][score] += 1
+                    if score != 'correct':
+                        found = (result.nutrition or {}).get(nutrient)
+                        failures.append(f"  {sample['image']}（{sample['layout']}/{sample['variant']}）"
+                                        f"{nutrient}: 正解 {sample['nutrition'][nutrient]} / 読み取り {found}")
+                all_correct = all(score == 'correct' for score in scores.values())
+                for group in (sample['layout'], sample['variant']):
+                    group_scores[group]['samples'] += 1
+                    group_scores[group]['correct'] += all_correct
+
+        self._report_timings(timings, len(samples), options)
+        self._report_accuracy(field_scores, group_scores)
+        if options['show_failures'] and failures:
+            self.stdout.write(self.style.MIGRATE_HEADING('\n読み取れなかった項目'))
+            for line in failures:
+                self.stdout.write(line)
+
+    def _report_timings(self, timings, sample_count, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n処理時間（{sample_count}枚 × {options['repeat']}回、reader={options['reader']}）"
+        ))
+        total = sum(timings['total']) or 1
+        for stage in OCRTimings.STAGES + ('total',):
+            values = sorted(timings[stage])
+            share = '' if stage == 'total' else f'  {sum(values) / total:>5.1%}'
+            self.stdout.write(
+                f'  {stage:<16} p50 {percentile(values, 50) * 1000:>8.1f} ms  '
+                f'p95 {percentile(values, 95) * 1000:>8.1f} ms  '
+                f'平均 {statistics.fmean(values) * 1000 if values else 0:>8.1f} ms{share}'
+            )
+
+    def _report_accuracy(self, field_scores, group_scores):
+        self.stdout.write(self.style.MIGRATE_HEADING('\n項目ごとの正解率'))
+        correct = total = 0
+        for nutrient in [key for key in LABEL_NAMES if key in field_scores]:
+            scores = field_scores[nutrient]
+            count = sum(scores.values())
+            correct += scores['correct']
+            total += count
+            self.stdout.write(
+                f"  {nutrient:<14} {scores['correct'] / count:>6.1%}  "
+                f"（正解 {scores['correct']} / 誤り {scores['wrong']} / 未検出 {scores['missing']}）"
+            )
+        if total:
+            self.stdout.write(f'  {"全項目":<12} {correct / total:>6.1%}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('\n全項目を正しく読み取れた画像の割合'))
+        for group in [key for key in LAYOUTS + VARIANTS if key in group_scores]:
+            scores = group_scores[group]
+            self.stdout.write(f"  {group:<10} {scores['correct'] / scores['samples']:>6.1%}（{scores['samples']}枚）")
@@ -0,0 +1,163 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+import requests
+from record_app.performance import percentile
+
+DEFAULT_PATHS = [
+    '/api/cafeteria/list/',
+    '/api/foods/search/?q=ごはん',
+    '/api/health/',
+]
+
+# --ocr-image を指定したときに計測するシナリオ（画像を登録し、完了までロングポーリングする）
+OCR_SCENARIO = 'OCRジョブ（登録→ロングポーリング）'
+# WSGIでは wait を無視してすぐ返るため、完了していなければこの間隔（秒）を空けて確認し直す
+OCR_POLL_INTERVAL = 0.5
+
+
+class Command(BaseCommand):
+    help = (
+        '起動中のサーバーに並行してリクエストを送り、パスごとのスループットと応答時間を計測します。'
+        '--compare-url を指定すると2つのデプロイ（例: SERVER_MODE=wsgi / asgi）を並べて比較します'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', type=str, default='http://localhost:8000', help='計測するサーバー')
+        parser.add_argument('--compare-url', type=str, default=None, help='比較するサーバー（任意）')
+        parser.add_argument('--token', type=str, default=None, help='認証トークン')
+        parser.add_argument('--username', type=str, default=None, help='トークンを取得するユーザー名')
+        parser.add_argument('--password', type=str, default=None, help='トークンを取得するパスワード')
+        parser.add_argument(
+            '--path', dest='paths', action='append', default=None,
+            help='計測するパス（複数指定可、既定は食堂メニュー一覧・食品検索・ヘルスチェック）'
+        )
+        parser.add_argument('--concurrency', type=int, default=20, help='同時接続数')
+        parser.add_argument('--requests', type=int, default=200, help='パスごとのリクエスト数')
+        parser.add_argument('--timeout', type=float, default=30, help='1リクエストのタイムアウト（秒）')
+        parser.add_argument(
+            '--ocr-image', type=str, default=None,
+            help='OCRジョブの登録→ロングポーリングも計測する場合の画像（Celeryワーカーが必要）'
+        )
+        parser.add_argument('--ocr-wait', type=float, default=20, help='ロングポーリングの待ち時間（秒、最大30）')
+        parser.add_argument('--ocr-timeout', type=float, default=120, help='OCRジョブ1件の完了までの上限（秒）')
+
+    def handle(self, *args, **options):
+        paths = list(options['paths'] or DEFAULT_PATHS)
+        if options['ocr_image']:
+            image_path = Path(options['ocr_image'])
+            if not image_path.is_file():
+                raise CommandError(f'画像が見つかりません: {image_path}')
+            options['ocr_upload'] = (image_path.name, image_path.read_bytes())
+            paths.append(OCR_SCENARIO)
+        targets = [options['base_url']] + ([options['compare_url']] if options['compare_url'] else [])
+
+        results = {}
+        for base_url in targets:
+            base_url = base_url.rstrip('/')
+            headers = self._auth_headers(base_url, options)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{base_url}'))
+            results[base_url] = {}
+            for path in paths:
+                stats = self._run(base_url, path, headers, options)
+                results[base_url][path] = stats
+                self._report(path, stats)
+
+        if len(targets) == 2:
+            self._compare(paths, *(results[url.rstrip('/')] for url in targets))
+
+    def _auth_headers(self, base_url, options):
+        token = options['token']
+        if token is None and options['username']:
+            response = requests.post(
+                f'{base_url}/api/login/',
+                data={'username': options['username'], 'password': options['password'] or ''},
+                timeout=options['timeout'],
+            )
+            if response.status_code != 200:
+                raise CommandError(f'{base_url} でトークンを取得できません: HTTP {response.status_code}')
+            token = response.json()['token']
+        return {'Authorization': f'Token {token}'} if token else {}
+
+    def _run(self, base_url, path, headers, options):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=options['concurrency'], pool_maxsize=options['concurrency']
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        def fetch():
+            response = session.get(base_url + path, headers=headers, timeout=options['timeout'])
+            return response.status_code < 400
+
+        def ocr_job():
+            return self._ocr_job(session, base_url, headers, options)
+
+        scenario = ocr_job if path == OCR_SCENARIO else fetch
+
+        def request(_):
+            start = time.perf_counter()
+            try:
+                ok = scenario()
+            except requests.RequestException:
+                ok = False
+            return time.perf_counter() - start, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            samples = list(executor.map(request, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+        session.close()
+
+        latencies = sorted(latency for latency, _ in samples)
+        return {
+            'rps': len(samples) / elapsed if elapsed else 0,
+            'errors': sum(1 for _, ok in samples if not ok),
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'mean': statistics.fmean(latencies) if latencies else 0,
+        }
+
+    def _ocr_job(self, session, base_url, headers, options):
+        """画像を登録して完了までロングポーリングする（完了すれば True）"""
+        response = session.post(
+            f'{base_url}/api/ocr/jobs/', files={'image': options['ocr_upload']},
+            headers=headers, timeout=options['timeout'],
+        )
+        if response.status_code != 202:
+            return False
+        job_url = f"{base_url}/api/ocr/jobs/{response.json()['job_id']}/"
+
+        deadline = time.perf_counter() + options['ocr_timeout']
+        while time.perf_counter() < deadline:
+            response = session.get(
+                job_url, params={'wait': options['ocr_wait']}, headers=headers,
+                timeout=options['timeout'] + options['ocr_wait'],
+            )
+            if response.status_code >= 400:
+                return False
+            if response.json()['status'] == 'done':
+                return True
+            time.sleep(OCR_POLL_INTERVAL)
+        return False
+
+    def _report(self, path, stats):
+        self.stdout.write(
+            f"  {path}: {stats['rps']:.1f} req/s  エラー {stats['errors']}件  "
+            f"p50 {stats['p50'] * 1000:.1f} ms  p95 {stats['p95'] * 1000:.1f} ms  "
+            f"p99 {stats['p99'] * 1000:.1f} ms"
+        )
+
+    def _compare(self, paths, base, other):
+        self.stdout.write(self.style.MIGRATE_HEADING('\n比較（base → compare）'))
+        for path in paths:
+            a, b = base[path], other[path]
+            self.stdout.write(
+                f"  {path}: {a['rps']:.1f} → {b['rps']:.1f} req/s  "
+                f"p95 {a['p95'] * 1000:.1f} → {b['p95'] * 1000:.1f} ms  "
+                f"エラー {a['errors']} → {b['errors']}件"
+            )
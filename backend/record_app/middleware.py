@@ -0,0 +1,131 @@
+"""
+ミドルウェア
+"""
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .cache import CacheStats, request_cache_stats
+from .performance import RequestProfile, registry, request_profile
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceMiddleware:
+    """
+    リクエストごとの処理時間・クエリ数と時間・キャッシュのヒット/ミス・レスポンスサイズを
+    View名ごとに集計する（performance.registry、/api/metrics/ で出力）
+
+    PERFORMANCE_SLOW_REQUEST_MS を超えたリクエストは、時間のかかったクエリの
+    フィンガープリントとともにWARNINGで記録する。
+
+    同期・非同期の両方に対応する（ASGIでミドルウェアのチェーン全体がスレッドで実行されないように）。
+    クエリは各接続の performance.record_query が request_profile に記録する。
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profile, cache_stats, tokens = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            self.reset(tokens)
+        return self.finish(request, response, profile, cache_stats)
+
+    async def __acall__(self, request):
+        profile, cache_stats, tokens = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.reset(tokens)
+        return self.finish(request, response, profile, cache_stats)
+
+    @staticmethod
+    def start():
+        profile = RequestProfile()
+        cache_stats = CacheStats()
+        tokens = (request_profile.set(profile), request_cache_stats.set(cache_stats))
+        return profile, cache_stats, tokens
+
+    @staticmethod
+    def reset(tokens):
+        profile_token, cache_token = tokens
+        request_profile.reset(profile_token)
+        request_cache_stats.reset(cache_token)
+
+    def finish(self, request, response, profile, cache_stats):
+        profile.finish(cache_stats, 0 if response.streaming else len(response.content))
+        view = self.view_name(request)
+        slow = profile.duration * 1000 >= settings.PERFORMANCE_SLOW_REQUEST_MS
+        registry.record(view, request.method, response.status_code, profile, slow=slow)
+        if slow:
+            self.log_slow_request(request, view, response, profile)
+        return response
+
+    @staticmethod
+    def view_name(request):
+        """集計に使うView名（URLに一致しなかった場合は 'unmatched'）"""
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        return match.view_name or match.route or 'unmatched'
+
+    @staticmethod
+    def log_slow_request(request, view, response, profile):
+        queries = ''.join(
+            '\n  %d回 %.1fms %s' % (count, total * 1000, sql[:300])
+            for sql, count, total in profile.top_queries()
+        )
+        logger.warning(
+            "遅いリクエスト: %s %s view=%s status=%s %.1fms クエリ %d件 %.1fms キャッシュ %d/%d %dB%s",
+            request.method, request.path, view, response.status_code, profile.duration * 1000,
+            profile.query_count, profile.query_time * 1000,
+            profile.cache_hits, profile.cache_hits + profile.cache_misses, profile.response_bytes,
+            queries,
+        )
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware の同期・非同期両対応版
+
+    WhiteNoiseMiddleware は同期専用のため、ASGIではミドルウェアのチェーン全体がスレッドで
+    実行され、非同期Viewも async_to_sync 経由になる。静的ファイルの配信（ファイルを開く処理）
+    だけスレッドで行い、それ以外のリクエストは非同期のまま次へ渡す。
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # 開発時はリクエストごとにファイルを探す
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
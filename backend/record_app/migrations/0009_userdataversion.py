@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('record_app', '0008_custommenu_custommenuitem_mealrecorditem_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDataVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='data_version', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='ユーザー')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='バージョン')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': 'ユーザーデータバージョン',
+                'verbose_name_plural': 'ユーザーデータバージョン',
+            },
+        ),
+    ]
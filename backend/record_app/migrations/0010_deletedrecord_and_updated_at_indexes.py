@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('record_app', '0009_userdataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(choices=[('meal_record', '食事記録'), ('weight_record', '体重記録'), ('custom_food', 'Myアイテム'), ('custom_menu', 'Myメニュー')], max_length=20, verbose_name='モデル種別')),
+                ('object_id', models.BigIntegerField(verbose_name='削除されたID')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='削除日時')),
+            ],
+            options={
+                'verbose_name': '削除記録',
+                'verbose_name_plural': '削除記録',
+                'ordering': ['deleted_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='customfood',
+            index=models.Index(fields=['user', 'updated_at'], name='customfood_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='custommenu',
+            index=models.Index(fields=['user', 'updated_at'], name='custommenu_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mealrecord',
+            index=models.Index(fields=['user', 'updated_at'], name='meal_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weightrecord',
+            index=models.Index(fields=['user', 'updated_at'], name='weight_user_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='deletedrecord',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='ユーザー'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedrecord',
+            index=models.Index(fields=['user', 'deleted_at'], name='deleted_user_deleted_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedrecord',
+            index=models.Index(fields=['deleted_at'], name='deleted_deleted_at_idx'),
+        ),
+    ]
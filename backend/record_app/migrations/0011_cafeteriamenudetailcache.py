@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('record_app', '0010_deletedrecord_and_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CafeteriaMenuDetailCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('menu_id', models.CharField(max_length=20, unique=True, verbose_name='メニューID')),
+                ('etag', models.CharField(blank=True, max_length=255, verbose_name='ETag')),
+                ('last_modified', models.CharField(blank=True, max_length=64, verbose_name='Last-Modified')),
+                ('content_hash', models.CharField(max_length=64, verbose_name='内容のハッシュ(SHA-256)')),
+                ('nutrition', models.JSONField(verbose_name='栄養素')),
+                ('fetched_at', models.DateTimeField(auto_now=True, verbose_name='取得日時')),
+            ],
+            options={
+                'verbose_name': '食堂メニュー詳細キャッシュ',
+                'verbose_name_plural': '食堂メニュー詳細キャッシュ',
+            },
+        ),
+    ]
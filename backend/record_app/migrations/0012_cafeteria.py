@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+DEFAULT_SITE_ID = '650118'
+
+
+def assign_default_cafeteria(apps, schema_editor):
+    """既存の食堂メニューを既定の食堂に紐づける（詳細キャッシュは破棄）"""
+    Cafeteria = apps.get_model('record_app', 'Cafeteria')
+    CafeteriaMenu = apps.get_model('record_app', 'CafeteriaMenu')
+    CafeteriaMenuDetailCache = apps.get_model('record_app', 'CafeteriaMenuDetailCache')
+
+    cafeteria, _ = Cafeteria.objects.get_or_create(
+        site_id=DEFAULT_SITE_ID, defaults={'name': '既定の食堂'}
+    )
+    CafeteriaMenu.objects.filter(cafeteria__isnull=True).update(cafeteria=cafeteria)
+    CafeteriaMenuDetailCache.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('record_app', '0011_cafeteriamenudetailcache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cafeteria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('site_id', models.CharField(max_length=20, unique=True, verbose_name='サイトID')),
+                ('name', models.CharField(max_length=100, verbose_name='食堂名')),
+                ('is_active', models.BooleanField(default=True, verbose_name='更新対象')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+            ],
+            options={
+                'verbose_name': '食堂',
+                'verbose_name_plural': '食堂',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='cafeteriamenu',
+            name='cafeteria',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='menus', to='record_app.cafeteria', verbose_name='食堂'),
+        ),
+        migrations.RunPython(assign_default_cafeteria, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:31
+
+import django.db.models.deletion
+import record_app.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    データ移行（0012）と同じトランザクションでテーブル定義を変更すると
+    PostgreSQLで保留中のトリガーイベントと衝突するため、別マイグレーションに分ける。
+    """
+
+    dependencies = [
+        ('record_app', '0012_cafeteria'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cafeteriamenu',
+            name='cafeteria',
+            field=models.ForeignKey(default=record_app.models.default_cafeteria_id, on_delete=django.db.models.deletion.CASCADE, related_name='menus', to='record_app.cafeteria', verbose_name='食堂'),
+        ),
+        migrations.AddField(
+            model_name='cafeteriamenudetailcache',
+            name='cafeteria',
+            field=models.ForeignKey(default=None, on_delete=django.db.models.deletion.CASCADE, to='record_app.cafeteria', verbose_name='食堂'),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='cafeteriamenu',
+            name='menu_id',
+            field=models.CharField(max_length=20, verbose_name='メニューID'),
+        ),
+        migrations.AlterField(
+            model_name='cafeteriamenudetailcache',
+            name='menu_id',
+            field=models.CharField(max_length=20, verbose_name='メニューID'),
+        ),
+        migrations.AddIndex(
+            model_name='cafeteriamenu',
+            index=models.Index(fields=['cafeteria', 'category', 'name'], name='cafeteria_site_cat_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cafeteriamenu',
+            constraint=models.UniqueConstraint(fields=('cafeteria', 'menu_id'), name='cafeteria_menu_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='cafeteriamenudetailcache',
+            constraint=models.UniqueConstraint(fields=('cafeteria', 'menu_id'), name='cafeteria_detail_cache_unique'),
+        ),
+    ]
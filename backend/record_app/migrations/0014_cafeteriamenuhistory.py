@@ -0,0 +1,71 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+NUTRITION_FIELDS = [
+    'calories', 'protein', 'fat', 'carbohydrates', 'dietary_fiber', 'sodium',
+    'calcium', 'iron', 'vitamin_a', 'vitamin_b1', 'vitamin_b2', 'vitamin_c',
+]
+
+
+def backfill_open_history(apps, schema_editor):
+    """既存の食堂メニューを最終更新日から提供中の履歴として登録"""
+    CafeteriaMenu = apps.get_model('record_app', 'CafeteriaMenu')
+    CafeteriaMenuHistory = apps.get_model('record_app', 'CafeteriaMenuHistory')
+
+    CafeteriaMenuHistory.objects.bulk_create([
+        CafeteriaMenuHistory(
+            cafeteria_id=menu.cafeteria_id,
+            menu_id=menu.menu_id,
+            name=menu.name,
+            category=menu.category,
+            valid_from=timezone.localtime(menu.updated_at).date(),
+            **{field: getattr(menu, field) for field in NUTRITION_FIELDS},
+        )
+        for menu in CafeteriaMenu.objects.iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('record_app', '0013_cafeteria_menu_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CafeteriaMenuHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('menu_id', models.CharField(max_length=20, verbose_name='メニューID')),
+                ('name', models.CharField(max_length=200, verbose_name='メニュー名')),
+                ('category', models.CharField(choices=[('main', '主菜'), ('side', '副菜'), ('noodle', '麺類'), ('rice', '丼・カレー'), ('dessert', 'デザート'), ('order', 'オーダー'), ('kebab', 'ケバブ＆ベジタリアン'), ('parfait', 'パフェ'), ('night', '夜限定'), ('other', 'その他')], max_length=20, verbose_name='カテゴリー')),
+                ('calories', models.FloatField(verbose_name='エネルギー(kcal)')),
+                ('protein', models.FloatField(verbose_name='タンパク質(g)')),
+                ('fat', models.FloatField(verbose_name='脂質(g)')),
+                ('carbohydrates', models.FloatField(verbose_name='炭水化物(g)')),
+                ('dietary_fiber', models.FloatField(default=0, verbose_name='食物繊維(g)')),
+                ('sodium', models.FloatField(default=0, verbose_name='食塩相当量(g)')),
+                ('calcium', models.FloatField(default=0, verbose_name='カルシウム(mg)')),
+                ('iron', models.FloatField(default=0, verbose_name='鉄(mg)')),
+                ('vitamin_a', models.FloatField(default=0, verbose_name='ビタミンA(μg)')),
+                ('vitamin_b1', models.FloatField(default=0, verbose_name='ビタミンB1(mg)')),
+                ('vitamin_b2', models.FloatField(default=0, verbose_name='ビタミンB2(mg)')),
+                ('vitamin_c', models.FloatField(default=0, verbose_name='ビタミンC(mg)')),
+                ('valid_from', models.DateField(verbose_name='提供開始日')),
+                ('valid_to', models.DateField(blank=True, null=True, verbose_name='提供終了日（この日を含まない）')),
+                ('cafeteria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='menu_history', to='record_app.cafeteria', verbose_name='食堂')),
+            ],
+            options={
+                'verbose_name': '食堂メニュー履歴',
+                'verbose_name_plural': '食堂メニュー履歴',
+                'ordering': ['cafeteria', 'menu_id', 'valid_from'],
+                'indexes': [models.Index(fields=['cafeteria', 'valid_from', 'valid_to'], name='cafeteria_history_period_idx'), models.Index(fields=['valid_from', 'valid_to'], name='history_period_idx'), models.Index(fields=['cafeteria', 'menu_id', 'valid_from'], name='cafeteria_history_menu_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('valid_to__isnull', True)), fields=('cafeteria', 'menu_id'), name='cafeteria_history_open_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_open_history, migrations.RunPython.noop),
+    ]
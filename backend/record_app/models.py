@@ -1,7 +1,9 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
 from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from datetime import date
 
 
@@ -49,6 +51,7 @@ class MealRecord(models.Model):
             models.Index(fields=['user', 'record_date'], name='meal_user_date_idx'),
             models.Index(fields=['user', 'meal_timing'], name='meal_user_timing_idx'),
             models.Index(fields=['-created_at'], name='meal_created_desc_idx'),
+            models.Index(fields=['user', 'updated_at'], name='meal_user_updated_idx'),
         ]
         ordering = ['-record_date', '-created_at']
 
@@ -141,6 +144,7 @@ class WeightRecord(models.Model):
         indexes = [
             models.Index(fields=['user', 'record_date'], name='weight_user_date_idx'),
             models.Index(fields=['user', '-record_date'], name='weight_user_date_desc_idx'),
+            models.Index(fields=['user', 'updated_at'], name='weight_user_updated_idx'),
         ]
         ordering = ['-record_date']
 
@@ -213,10 +217,46 @@ class CustomFood(models.Model):
         indexes = [
             models.Index(fields=['user', 'name'], name='customfood_user_name_idx'),
             models.Index(fields=['user'], name='customfood_user_idx'),
+            models.Index(fields=['user', 'updated_at'], name='customfood_user_updated_idx'),
         ]
         ordering = ['user', 'name']
 
 
+class Cafeteria(models.Model):
+    """
+    スクレイピング対象の食堂（生協サイトの店舗）
+
+    site_id は west2-univ.jp の各ページに付く t パラメータ。
+    """
+
+    DEFAULT_SITE_ID = '650118'
+
+    site_id = models.CharField(max_length=20, unique=True, verbose_name='サイトID')
+    name = models.CharField(max_length=100, verbose_name='食堂名')
+    is_active = models.BooleanField(default=True, verbose_name='更新対象')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='作成日時')
+
+    class Meta:
+        verbose_name = '食堂'
+        verbose_name_plural = '食堂'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.name} ({self.site_id})"
+
+    @classmethod
+    def get_default(cls):
+        """既定の食堂（初期から対象にしていた店舗）を取得、なければ作成"""
+        cafeteria, _ = cls.objects.get_or_create(
+            site_id=cls.DEFAULT_SITE_ID, defaults={'name': '既定の食堂'}
+        )
+        return cafeteria
+
+
+def default_cafeteria_id():
+    return Cafeteria.get_default().pk
+
+
 class CafeteriaMenu(models.Model):
     """食堂メニュー情報"""
     
@@ -233,7 +273,11 @@ class CafeteriaMenu(models.Model):
         ('other', 'その他'),
     ]
     
-    menu_id = models.CharField(max_length=20, unique=True, verbose_name='メニューID')
+    cafeteria = models.ForeignKey(
+        Cafeteria, on_delete=models.CASCADE, related_name='menus',
+        default=default_cafeteria_id, verbose_name='食堂'
+    )
+    menu_id = models.CharField(max_length=20, verbose_name='メニューID')
     name = models.CharField(max_length=200, verbose_name='メニュー名', db_index=True)
     category = models.CharField(max_length=20, choices=MENU_CATEGORY, verbose_name='カテゴリー', db_index=True)
     
@@ -257,15 +301,109 @@ class CafeteriaMenu(models.Model):
         verbose_name = '食堂メニュー'
         verbose_name_plural = '食堂メニュー'
         ordering = ['category', 'name']
+        constraints = [
+            models.UniqueConstraint(fields=['cafeteria', 'menu_id'], name='cafeteria_menu_unique'),
+        ]
         indexes = [
             models.Index(fields=['category'], name='cafeteria_category_idx'),
             models.Index(fields=['category', 'name'], name='cafeteria_cat_name_idx'),
+            models.Index(fields=['cafeteria', 'category', 'name'], name='cafeteria_site_cat_name_idx'),
             models.Index(fields=['updated_at'], name='cafeteria_updated_idx'),
         ]
     
     def __str__(self):
         return f"{self.get_category_display()} - {self.name}"
 
+
+class CafeteriaMenuHistory(models.Model):
+    """
+    食堂メニューの提供履歴（追記のみ）
+
+    メニューの内容ごとに提供期間 [valid_from, valid_to) を持つ。valid_to が
+    NULL の行が現在提供中の内容。スクレイピングで追加・変更・削除された
+    メニューの分だけ行を追加・終了させる。
+    """
+
+    cafeteria = models.ForeignKey(Cafeteria, on_delete=models.CASCADE, related_name='menu_history', verbose_name='食堂')
+    menu_id = models.CharField(max_length=20, verbose_name='メニューID')
+    name = models.CharField(max_length=200, verbose_name='メニュー名')
+    category = models.CharField(max_length=20, choices=CafeteriaMenu.MENU_CATEGORY, verbose_name='カテゴリー')
+
+    # 栄養成分（提供時点のスナップショット）
+    calories = models.FloatField(verbose_name='エネルギー(kcal)')
+    protein = models.FloatField(verbose_name='タンパク質(g)')
+    fat = models.FloatField(verbose_name='脂質(g)')
+    carbohydrates = models.FloatField(verbose_name='炭水化物(g)')
+    dietary_fiber = models.FloatField(default=0, verbose_name='食物繊維(g)')
+    sodium = models.FloatField(default=0, verbose_name='食塩相当量(g)')
+    calcium = models.FloatField(default=0, verbose_name='カルシウム(mg)')
+    iron = models.FloatField(default=0, verbose_name='鉄(mg)')
+    vitamin_a = models.FloatField(default=0, verbose_name='ビタミンA(μg)')
+    vitamin_b1 = models.FloatField(default=0, verbose_name='ビタミンB1(mg)')
+    vitamin_b2 = models.FloatField(default=0, verbose_name='ビタミンB2(mg)')
+    vitamin_c = models.FloatField(default=0, verbose_name='ビタミンC(mg)')
+
+    valid_from = models.DateField(verbose_name='提供開始日')
+    valid_to = models.DateField(null=True, blank=True, verbose_name='提供終了日（この日を含まない）')
+
+    class Meta:
+        verbose_name = '食堂メニュー履歴'
+        verbose_name_plural = '食堂メニュー履歴'
+        ordering = ['cafeteria', 'menu_id', 'valid_from']
+        constraints = [
+            # 1メニューにつき提供中の行は1つだけ
+            models.UniqueConstraint(
+                fields=['cafeteria', 'menu_id'], condition=models.Q(valid_to__isnull=True),
+                name='cafeteria_history_open_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['cafeteria', 'valid_from', 'valid_to'], name='cafeteria_history_period_idx'),
+            models.Index(fields=['valid_from', 'valid_to'], name='history_period_idx'),
+            models.Index(fields=['cafeteria', 'menu_id', 'valid_from'], name='cafeteria_history_menu_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.valid_from} - {self.valid_to or ''})"
+
+    @classmethod
+    def available_on(cls, target_date, cafeteria_id=None):
+        """指定日に提供されていたメニューの履歴行"""
+        history = cls.objects.filter(valid_from__lte=target_date).filter(
+            models.Q(valid_to__isnull=True) | models.Q(valid_to__gt=target_date)
+        )
+        if cafeteria_id is not None:
+            history = history.filter(cafeteria_id=cafeteria_id)
+        return history
+
+
+class CafeteriaMenuDetailCache(models.Model):
+    """
+    食堂メニュー詳細ページの取得キャッシュ
+
+    スクレイピング時に条件付きリクエスト（If-None-Match / If-Modified-Since）を送り、
+    ページ内容が変わっていなければ前回パースした栄養素をそのまま使う。
+    """
+
+    cafeteria = models.ForeignKey(Cafeteria, on_delete=models.CASCADE, verbose_name='食堂')
+    menu_id = models.CharField(max_length=20, verbose_name='メニューID')
+    etag = models.CharField(max_length=255, blank=True, verbose_name='ETag')
+    last_modified = models.CharField(max_length=64, blank=True, verbose_name='Last-Modified')
+    content_hash = models.CharField(max_length=64, verbose_name='内容のハッシュ(SHA-256)')
+    nutrition = models.JSONField(verbose_name='栄養素')
+    fetched_at = models.DateTimeField(auto_now=True, verbose_name='取得日時')
+
+    class Meta:
+        verbose_name = '食堂メニュー詳細キャッシュ'
+        verbose_name_plural = '食堂メニュー詳細キャッシュ'
+        constraints = [
+            models.UniqueConstraint(fields=['cafeteria', 'menu_id'], name='cafeteria_detail_cache_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.menu_id} ({self.fetched_at})"
+
+
 class CustomMenu(models.Model):
     """ユーザーが追加した再利用可能なメニューテンプレート"""
     
@@ -297,6 +435,7 @@ class CustomMenu(models.Model):
         indexes = [
             models.Index(fields=['user', 'name'], name='custommenu_user_name_idx'),
             models.Index(fields=['user', '-created_at'], name='custommenu_user_created_idx'),
+            models.Index(fields=['user', 'updated_at'], name='custommenu_user_updated_idx'),
         ]
     
     def __str__(self):
@@ -373,4 +512,83 @@ class CustomMenuItem(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.custom_menu.name} - {self.item_name}"
\ No newline at end of file
+        return f"{self.custom_menu.name} - {self.item_name}"
+
+
+class UserDataVersion(models.Model):
+    """
+    ユーザーデータの変更バージョン
+    
+    食事記録・体重記録・Myアイテム・Myメニューへの書き込みのたびに加算され、
+    条件付きGET（ETag / Last-Modified）の判定に使用する。
+    判定はこの1行の参照のみで行い、各データのテーブルには触れない。
+    """
+    
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='data_version',
+        verbose_name='ユーザー'
+    )
+    version = models.PositiveBigIntegerField(default=0, verbose_name='バージョン')
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name='更新日時')
+    
+    class Meta:
+        verbose_name = 'ユーザーデータバージョン'
+        verbose_name_plural = 'ユーザーデータバージョン'
+    
+    def __str__(self):
+        return f"{self.user_id} - v{self.version}"
+    
+    @classmethod
+    def get_for_user(cls, user):
+        """現在のバージョンを取得（未作成の場合は作成）"""
+        data_version, _ = cls.objects.get_or_create(user_id=user.pk)
+        return data_version
+    
+    @classmethod
+    def bump(cls, user_id):
+        """
+        バージョンを加算
+        
+        行がまだ存在しない場合は何もしない。行は最初の条件付きGETで作成されるため、
+        クライアントがETagを保持している時点で必ず行は存在する。
+        """
+        cls.objects.filter(user_id=user_id).update(
+            version=F('version') + 1,
+            updated_at=timezone.now()
+        )
+
+
+class DeletedRecord(models.Model):
+    """
+    削除されたユーザーデータの記録（差分同期用のトゥームストーン）
+    
+    オフライン対応クライアントが前回同期以降に削除された行を
+    把握できるよう、削除時にモデル種別とIDを記録する。
+    """
+    
+    MODEL_CHOICES = [
+        ('meal_record', '食事記録'),
+        ('weight_record', '体重記録'),
+        ('custom_food', 'Myアイテム'),
+        ('custom_menu', 'Myメニュー'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='ユーザー')
+    model_name = models.CharField(max_length=20, choices=MODEL_CHOICES, verbose_name='モデル種別')
+    object_id = models.BigIntegerField(verbose_name='削除されたID')
+    deleted_at = models.DateTimeField(default=timezone.now, verbose_name='削除日時')
+    
+    class Meta:
+        verbose_name = '削除記録'
+        verbose_name_plural = '削除記録'
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='deleted_user_deleted_at_idx'),
+            models.Index(fields=['deleted_at'], name='deleted_deleted_at_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.model_name}:{self.object_id}"
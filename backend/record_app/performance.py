@@ -0,0 +1,319 @@
+"""
+リクエスト単位の性能計測
+
+- RequestProfile: 1リクエストの処理時間・ORMのクエリ数と時間・キャッシュのヒット/ミス・
+  レスポンスサイズ
+- record_query: すべてのDB接続に入れる execute_wrapper。計測中のリクエスト（request_profile）の
+  RequestProfile にクエリを記録する
+- fingerprint_sql: 値を除いたSQLの形（遅いリクエストのログで同じクエリをまとめる）
+- MetricsRegistry: View名ごとの累計。Prometheusのテキスト形式で出力する
+- percentile: 計測値のパーセンタイル（ベンチマーク・負荷試験のコマンドで使う）
+
+集計はプロセスごと（gunicornのワーカーごと）に行い、各プロセスはバックグラウンドの
+スレッドで累計を定期的に共有キャッシュ（Redis）に保存する（リクエストの処理中には
+共有キャッシュに書き込まないため、Redisの障害でリクエストが止まらない）。/api/metrics/ はどのワーカーが応答しても全ワーカーの
+累計を worker ラベル（ホスト名:プロセスID）付きで出力するため、Prometheus側で
+sum by (view) すれば全体の値になる。
+"""
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.core.cache import cache
+
+from .cache import build_key
+
+logger = logging.getLogger(__name__)
+
+# 処理時間のヒストグラムの区切り（秒）
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST_RE = re.compile(r'\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint_sql(sql: str) -> str:
+    """
+    SQLから値を除いた形を返す
+
+    文字列・数値のリテラルは ? に置き換え、IN (...) の要素数の違いはまとめる。
+    """
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_LIST_RE.sub('(...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+def percentile(values, percent):
+    """昇順に並べた値の percent パーセンタイル（最近順位法、空なら0）"""
+    if not values:
+        return 0
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+class RequestProfile:
+    """1リクエスト分の計測値"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.duration = 0.0
+        self.query_count = 0
+        self.query_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.response_bytes = 0
+        # フィンガープリント -> [回数, 合計時間]
+        self.queries = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper に渡すラッパー"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.query_count += 1
+            self.query_time += elapsed
+            entry = self.queries[fingerprint_sql(sql)]
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def finish(self, cache_stats=None, response_bytes=0):
+        self.duration = time.perf_counter() - self.started_at
+        if cache_stats is not None:
+            self.cache_hits = cache_stats.hits
+            self.cache_misses = cache_stats.misses
+        self.response_bytes = response_bytes
+
+    def top_queries(self, limit=5):
+        """合計時間の長い順のクエリ [(フィンガープリント, 回数, 合計時間), ...]"""
+        ranked = sorted(self.queries.items(), key=lambda item: item[1][1], reverse=True)
+        return [(sql, count, total) for sql, (count, total) in ranked[:limit]]
+
+
+# 計測中のリクエストの RequestProfile（計測していなければNone）
+# コンテキスト変数のため、非同期Viewが sync_to_async で別スレッドから実行するクエリも同じリクエストに記録される
+request_profile: ContextVar[RequestProfile | None] = ContextVar('request_profile', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """すべてのDB接続に入れる execute_wrapper（計測中でなければそのまま実行する）"""
+    profile = request_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    接続の作成時に record_query を入れる（connection_created シグナル）
+
+    connection.execute_wrapper はスレッドごとの接続にしか効かないため、リクエストごとではなく
+    接続ごとに常に入れておく。
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def worker_id() -> str:
+    """メトリクスの worker ラベル（fork後のワーカーごとに異なる）"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class MetricsRegistry:
+    """
+    View名・メソッド・ステータスごとの累計
+
+    スレッド間で共有するため、更新と出力はロックの中で行う。
+    累計は最初の記録時に起動するスレッドが PUBLISH_INTERVAL 秒に1回、
+    前回から変化があれば共有キャッシュに保存する（publish()）。
+    """
+
+    COUNTERS = (
+        ('db_queries', 'ORMのクエリ数'),
+        ('db_query_seconds', 'ORMのクエリ時間（秒）'),
+        ('cache_hits', 'キャッシュのヒット数'),
+        ('cache_misses', 'キャッシュのミス数'),
+        ('response_bytes', 'レスポンスの大きさ（バイト）'),
+        ('slow_requests', '遅いリクエスト数'),
+    )
+
+    # 共有キャッシュに保存する間隔と保持時間（秒）。リクエストのないワーカーは保存しないため、
+    # 保持時間は長めにする（停止したワーカーの累計も保持時間の間は出力される）
+    PUBLISH_INTERVAL = 5
+    SNAPSHOT_TTL = 60 * 60
+    SNAPSHOT_PREFIX = 'metrics_snapshot'
+    WORKERS_KEY = 'metrics_workers'
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = defaultdict(int)
+            self._durations = {}
+            self._counters = defaultdict(lambda: defaultdict(float))
+            self._dirty = False
+            self._publisher_pid = None
+
+    def record(self, view, method, status_code, profile, slow=False):
+        with self._lock:
+            self._requests[(view, method, f'{status_code // 100}xx')] += 1
+
+            histogram = self._durations.setdefault(view, {
+                'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0
+            })
+            for index, bound in enumerate(self.buckets):
+                if profile.duration <= bound:
+                    histogram['buckets'][index] += 1
+            histogram['sum'] += profile.duration
+            histogram['count'] += 1
+
+            counters = self._counters[view]
+            counters['db_queries'] += profile.query_count
+            counters['db_query_seconds'] += profile.query_time
+            counters['cache_hits'] += profile.cache_hits
+            counters['cache_misses'] += profile.cache_misses
+            counters['response_bytes'] += profile.response_bytes
+            counters['slow_requests'] += 1 if slow else 0
+            self._dirty = True
+        self._start_publisher()
+
+    def _start_publisher(self):
+        """共有キャッシュに保存するスレッドを起動（fork後のワーカーでは起動し直す）"""
+        pid = os.getpid()
+        if self._publisher_pid == pid:
+            return
+        with self._lock:
+            if self._publisher_pid == pid:
+                return
+            self._publisher_pid = pid
+        threading.Thread(target=self._publish_loop, name='metrics-publisher', daemon=True).start()
+
+    def _publish_loop(self):
+        while True:
+            time.sleep(self.PUBLISH_INTERVAL)
+            self.publish()
+
+    def snapshot(self):
+        """このプロセスの累計（共有キャッシュに保存する形）"""
+        with self._lock:
+            return {
+                'requests': [[*key, count] for key, count in self._requests.items()],
+                'durations': {
+                    view: {**histogram, 'buckets': list(histogram['buckets'])}
+                    for view, histogram in self._durations.items()
+                },
+                'counters': {view: dict(counters) for view, counters in self._counters.items()},
+            }
+
+    def publish(self, force=False):
+        """
+        累計を共有キャッシュに保存（前回の保存から記録がなければ何もしない）
+
+        共有キャッシュへの接続を待つため、リクエストの処理中には呼ばない。
+        """
+        with self._lock:
+            if not (force or self._dirty):
+                return
+            self._dirty = False
+
+        worker = worker_id()
+        try:
+            cache.set(build_key(self.SNAPSHOT_PREFIX, worker), self.snapshot(), self.SNAPSHOT_TTL)
+            # ワーカーの一覧（ワーカー → 最後に登録した時刻）。同時に書き込んで登録が失われても、
+            # 次の保存時に登録し直す
+            workers = cache.get(self.WORKERS_KEY) or {}
+            now = time.time()
+            if now - workers.get(worker, 0) >= self.SNAPSHOT_TTL / 2:
+                workers = {
+                    name: seen for name, seen in workers.items() if now - seen < self.SNAPSHOT_TTL
+                }
+                workers[worker] = now
+                cache.set(self.WORKERS_KEY, workers, None)
+        except Exception as e:
+            with self._lock:
+                self._dirty = True
+            logger.warning("メトリクスを共有キャッシュに保存できません: %s", e)
+
+    def collect(self):
+        """
+        全ワーカーの累計 {worker: snapshot}
+
+        このプロセスの値は最新の累計を使う。共有キャッシュに接続できなければ、このプロセスの値のみ。
+        """
+        worker = worker_id()
+        snapshots = {}
+        try:
+            workers = cache.get(self.WORKERS_KEY) or {}
+            keys = {build_key(self.SNAPSHOT_PREFIX, name): name for name in workers if name != worker}
+            snapshots = {keys[key]: snapshot for key, snapshot in cache.get_many(list(keys)).items()}
+        except Exception as e:
+            logger.warning("他のワーカーのメトリクスを取得できません: %s", e)
+        snapshots[worker] = self.snapshot()
+        return snapshots
+
+    def render_prometheus(self, prefix='dishboard', gauges=None, snapshots=None):
+        """
+        Prometheusのテキスト形式で出力
+
+        Args:
+            gauges: このプロセスについて追加で出力するゲージ {名前: (説明, 値)}
+            snapshots: 出力するワーカーごとの累計 {worker: snapshot}（省略時はこのプロセスのみ）
+        """
+        if snapshots is None:
+            snapshots = {worker_id(): self.snapshot()}
+        workers = [(_label_value(name), snapshots[name]) for name in sorted(snapshots)]
+        lines = []
+
+        name = f'{prefix}_requests_total'
+        lines += [f'# HELP {name} リクエスト数', f'# TYPE {name} counter']
+        for worker, snapshot in workers:
+            for view, method, status_class, count in sorted(snapshot['requests']):
+                labels = f'view="{_label_value(view)}",method="{method}",status="{status_class}",worker="{worker}"'
+                lines.append(f'{name}{{{labels}}} {count}')
+
+        name = f'{prefix}_request_duration_seconds'
+        lines += [f'# HELP {name} リクエストの処理時間（秒）', f'# TYPE {name} histogram']
+        for worker, snapshot in workers:
+            for view, histogram in sorted(snapshot['durations'].items()):
+                labels = f'view="{_label_value(view)}",worker="{worker}"'
+                for bound, count in zip(self.buckets, histogram['buckets']):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+                lines.append(f'{name}_sum{{{labels}}} {histogram["sum"]:.6f}')
+                lines.append(f'{name}_count{{{labels}}} {histogram["count"]}')
+
+        for counter, description in self.COUNTERS:
+            name = f'{prefix}_{counter}_total'
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+            for worker, snapshot in workers:
+                for view, counters in sorted(snapshot['counters'].items()):
+                    value = counters.get(counter, 0)
+                    value = f'{value:.6f}' if counter == 'db_query_seconds' else f'{int(value)}'
+                    lines.append(f'{name}{{view="{_label_value(view)}",worker="{worker}"}} {value}')
+
+        worker = _label_value(worker_id())
+        for gauge, (description, value) in (gauges or {}).items():
+            name = f'{prefix}_{gauge}'
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} gauge', f'{name}{{worker="{worker}"}} {value}']
+
+        return '\n'.join(lines) + '\n'
+
+
+def _label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# プロセス内で共有するレジストリ
+registry = MetricsRegistry()
@@ -0,0 +1,34 @@
+"""
+APIレスポンスのユーティリティ
+"""
+import json
+
+from rest_framework.response import Response
+
+
+class PreRenderedJSONResponse(Response):
+    """
+    エンコード済みのJSONバイト列をそのまま返すレスポンス
+
+    レンダラーによる再シリアライズを行わない。.data は参照時にデコードするため、
+    テストなど従来のResponseと同じように扱える。
+    """
+
+    def __init__(self, content: bytes, **kwargs):
+        super().__init__(**kwargs)
+        self.prerendered_content = content
+
+    @property
+    def data(self):
+        if self._data is None and getattr(self, 'prerendered_content', None) is not None:
+            self._data = json.loads(self.prerendered_content)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def rendered_content(self):
+        self['Content-Type'] = 'application/json'
+        return self.prerendered_content
@@ -1,7 +1,23 @@
 from rest_framework import serializers
-from .models import MealRecord, MealRecordItem, CustomMenu, CustomMenuItem, StandardFood, CustomFood, WeightRecord, CafeteriaMenu
+from .models import MealRecord, MealRecordItem, CustomMenu, CustomMenuItem, StandardFood, CustomFood, WeightRecord, Cafeteria, CafeteriaMenu, CafeteriaMenuHistory
 from django.contrib.auth.models import User
 from django.db import transaction
+from .business_logic.item_diff import ItemDiff
+
+
+def _apply_items_diff(model, parent_field, instance, items_data):
+    """アイテムを差分更新し、不正なアイテムidは検証エラーとして返す"""
+    try:
+        diff = ItemDiff.plan(model, parent_field, instance, list(instance.items.all()), items_data)
+    except ValueError as e:
+        raise serializers.ValidationError({'items': [str(e)]})
+    diff.apply(model)
+    return diff
+
+
+def _without_id(item_data):
+    """新規作成用にアイテムのidを除外する"""
+    return {key: value for key, value in item_data.items() if key != 'id'}
 
 class CustomFoodSerializer(serializers.ModelSerializer):
     class Meta:
@@ -37,6 +53,12 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(**validated_data)
         return user
 
+class CafeteriaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Cafeteria
+        fields = ['id', 'site_id', 'name']
+
+
 class CafeteriaMenuSerializer(serializers.ModelSerializer):
     category_display = serializers.CharField(source='get_category_display', read_only=True)
     
@@ -45,7 +67,18 @@ class CafeteriaMenuSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class CafeteriaMenuHistorySerializer(serializers.ModelSerializer):
+    category_display = serializers.CharField(source='get_category_display', read_only=True)
+    
+    class Meta:
+        model = CafeteriaMenuHistory
+        fields = '__all__'
+
+
 class MealRecordItemSerializer(serializers.ModelSerializer):
+    # 更新時に既存アイテムと対応付けるため、idは任意で受け付ける
+    id = serializers.IntegerField(required=False)
+    
     class Meta:
         model = MealRecordItem
         fields = [
@@ -80,7 +113,7 @@ class MealRecordSerializer(serializers.ModelSerializer):
         
         if items_data:
             MealRecordItem.objects.bulk_create([
-                MealRecordItem(meal_record=meal_record, **item_data)
+                MealRecordItem(meal_record=meal_record, **_without_id(item_data))
                 for item_data in items_data
             ])
         
@@ -95,15 +128,36 @@ class MealRecordSerializer(serializers.ModelSerializer):
         instance.save()
         
         if items_data is not None:
-            instance.items.all().delete()
-            if items_data:
-                MealRecordItem.objects.bulk_create([
-                    MealRecordItem(meal_record=instance, **item_data)
-                    for item_data in items_data
-                ])
+            _apply_items_diff(MealRecordItem, 'meal_record', instance, items_data)
         
         return instance
 
+class MealRecordBulkListSerializer(serializers.ListSerializer):
+    """食事記録の一括登録リクエスト全体の検証"""
+    
+    def validate(self, attrs):
+        ids = [meal['id'] for meal in attrs if 'id' in meal]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("同じidの食事記録が重複しています")
+        return attrs
+
+
+class MealRecordBulkSerializer(MealRecordSerializer):
+    """
+    一括登録・更新用の食事記録シリアライザ
+    
+    idを指定した要素は既存記録の更新、省略した要素は新規作成として扱う。
+    保存はMealService.bulk_save_mealsで行う。
+    """
+    MAX_BULK_SIZE = 500
+    
+    id = serializers.IntegerField(required=False)
+    
+    class Meta(MealRecordSerializer.Meta):
+        read_only_fields = ['user', 'created_at', 'updated_at']
+        list_serializer_class = MealRecordBulkListSerializer
+
+
 class MealRecordListSerializer(serializers.ModelSerializer):
     items_count = serializers.SerializerMethodField()
     
@@ -120,6 +174,9 @@ class MealRecordListSerializer(serializers.ModelSerializer):
 
 
 class CustomMenuItemSerializer(serializers.ModelSerializer):
+    # 更新時に既存アイテムと対応付けるため、idは任意で受け付ける
+    id = serializers.IntegerField(required=False)
+    
     class Meta:
         model = CustomMenuItem
         fields = '__all__'
@@ -149,7 +206,7 @@ class CustomMenuSerializer(serializers.ModelSerializer):
         custom_menu = CustomMenu.objects.create(**validated_data)
         
         CustomMenuItem.objects.bulk_create([
-            CustomMenuItem(custom_menu=custom_menu, **item_data)
+            CustomMenuItem(custom_menu=custom_menu, **_without_id(item_data))
             for item_data in items_data
         ])
         
@@ -165,13 +222,9 @@ class CustomMenuSerializer(serializers.ModelSerializer):
         instance.description = validated_data.get('description', instance.description)
         
         if items_data is not None:
-            instance.items.all().delete()
-            if items_data:
-                CustomMenuItem.objects.bulk_create([
-                    CustomMenuItem(custom_menu=instance, **item_data)
-                    for item_data in items_data
-                ])
-            instance.calculate_totals()
+            diff = _apply_items_diff(CustomMenuItem, 'custom_menu', instance, items_data)
+            if diff.has_changes:
+                instance.calculate_totals()
         
         instance.save()
         return instance
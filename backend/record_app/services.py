@@ -1,10 +1,19 @@
-from datetime import date
+import hashlib
+from asgiref.sync import sync_to_async
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
 from .models import (
     MealRecord, MealRecordItem, WeightRecord, 
-    CustomFood, CustomMenu
+    CustomFood, CustomMenu, Cafeteria, CafeteriaMenu, DeletedRecord, UserDataVersion
 )
+from .business_logic.item_diff import ItemDiff
 from .business_logic.nutrition_calculator import NutritionCalculatorService
+from .cache import CacheNamespace, build_key
 
 class MealService:
     """食事記録に関するビジネスロジックを扱うサービスクラス"""
@@ -69,6 +78,80 @@ class MealService:
         return meal_record
 
 
+    @staticmethod
+    @transaction.atomic
+    def bulk_save_meals(user, meals_data: list[dict]) -> list[MealRecord]:
+        """
+        複数の食事記録をまとめて作成・更新する
+        
+        idを含む要素は既存記録の更新、含まない要素は新規作成。
+        食事記録・アイテムともにbulk_create / bulk_updateで書き込み（更新分のアイテムは
+        既存アイテムとの差分のみ）、件数に関わらずクエリ数は一定。
+        全体が1トランザクションで処理される。
+        返り値は入力と同じ順序の食事記録。
+        """
+        update_ids = [meal['id'] for meal in meals_data if 'id' in meal]
+        existing = MealRecord.objects.filter(user=user).in_bulk(update_ids)
+        missing = set(update_ids) - set(existing)
+        if missing:
+            raise ValueError(f'食事記録が見つかりません: {sorted(missing)}')
+
+        now = timezone.now()
+        records = []
+        to_create = []
+        to_update = []
+        update_fields = set()
+
+        for meal_data in meals_data:
+            meal_data = dict(meal_data)
+            items_data = meal_data.pop('items', None)
+            meal_id = meal_data.pop('id', None)
+
+            if meal_id is None:
+                record = MealRecord(user=user, **meal_data)
+                to_create.append(record)
+            else:
+                record = existing[meal_id]
+                for attr, value in meal_data.items():
+                    setattr(record, attr, value)
+                record.updated_at = now
+                update_fields.update(meal_data)
+                to_update.append(record)
+
+            records.append((record, meal_id is None, items_data))
+
+        if to_create:
+            MealRecord.objects.bulk_create(to_create)
+        if to_update:
+            MealRecord.objects.bulk_update(to_update, sorted(update_fields | {'updated_at'}))
+
+        # 更新分のアイテムは既存アイテムとの差分のみを書き込む
+        existing_items = defaultdict(list)
+        diff_targets = [
+            record.id for record, is_new, items_data in records
+            if not is_new and items_data is not None
+        ]
+        if diff_targets:
+            for item in MealRecordItem.objects.filter(meal_record_id__in=diff_targets):
+                existing_items[item.meal_record_id].append(item)
+
+        items_diff = ItemDiff()
+        for record, is_new, items_data in records:
+            if items_data is None:
+                continue
+            items_diff.merge(ItemDiff.plan(
+                MealRecordItem, 'meal_record', record,
+                [] if is_new else existing_items[record.id],
+                items_data,
+            ))
+        items_diff.apply(MealRecordItem)
+
+        # bulk操作ではシグナルが送られないため、変更バージョンを明示的に加算
+        UserDataVersion.bump(user.id)
+
+        return [record for record, _, _ in records]
+
+
 class WeightService:
     """体重記録に関するビジネスロジック"""
 
@@ -89,4 +172,243 @@ class CustomFoodService:
     def create_custom_food(user, data: dict) -> CustomFood:
         """栄養計算サービスを利用してカスタム食品を作成する"""
         calculator = NutritionCalculatorService()
-        return calculator.create_custom_food(user, data)
\ No newline at end of file
+        return calculator.create_custom_food(user, data)
+
+
+class DashboardService:
+    """ダッシュボード表示用データの組み立て"""
+
+    WEIGHT_DAYS = 90
+    # weight_days の上限（10年）
+    MAX_WEIGHT_DAYS = 3650
+    CALORIE_SERIES_DAYS = 7
+
+    @classmethod
+    def build_dashboard(cls, user, target_date: date, weight_days: int = WEIGHT_DAYS) -> dict:
+        """
+        ダッシュボードの初期表示に必要なデータを一度に取得する
+        
+        クエリ数はデータ量に関わらず固定（食事・アイテム・体重・カロリー推移の4回）。
+        日次サマリーは取得済みの食事記録から計算するため追加のクエリは発生しない。
+        """
+        meals = list(
+            MealRecord.objects.filter(user=user, record_date=target_date)
+            .prefetch_related('items')
+            .order_by('-created_at')
+        )
+
+        weights = list(
+            WeightRecord.objects.filter(
+                user=user,
+                record_date__gt=target_date - timedelta(days=weight_days),
+                record_date__lte=target_date,
+            ).order_by('-record_date')
+        )
+
+        calculator = NutritionCalculatorService()
+        return {
+            'date': target_date,
+            'meals': meals,
+            'nutrition_summary': calculator.summarize_meals(meals),
+            'weights': weights,
+            'calorie_series': cls._build_calorie_series(user, target_date),
+        }
+
+    @classmethod
+    def _build_calorie_series(cls, user, target_date: date) -> list[dict]:
+        """指定日までの日別合計カロリー（記録のない日は0）"""
+        start_date = target_date - timedelta(days=cls.CALORIE_SERIES_DAYS - 1)
+        totals = dict(
+            MealRecord.objects.filter(
+                user=user,
+                record_date__gte=start_date,
+                record_date__lte=target_date,
+            )
+            .order_by()
+            .values('record_date')
+            .annotate(total=Sum('calories'))
+            .values_list('record_date', 'total')
+        )
+
+        series = []
+        for offset in range(cls.CALORIE_SERIES_DAYS):
+            day = start_date + timedelta(days=offset)
+            series.append({'date': day, 'calories': round(totals.get(day) or 0, 2)})
+        return series
+
+
+class SyncService:
+    """オフライン対応クライアント向けの差分同期"""
+
+    # 同期中にコミットされたトランザクションを取りこぼさないよう、
+    # ウォーターマークを少し遡って検索する（クライアントはIDで重複を吸収する）
+    WATERMARK_OVERLAP = timedelta(seconds=5)
+
+    # トゥームストーンの保持期間。これより古いウォーターマークは全件同期とする
+    TOMBSTONE_RETENTION_DAYS = 90
+
+    @classmethod
+    def get_changes(cls, user, since: datetime | None = None) -> dict:
+        """
+        ウォーターマーク以降に作成・更新・削除されたデータを返す
+        
+        sinceを省略した場合、または保持期間より古い場合は全件を返す。
+        食事記録とMyメニューはアイテムを含めて返すため、
+        クライアントは変更のあった親レコードのアイテムを置き換えればよい。
+        """
+        watermark = timezone.now()
+        retention_limit = watermark - timedelta(days=cls.TOMBSTONE_RETENTION_DAYS)
+        full = since is None or since < retention_limit
+
+        changed = {'user': user}
+        if not full:
+            changed['updated_at__gte'] = since - cls.WATERMARK_OVERLAP
+
+        deleted = defaultdict(list)
+        if not full:
+            tombstones = DeletedRecord.objects.filter(
+                user=user,
+                deleted_at__gte=since - cls.WATERMARK_OVERLAP,
+            ).values_list('model_name', 'object_id')
+            for model_name, object_id in tombstones:
+                deleted[model_name].append(object_id)
+
+        return {
+            'watermark': watermark,
+            'full': full,
+            'meal_records': list(
+                MealRecord.objects.filter(**changed).prefetch_related('items').order_by('updated_at')
+            ),
+            'weight_records': list(
+                WeightRecord.objects.filter(**changed).order_by('updated_at')
+            ),
+            'custom_foods': list(
+                CustomFood.objects.filter(**changed).order_by('updated_at')
+            ),
+            'custom_menus': list(
+                CustomMenu.objects.filter(**changed).prefetch_related('items').order_by('updated_at')
+            ),
+            'deleted': {
+                model_name: deleted[model_name]
+                for model_name, _ in DeletedRecord.MODEL_CHOICES
+            },
+        }
+
+    @classmethod
+    def prune_tombstones(cls) -> int:
+        """保持期間を過ぎたトゥームストーンを削除"""
+        cutoff = timezone.now() - timedelta(days=cls.TOMBSTONE_RETENTION_DAYS)
+        count, _ = DeletedRecord.objects.filter(deleted_at__lt=cutoff).delete()
+        return count
+
+
+class CafeteriaMenuListService:
+    """
+    食堂メニュー一覧のエンコード済みJSONキャッシュ
+
+    一覧はスクレイピング時にしか変わらないため、食堂・カテゴリーごとに
+    シリアライズ済みのJSONバイト列とETagをキャッシュに保持する。
+    キャッシュキーには世代番号を含め、メニューが更新されたら世代を進めて
+    古いエントリをまとめて無効にする。古い世代のエントリは削除しないため、
+    TTLで消えるようにする（毎日のスクレイピングで作り直すため、現在の世代が
+    期限切れになるのは更新が止まった場合だけで、その場合も次の参照時に作り直す）。
+    """
+
+    # 2日（毎日の更新を1回取りこぼしても期限切れにならない長さ）
+    CACHE_TIMEOUT = 60 * 60 * 24 * 2
+    CACHE = CacheNamespace('cafeteria_menus', timeout=CACHE_TIMEOUT)
+
+    @classmethod
+    def get_payload(cls, cafeteria_id: int | None = None, category: str | None = None) -> dict:
+        """
+        一覧のJSONバイト列とETagを返す（キャッシュになければ作成して保存）
+
+        Returns:
+            dict: {'body': bytes, 'etag': str}
+        """
+        generation = cls.CACHE.version()
+        key = cls._key(generation, cafeteria_id, category)
+        payload = cls.CACHE.get(key)
+        if payload is None:
+            # 存在しない食堂・カテゴリーは任意の値を受け付けるためキャッシュしない
+            if cafeteria_id is not None and not Cafeteria.objects.filter(id=cafeteria_id).exists():
+                return cls._encode(generation, [])
+            payload = cls._build_payloads(generation, cafeteria_id).get(category)
+            if payload is None:
+                return cls._encode(generation, [])
+        return payload
+
+    @classmethod
+    async def aget_payload(cls, cafeteria_id: int | None = None, category: str | None = None) -> dict:
+        """
+        get_payload() の非同期版（ASGIの非同期Viewから使う）
+
+        キャッシュの参照と食堂の存在確認は非同期APIで行い、一覧の作成のみスレッドで実行する。
+        """
+        generation = await cls.CACHE.aversion()
+        payload = await cls.CACHE.aget(cls._key(generation, cafeteria_id, category))
+        if payload is None:
+            if cafeteria_id is not None and not await Cafeteria.objects.filter(id=cafeteria_id).aexists():
+                return cls._encode(generation, [])
+            payloads = await sync_to_async(cls._build_payloads)(generation, cafeteria_id)
+            payload = payloads.get(category)
+            if payload is None:
+                return cls._encode(generation, [])
+        return payload
+
+    @classmethod
+    def refresh(cls, cafeteria_id: int | None = None) -> None:
+        """
+        メニュー更新後に世代を進め、一覧を事前に作成してキャッシュする
+
+        全食堂の一覧と、指定された食堂の一覧（それぞれカテゴリー別を含む）を作成する。
+        """
+        generation = cls.invalidate()
+        cls._build_payloads(generation, None)
+        if cafeteria_id is not None:
+            cls._build_payloads(generation, cafeteria_id)
+
+    @classmethod
+    def invalidate(cls) -> int:
+        """世代を進めて既存のキャッシュを無効化し、新しい世代番号を返す"""
+        return cls.CACHE.invalidate()
+
+    @classmethod
+    def _key(cls, generation: int, cafeteria_id: int | None, category: str | None) -> str:
+        # 世代はETagにも使うため、取得済みの世代番号でキーを組み立てる
+        return build_key(cls.CACHE.name, f'v{generation}', cafeteria_id, category)
+
+    @classmethod
+    def _build_payloads(cls, generation: int, cafeteria_id: int | None) -> dict:
+        """
+        1回のクエリ・シリアライズで全体とカテゴリー別の一覧を作成してキャッシュ
+
+        Returns:
+            dict: カテゴリー（全体はNone） → payload
+        """
+        from .serializers import CafeteriaMenuSerializer
+
+        menus = CafeteriaMenu.objects.all()
+        if cafeteria_id is not None:
+            menus = menus.filter(cafeteria_id=cafeteria_id)
+        data = CafeteriaMenuSerializer(menus, many=True).data
+
+        by_category = {code: [] for code, _ in CafeteriaMenu.MENU_CATEGORY}
+        for item in data:
+            by_category[item['category']].append(item)
+
+        payloads = {None: cls._encode(generation, data)}
+        payloads.update({
+            code: cls._encode(generation, items) for code, items in by_category.items()
+        })
+        cache.set_many(
+            {cls._key(generation, cafeteria_id, code): payload for code, payload in payloads.items()},
+            timeout=cls.CACHE.timeout,
+        )
+        return payloads
+
+    @staticmethod
+    def _encode(generation: int, data) -> dict:
+        body = JSONRenderer().render(data)
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        return {'body': body, 'etag': f'"{generation}-{digest}"'}
@@ -0,0 +1,135 @@
+"""
+モデルシグナルハンドラ
+"""
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.signals import post_init, post_save, post_delete
+
+from .models import (
+    MealRecord, WeightRecord, CustomFood, CustomMenu, CafeteriaMenu,
+    UserDataVersion, DeletedRecord
+)
+from rest_framework.authtoken.models import Token
+
+from .authentication import CachedTokenAuthentication
+from .performance import install_query_recorder
+from .services import CafeteriaMenuListService
+
+
+# 条件付きGET・差分同期の対象となるユーザーデータ
+VERSIONED_MODELS = {
+    MealRecord: 'meal_record',
+    WeightRecord: 'weight_record',
+    CustomFood: 'custom_food',
+    CustomMenu: 'custom_menu',
+}
+
+
+def _is_user_deletion(origin):
+    """ユーザー自体の削除に伴うカスケード削除かどうか"""
+    if isinstance(origin, User):
+        return True
+    return isinstance(origin, QuerySet) and origin.model is User
+
+
+def bump_user_data_version(sender, instance, **kwargs):
+    """ユーザーデータへの書き込み時に変更バージョンを加算"""
+    UserDataVersion.bump(instance.user_id)
+
+
+def record_deletion(sender, instance, origin=None, **kwargs):
+    """削除されたユーザーデータのトゥームストーンを記録"""
+    if _is_user_deletion(origin):
+        return
+    DeletedRecord.objects.create(
+        user_id=instance.user_id,
+        model_name=VERSIONED_MODELS[sender],
+        object_id=instance.pk,
+    )
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(
+        bump_user_data_version, sender=model,
+        dispatch_uid=f'bump_version_on_save_{model.__name__}'
+    )
+    post_delete.connect(
+        bump_user_data_version, sender=model,
+        dispatch_uid=f'bump_version_on_delete_{model.__name__}'
+    )
+    post_delete.connect(
+        record_deletion, sender=model,
+        dispatch_uid=f'record_deletion_{model.__name__}'
+    )
+
+
+def invalidate_cafeteria_menu_list(sender, **kwargs):
+    """食堂メニューの個別の変更時に一覧のキャッシュを無効化"""
+    CafeteriaMenuListService.invalidate()
+
+
+post_save.connect(
+    invalidate_cafeteria_menu_list, sender=CafeteriaMenu,
+    dispatch_uid='invalidate_cafeteria_menu_list_on_save'
+)
+post_delete.connect(
+    invalidate_cafeteria_menu_list, sender=CafeteriaMenu,
+    dispatch_uid='invalidate_cafeteria_menu_list_on_delete'
+)
+
+
+def invalidate_cached_token(sender, instance, **kwargs):
+    """ログアウト・トークンの作り直し（削除）時に認証キャッシュを削除"""
+    CachedTokenAuthentication.invalidate(instance.key)
+
+
+# 変更されたら認証キャッシュを削除するユーザーのフィールド（キャッシュしたユーザーで権限を判定するため）
+TOKEN_REVOKING_USER_FIELDS = ('is_active', 'password', 'is_staff', 'is_superuser')
+
+
+def _token_revoking_values(instance):
+    # 遅延読み込みのフィールドを読み込まないよう __dict__ から取得する
+    return tuple(instance.__dict__.get(name) for name in TOKEN_REVOKING_USER_FIELDS)
+
+
+def remember_token_revoking_values(sender, instance, **kwargs):
+    """読み込み時の値を覚えておき、保存時に変更されたかを判定する"""
+    instance._token_revoking_values = _token_revoking_values(instance)
+
+
+def invalidate_cached_user_tokens(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    ユーザーの無効化・パスワードや権限の変更時に認証キャッシュを削除
+
+    ログイン時の last_login の更新など、それ以外の保存ではトークンを取得しない。
+    """
+    if created:
+        return
+    if update_fields is not None:
+        changed = not update_fields.isdisjoint(TOKEN_REVOKING_USER_FIELDS)
+    else:
+        changed = getattr(instance, '_token_revoking_values', None) != _token_revoking_values(instance)
+    remember_token_revoking_values(sender, instance)
+    if not changed:
+        return
+    for key in Token.objects.filter(user_id=instance.pk).values_list('key', flat=True):
+        CachedTokenAuthentication.invalidate(key)
+
+
+post_delete.connect(
+    invalidate_cached_token, sender=Token,
+    dispatch_uid='invalidate_cached_token_on_delete'
+)
+post_init.connect(
+    remember_token_revoking_values, sender=User,
+    dispatch_uid='remember_token_revoking_values'
+)
+post_save.connect(
+    invalidate_cached_user_tokens, sender=User,
+    dispatch_uid='invalidate_cached_user_tokens_on_save'
+)
+
+
+# リクエストごとのクエリ数・時間の計測（PerformanceMiddleware）
+connection_created.connect(install_query_recorder, dispatch_uid='install_query_recorder')
@@ -1,7 +1,7 @@
 """
 Celery非同期タスク
 """
-from celery import shared_task
+from celery import chord, group, shared_task
 from pathlib import Path
 import os
 import logging
@@ -14,33 +14,117 @@ def update_cafeteria_menus_task():
     """
     食堂メニューを自動で更新
     
-    定期実行により、食堂のウェブサイトから最新のメニュー情報を
-    スクレイピングしてデータベースを更新。
+    定期実行により、更新対象の食堂ごとにサブタスクを発行して並列に
+    スクレイピングし、全食堂の完了後に結果を集計する（group + chord）。
+    食堂はすべて同じホストのため、リクエスト数の上限は全サブタスクで共有する
+    （CafeteriaScraper の SharedRateLimiter）。
+    
+    Returns:
+        dict: 発行した食堂数と集計タスクのID
+    """
+    from .models import Cafeteria
+    cafeteria_ids = list(Cafeteria.objects.filter(is_active=True).values_list('id', flat=True))
+    if not cafeteria_ids:
+        cafeteria_ids = [Cafeteria.get_default().id]
+    
+    result = chord(
+        group(update_cafeteria_site_task.s(cafeteria_id) for cafeteria_id in cafeteria_ids)
+    )(summarize_cafeteria_updates_task.s())
+    return {'cafeterias': len(cafeteria_ids), 'summary_task_id': result.id}
+
+
+@shared_task(bind=True, max_retries=3)
+def update_cafeteria_site_task(self, cafeteria_id):
     """
+    1食堂分のメニューを差分更新
+    
+    取得に失敗した場合は指数バックオフ（1, 2, 4分後）で再試行する。
+    取得済みの詳細ページはチェックポイントに残っているため、再試行は続きから行う。
+    
+    Returns:
+        dict: site_id、total / added / changed / removed の件数とフェーズごとの計測値 metrics
+        （失敗時は error を含む）
+    """
+    from .models import Cafeteria
+    from .business_logic.cafeteria_scraping import CafeteriaScraper, ScrapingError
     try:
-        from .business_logic.cafeteria_scraping import CafeteriaScraper
-        scraper = CafeteriaScraper()
-        count = scraper.fetch_and_update_menus()
-        return f"メニューを更新しました。{count}件のメニューを取得しました。"
+        cafeteria = Cafeteria.objects.get(id=cafeteria_id)
+        scraper = CafeteriaScraper(cafeteria)
+        summary = scraper.fetch_and_update_menus()
+        return {
+            'cafeteria_id': cafeteria_id, 'site_id': cafeteria.site_id, **summary,
+            'metrics': scraper.metrics.as_dict(),
+        }
+    except ScrapingError as e:
+        if self.request.retries < self.max_retries:
+            logger.warning(
+                "食堂メニュー更新を再試行します: cafeteria_id=%s (%s回目) %s",
+                cafeteria_id, self.request.retries + 1, e
+            )
+            raise self.retry(exc=e, countdown=60 * 2 ** self.request.retries)
+        logger.exception("食堂メニュー更新エラー: cafeteria_id=%s", cafeteria_id)
+        return {'cafeteria_id': cafeteria_id, 'error': f"メニューの更新に失敗しました: {str(e)}"}
     except Exception as e:
-        logger.exception("食堂メニュー更新エラー")
-        return f"メニューの更新に失敗しました: {str(e)}"
+        logger.exception("食堂メニュー更新エラー: cafeteria_id=%s", cafeteria_id)
+        return {'cafeteria_id': cafeteria_id, 'error': f"メニューの更新に失敗しました: {str(e)}"}
+
+
+@shared_task
+def summarize_cafeteria_updates_task(results):
+    """
+    食堂ごとの更新結果を集計（chordのコールバック）
+    
+    Returns:
+        dict: 全食堂合計の total / added / changed / removed、失敗数、全食堂合計の計測値 metrics、
+        食堂ごとの結果
+    """
+    from .business_logic.cafeteria_scraping import ScrapeMetrics
+    summary = {'total': 0, 'added': 0, 'changed': 0, 'removed': 0, 'failed': 0}
+    for result in results:
+        if 'error' in result:
+            summary['failed'] += 1
+            continue
+        for key in ('total', 'added', 'changed', 'removed'):
+            summary[key] += result[key]
+    summary['metrics'] = ScrapeMetrics.combine(
+        result['metrics'] for result in results if 'metrics' in result
+    )
+    summary['sites'] = results
+    logger.info(
+        "食堂メニュー更新集計: sites=%d failed=%d total=%d added=%d changed=%d removed=%d",
+        len(results), summary['failed'], summary['total'], summary['added'], summary['changed'],
+        summary['removed']
+    )
+    return summary
+
+
+@shared_task
+def prune_deleted_records_task():
+    """
+    差分同期用のトゥームストーンを定期削除
+    
+    保持期間を過ぎたトゥームストーンは同期に使われないため削除する。
+    """
+    from .services import SyncService
+    count = SyncService.prune_tombstones()
+    return f"{count}件の削除記録を整理しました。"
 
 
 @shared_task
-def process_nutrition_label_task(image_path):
+def process_nutrition_label_task(image_path, debug=False):
     """
     栄養成分表示のOCR処理を非同期実行
     
     重いOCR処理をCeleryワーカーに委託しAPIレスポンス時間を改善。
     Args:
         image_path: 処理する画像のパス
+        debug: Trueなら段階ごとの所要時間を結果の timings に含める
         
     Returns:
         dict: OCR処理結果
     """
     try:
-        logger.info(f"Starting OCR processing for: {image_path}")
+        logger.debug("Starting OCR processing for: %s", image_path)
         
         # ファイル存在確認
         if not os.path.exists(image_path):
@@ -49,20 +133,19 @@ def process_nutrition_label_task(image_path):
         # OCR処理（意味ブロックアプローチ版）
         from .business_logic.ocr_processor import NutritionOCRProcessor
         processor = NutritionOCRProcessor(gpu=False)
-        result = processor.process_nutrition_label(image_path)
+        result = processor.process_nutrition_label(image_path, debug=debug)
         
         # 一時ファイルの削除
         try:
             os.remove(image_path)
-            logger.info(f"Temporary file deleted: {image_path}")
+            logger.debug("Temporary file deleted: %s", image_path)
         except Exception as e:
-            logger.warning(f"Failed to delete temporary file: {str(e)}")
+            logger.warning("Failed to delete temporary file: %s", e)
         
-        logger.info(f"OCR processing completed: success={result['success']}")
         return result
         
     except Exception as e:
-        logger.exception(f"OCR task error: {str(e)}")
+        logger.exception("OCR task error: %s", e)
         return {
             'success': False,
             'error': str(e),
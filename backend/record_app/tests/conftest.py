@@ -1,6 +1,11 @@
 import pytest
+from contextlib import contextmanager
 from datetime import date, timedelta
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework.authtoken.models import Token
 from record_app.models import (
@@ -10,6 +15,57 @@ from record_app.models import (
 )
 
 
+# =============================================================================
+# キャッシュ
+# =============================================================================
+
+def pytest_configure(config):
+    """テストはRedisに依存しないよう、プロセス内のキャッシュを使う"""
+    override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'record-app-tests',
+        },
+    }).enable()
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    """テスト間でキャッシュを共有しない"""
+    yield
+    cache.clear()
+
+
+# =============================================================================
+# クエリ数の上限
+# =============================================================================
+
+@pytest.fixture
+def query_budget(db):
+    """
+    ブロック内で発行するクエリ数の上限を宣言する
+
+        with query_budget(4):
+            authenticated_client.get('/api/meals/')
+
+    上限を超えた場合は、発行されたSQLを一覧にしてテストを失敗させる。
+    """
+    @contextmanager
+    def budget(max_queries, using='default'):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        if len(context) > max_queries:
+            queries = '\n'.join(
+                f'  {number}. {query["sql"]}' for number, query in enumerate(context.captured_queries, 1)
+            )
+            pytest.fail(
+                f'クエリ数が上限を超えました: {len(context)}件（上限 {max_queries}件）\n{queries}',
+                pytrace=False
+            )
+
+    return budget
+
+
 # =============================================================================
 # 認証関連フィクスチャ
 # =============================================================================
@@ -0,0 +1,254 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.test import AsyncClient, AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve
+from rest_framework.authtoken.models import Token
+from record_app import async_views, views
+from record_app.middleware import StaticFilesMiddleware
+from record_app.models import CafeteriaMenu
+
+
+class AsyncViewTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = {'headers': {'Authorization': f'Token {self.token.key}'}}
+        self.factory = AsyncRequestFactory()
+
+
+class AsyncCafeteriaMenuListTests(AsyncViewTestCase):
+    """食堂メニュー一覧（非同期View）のテスト"""
+
+    def setUp(self):
+        super().setUp()
+        CafeteriaMenu.objects.create(
+            menu_id='001', name='チキンカレー', category='rice',
+            calories=600, protein=20, fat=15, carbohydrates=80
+        )
+
+    async def test_requires_authentication(self):
+        response = await async_views.list_cafeteria_menus(self.factory.get('/api/cafeteria/list/'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    async def test_invalid_token(self):
+        request = self.factory.get('/api/cafeteria/list/', headers={'Authorization': 'Token invalid'})
+        response = await async_views.list_cafeteria_menus(request)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_list_and_not_modified(self):
+        """同期Viewと同じ一覧・ETagを返し、ETagが一致すれば304"""
+        response = await async_views.list_cafeteria_menus(
+            self.factory.get('/api/cafeteria/list/', {'category': 'rice'}, **self.auth)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([menu['name'] for menu in json.loads(response.content)], ['チキンカレー'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        request = self.factory.get(
+            '/api/cafeteria/list/', {'category': 'rice'},
+            headers={**self.auth['headers'], 'If-None-Match': response['ETag']}
+        )
+        not_modified = await async_views.list_cafeteria_menus(request)
+        self.assertEqual(not_modified.status_code, 304)
+
+    async def test_invalid_cafeteria(self):
+        response = await async_views.list_cafeteria_menus(
+            self.factory.get('/api/cafeteria/list/', {'cafeteria': 'abc'}, **self.auth)
+        )
+        self.assertEqual(response.status_code, 400)
+
+    async def test_method_not_allowed(self):
+        response = await async_views.list_cafeteria_menus(self.factory.post('/api/cafeteria/list/', **self.auth))
+        self.assertEqual(response.status_code, 405)
+
+
+class AsyncSearchFoodsTests(AsyncViewTestCase):
+    """食品検索（非同期View）のテスト"""
+
+    async def test_search(self):
+        results = [{'id': 1, 'name': '白米', 'calories': 156.0}]
+        with patch(
+            'record_app.async_views.NutritionCalculatorService.asearch_foods', return_value=results
+        ) as search:
+            response = await async_views.search_foods(self.factory.get('/api/foods/search/', {'q': '白米'}, **self.auth))
+        search.assert_awaited_once_with('白米')
+        self.assertEqual(json.loads(response.content), {'foods': results})
+
+    async def test_query_required(self):
+        response = await async_views.search_foods(self.factory.get('/api/foods/search/', **self.auth))
+        self.assertEqual(response.status_code, 400)
+
+
+class OCRJobTests(AsyncViewTestCase):
+    """OCRジョブ（登録・ロングポーリング）のテスト"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name, SERVER_MODE='asgi'))
+        self.media_root = Path(media_root.name)
+
+    def _image(self):
+        return SimpleUploadedFile('label.png', b'\x89PNG\r\n\x1a\n' + b'\x00' * 100, content_type='image/png')
+
+    async def _submit(self, job_id='job-1'):
+        with patch('record_app.async_views.process_nutrition_label_task.delay') as delay:
+            delay.return_value = MagicMock(id=job_id)
+            response = await self.async_client.post('/api/ocr/jobs/', {'image': self._image()}, **self.auth)
+        return response, delay
+
+    def _async_result(self, ready, result=None):
+        async_result = MagicMock()
+        async_result.ready.side_effect = ready
+        async_result.get.return_value = result
+        return patch(
+            'record_app.async_views.process_nutrition_label_task.AsyncResult', return_value=async_result
+        )
+
+    async def test_submit_saves_upload_and_queues_task(self):
+        response, delay = await self._submit()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'job_id': 'job-1', 'status': 'pending'})
+
+        path = Path(delay.call_args.args[0])
+        self.assertEqual(path.parent, self.media_root / 'ocr_uploads')
+        self.assertEqual(path.suffix, '.png')
+        self.assertTrue(path.exists())
+        self.assertFalse(delay.call_args.kwargs['debug'])
+
+    async def test_submit_validates_image(self):
+        text_file = SimpleUploadedFile('a.txt', b'text', content_type='text/plain')
+        with patch('record_app.async_views.process_nutrition_label_task.delay') as delay:
+            response = await self.async_client.post('/api/ocr/jobs/', {'image': text_file}, **self.auth)
+        self.assertEqual(response.status_code, 400)
+        delay.assert_not_called()
+
+    async def test_submit_requires_authentication(self):
+        response = await self.async_client.post('/api/ocr/jobs/', {'image': self._image()})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_pending_without_wait(self):
+        await self._submit()
+        with self._async_result(ready=[False]):
+            response = await self.async_client.get('/api/ocr/jobs/job-1/', **self.auth)
+        self.assertEqual(response.json(), {'job_id': 'job-1', 'status': 'pending'})
+
+    async def test_long_poll_returns_when_done(self):
+        """wait を指定すると完了まで待って結果を返す"""
+        await self._submit()
+        result = {'success': True, 'nutrition': {'calories': 250.0}, 'validation': {'is_valid': True}}
+        with self._async_result(ready=[False, False, True], result=result), \
+                patch.object(async_views, 'OCR_POLL_INTERVAL', 0.01):
+            response = await self.async_client.get('/api/ocr/jobs/job-1/', {'wait': '5'}, **self.auth)
+        data = response.json()
+        self.assertEqual(data['status'], 'done')
+        self.assertTrue(data['success'])
+        self.assertEqual(data['nutrition'], {'calories': 250.0})
+
+    async def test_long_poll_runs_without_async_to_sync(self):
+        """ミドルウェアがすべて非同期対応のため、Viewは async_to_sync を経由せずに実行される"""
+        with patch('django.core.handlers.base.async_to_sync', wraps=async_to_sync) as adapted:
+            client = AsyncClient()
+            await self._submit()
+            with self._async_result(ready=[False]):
+                response = await client.get('/api/ocr/jobs/job-1/', **self.auth)
+        self.assertEqual(response.json()['status'], 'pending')
+        adapted.assert_not_called()
+
+    @override_settings(SERVER_MODE='wsgi')
+    async def test_wait_is_ignored_under_wsgi(self):
+        """WSGIではワーカーを占有しないよう待機しない"""
+        await self._submit()
+        with self._async_result(ready=[False, True]) as async_result:
+            response = await self.async_client.get('/api/ocr/jobs/job-1/', {'wait': '5'}, **self.auth)
+        self.assertEqual(response.json()['status'], 'pending')
+        self.assertEqual(async_result.return_value.ready.call_count, 1)
+
+    async def test_long_poll_times_out(self):
+        await self._submit()
+        with self._async_result(ready=lambda: False), patch.object(async_views, 'OCR_POLL_INTERVAL', 0.01):
+            response = await self.async_client.get('/api/ocr/jobs/job-1/', {'wait': '0.05'}, **self.auth)
+        self.assertEqual(response.json()['status'], 'pending')
+
+    async def test_failed_task(self):
+        """タスクが例外で終了した場合は失敗として返す"""
+        await self._submit()
+        with self._async_result(ready=[True], result=RuntimeError('tesseract not found')):
+            response = await self.async_client.get('/api/ocr/jobs/job-1/', **self.auth)
+        data = response.json()
+        self.assertEqual(data['status'], 'done')
+        self.assertFalse(data['success'])
+        self.assertEqual(data['error'], 'tesseract not found')
+
+    async def test_other_users_job_is_not_found(self):
+        await self._submit()
+        other = await User.objects.acreate(username='other')
+        token = await Token.objects.acreate(user=other)
+        response = await self.async_client.get(
+            '/api/ocr/jobs/job-1/', headers={'Authorization': f'Token {token.key}'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_invalid_wait(self):
+        await self._submit()
+        response = await self.async_client.get('/api/ocr/jobs/job-1/', {'wait': 'soon'}, **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    async def test_non_finite_wait(self):
+        """nan・inf は待機が終わらなくなるため400"""
+        await self._submit()
+        with self._async_result(ready=lambda: False) as async_result:
+            for wait in ('nan', 'inf', '-inf'):
+                response = await self.async_client.get('/api/ocr/jobs/job-1/', {'wait': wait}, **self.auth)
+                self.assertEqual(response.status_code, 400)
+        async_result.assert_not_called()
+
+
+class ServerModeRoutingTests(SimpleTestCase):
+    """実行方式ごとのURL設定のテスト"""
+
+    def test_wsgi_routes_use_sync_views(self):
+        self.assertIs(resolve('/api/foods/search/').func, views.search_foods)
+        self.assertIs(resolve('/api/cafeteria/list/').func, views.list_cafeteria_menus)
+
+    @override_settings(ROOT_URLCONF='dishboard_project.asgi_urls')
+    def test_asgi_routes_use_async_views(self):
+        self.assertIs(resolve('/api/foods/search/').func, async_views.search_foods)
+        self.assertIs(resolve('/api/cafeteria/list/').func, async_views.list_cafeteria_menus)
+        self.assertIs(resolve('/api/ocr/jobs/job-1/').func, async_views.ocr_job_status)
+        self.assertEqual(resolve('/api/meals/').url_name, 'meal-list')
+
+    @override_settings(SERVER_MODE='asgi')
+    def test_server_mode_does_not_change_loaded_routes(self):
+        """URL設定はROOT_URLCONFで切り替えるため、SERVER_MODEだけを変えても同期Viewのまま"""
+        self.assertIs(resolve('/api/cafeteria/list/').func, views.list_cafeteria_menus)
+
+
+class StaticFilesMiddlewareTests(AsyncViewTestCase):
+    """静的ファイル配信ミドルウェア（非同期対応版）のテスト"""
+
+    async def test_async_mode(self):
+        async def get_response(request):
+            return HttpResponse('view')
+
+        static_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(static_dir.cleanup)
+        (Path(static_dir.name) / 'app.js').write_text('console.log(1)')
+
+        middleware = StaticFilesMiddleware(get_response)
+        middleware.add_files(static_dir.name, prefix='static/')
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        response = await middleware(self.factory.get('/static/app.js'))
+        self.assertEqual(b''.join(response.streaming_content), b'console.log(1)')
+        response.close()
+        response = await middleware(self.factory.get('/api/meals/'))
+        self.assertEqual(response.content, b'view')
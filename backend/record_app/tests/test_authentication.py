@@ -1,8 +1,10 @@
-from django.test import TestCase
-from django.contrib.auth.models import User
+from unittest.mock import patch
+from django.test import RequestFactory, TestCase
+from django.contrib.auth.models import User, update_last_login
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from rest_framework.authtoken.models import Token
+from record_app.authentication import CachedTokenAuthentication
 
 
 class UserRegistrationTests(APITestCase):
@@ -365,4 +367,124 @@ class UserProfileTests(APITestCase):
         response = self.client.get(self.profile_url)
         
         if response.status_code != status.HTTP_404_NOT_FOUND:
-            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class CachedTokenAuthenticationTests(APITestCase):
+    """トークン認証のキャッシュのテスト"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cacheduser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = '/api/meal-timings/'
+
+    def test_cached_token_skips_database(self):
+        """2回目以降の認証はDBに問い合わせない"""
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_shared_cache_is_used_by_other_processes(self):
+        """プロセス内のキャッシュがなくても共有キャッシュから解決する"""
+        self.client.get(self.url)
+        CachedTokenAuthentication.local_cache.clear()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_raw_token_is_not_used_as_cache_key(self):
+        self.assertNotIn(self.token.key, CachedTokenAuthentication.cache_key(self.token.key))
+
+    def test_invalid_token_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_invalidates_cached_token(self):
+        """キャッシュ済みのトークンもログアウト後は使えない"""
+        self.client.get(self.url)
+        response = self.client.post('/api/logout/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_rotation(self):
+        """トークンを作り直すと古いトークンは使えず、新しいトークンは使える"""
+        self.client.get(self.url)
+        self.token.delete()
+        new_token = Token.objects.create(user=self.user)
+
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {new_token.key}')
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+    def test_deactivated_user_is_rejected(self):
+        """ユーザーを無効化するとキャッシュ済みのトークンも使えない"""
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_shared_cache_outage_falls_back_to_database(self):
+        """共有キャッシュ（Redis）に接続できなくてもDBで認証する"""
+        CachedTokenAuthentication.local_cache.clear()
+        outage = ConnectionError('Redis is unavailable')
+        with patch.object(CachedTokenAuthentication.shared_cache, 'get', side_effect=outage), \
+                patch.object(CachedTokenAuthentication.shared_cache, 'set', side_effect=outage), \
+                self.assertLogs('record_app.authentication', level='WARNING'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    async def test_shared_cache_outage_falls_back_to_database_async(self):
+        CachedTokenAuthentication.local_cache.clear()
+        request = RequestFactory().get(self.url, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        outage = ConnectionError('Redis is unavailable')
+        with patch.object(CachedTokenAuthentication.shared_cache, 'aget', side_effect=outage), \
+                patch.object(CachedTokenAuthentication.shared_cache, 'aset', side_effect=outage):
+            user, token = await CachedTokenAuthentication().aauthenticate(request)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_logout_during_shared_cache_outage(self):
+        """共有キャッシュから削除できなくてもログアウトできる"""
+        self.client.get(self.url)
+        outage = ConnectionError('Redis is unavailable')
+        with patch.object(CachedTokenAuthentication.shared_cache, 'delete', side_effect=outage), \
+                self.assertLogs('record_app.authentication', level='WARNING'):
+            response = self.client.post('/api/logout/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+
+    def test_user_update_during_shared_cache_outage(self):
+        """共有キャッシュに接続できなくてもユーザーを無効化・更新できる"""
+        outage = ConnectionError('Redis is unavailable')
+        with patch.object(CachedTokenAuthentication.shared_cache, 'delete', side_effect=outage):
+            self.user.is_active = False
+            self.user.save()
+            self.user.is_active = True
+            self.user.save()
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_active)
+
+    def test_unrelated_user_update_keeps_cached_tokens(self):
+        """last_loginなど権限に関係しない更新ではトークンを取得・削除しない"""
+        self.client.get(self.url)
+        with patch.object(CachedTokenAuthentication, 'invalidate') as invalidate:
+            with self.assertNumQueries(1):
+                update_last_login(None, self.user)
+            self.user.first_name = '太郎'
+            self.user.save()
+        invalidate.assert_not_called()
+
+    def test_password_change_invalidates_cached_tokens(self):
+        self.client.get(self.url)
+        user = User.objects.get(pk=self.user.pk)
+        with patch.object(CachedTokenAuthentication, 'invalidate') as invalidate:
+            user.set_password('newpass456')
+            user.save()
+        invalidate.assert_called_once_with(self.token.key)
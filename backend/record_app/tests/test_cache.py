@@ -0,0 +1,167 @@
+import threading
+from datetime import date
+from unittest.mock import patch
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from dishboard_project.settings import base
+from record_app.cache import (
+    CacheNamespace, LocalLRUCache, build_key, dataset_scope, invalidate_scope, key_part, user_scope
+)
+
+
+class CacheSettingsTests(SimpleTestCase):
+    """キャッシュ設定のテスト"""
+
+    def test_redis_is_configured_for_all_environments(self):
+        """全環境の共通設定で共有のRedisキャッシュを使う"""
+        default = base.CACHES['default']
+        self.assertEqual(default['BACKEND'], 'django.core.cache.backends.redis.RedisCache')
+        self.assertEqual(default['LOCATION'], base.REDIS_URL)
+
+    def test_tests_use_locmem(self):
+        """テストはRedisなしで動くようプロセス内キャッシュを使う"""
+        self.assertIn('LocMemCache', settings.CACHES['default']['BACKEND'])
+
+
+class KeyBuilderTests(SimpleTestCase):
+    """キーの組み立てのテスト"""
+
+    def test_key_parts(self):
+        """要素の型ごとに文字列へ変換する"""
+        self.assertEqual(
+            build_key('dashboard', 1, None, True, date(2026, 1, 2)),
+            'dashboard:1:all:1:2026-01-02'
+        )
+
+    def test_unsafe_parts_are_hashed(self):
+        """区切り文字・非ASCII・長い値はハッシュ化して固定長にする"""
+        for value in ('a:b', 'カレー', 'x' * 100, 'a b'):
+            part = key_part(value)
+            self.assertEqual(len(part), 40)
+            self.assertNotIn(':', part)
+        self.assertEqual(key_part('カレー'), key_part('カレー'))
+
+    def test_scopes(self):
+        self.assertEqual(user_scope(5), 'user-5')
+        self.assertEqual(dataset_scope('standard_foods'), 'dataset-standard_foods')
+
+
+class CacheNamespaceTests(TestCase):
+    """バージョン付き名前空間のテスト"""
+
+    def setUp(self):
+        self.menus = CacheNamespace('menus')
+        self.dashboard = CacheNamespace('dashboard', serializer='json')
+
+    def test_invalidate_namespace(self):
+        """名前空間のバージョンを進めると古いキーは参照されない"""
+        key = self.menus.key('list')
+        self.menus.set(key, ['a'])
+        self.assertEqual(self.menus.get(self.menus.key('list')), ['a'])
+
+        self.menus.invalidate()
+        self.assertNotEqual(self.menus.key('list'), key)
+        self.assertIsNone(self.menus.get(self.menus.key('list')))
+
+    def test_invalidate_scope_across_namespaces(self):
+        """スコープを無効化するとそのスコープの全名前空間のキーが変わり、他のスコープは残る"""
+        alice, bob = user_scope(1), user_scope(2)
+        self.menus.set(self.menus.key('recent', scope=alice), 'menus')
+        self.dashboard.set(self.dashboard.key('today', scope=alice), {'calories': 100})
+        self.dashboard.set(self.dashboard.key('today', scope=bob), {'calories': 200})
+
+        invalidate_scope(alice)
+        self.assertIsNone(self.menus.get(self.menus.key('recent', scope=alice)))
+        self.assertIsNone(self.dashboard.get(self.dashboard.key('today', scope=alice)))
+        self.assertEqual(self.dashboard.get(self.dashboard.key('today', scope=bob)), {'calories': 200})
+
+    def test_evicted_version_does_not_resurrect_old_keys(self):
+        """バージョンのキーが消えても以前のバージョンには戻らない"""
+        old_key = self.menus.key('list')
+        self.menus.set(old_key, 'stale')
+        cache.delete('cache_version:namespace:menus')
+        with patch('record_app.cache.time.time', return_value=10 ** 10):
+            self.assertNotEqual(self.menus.key('list'), old_key)
+
+    def test_json_serializer(self):
+        """json は日付などを文字列にして保存する"""
+        key = self.dashboard.key('today')
+        self.dashboard.set(key, {'date': date(2026, 1, 2), 'values': [1, 2.5]})
+        self.assertIsInstance(cache.get(key), str)
+        self.assertEqual(self.dashboard.get(key), {'date': '2026-01-02', 'values': [1, 2.5]})
+
+    def test_unknown_serializer(self):
+        with self.assertRaises(ValueError):
+            CacheNamespace('x', serializer='yaml')
+
+    def test_get_or_compute_caches_result(self):
+        """計算結果は保存され、2回目は計算しない（Noneも保存する）"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return None
+
+        key = self.menus.key('empty')
+        self.assertIsNone(self.menus.get_or_compute(key, compute))
+        self.assertIsNone(self.menus.get_or_compute(key, compute))
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(cache.get(f'{key}:lock'))
+
+    def test_get_or_compute_waits_for_lock_holder(self):
+        """他のプロセスが計算中なら計算せずに結果を待つ"""
+        key = self.menus.key('list')
+        cache.add(f'{key}:lock', 1)
+        timer = threading.Timer(0.1, lambda: self.menus.set(key, 'computed elsewhere'))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        value = self.menus.get_or_compute(key, lambda: self.fail('計算されてはいけない'))
+        self.assertEqual(value, 'computed elsewhere')
+
+    def test_get_or_compute_falls_back_after_wait(self):
+        """ロックが解放されないまま待ち時間を過ぎたら自分で計算する"""
+        key = self.menus.key('list')
+        cache.add(f'{key}:lock', 1)
+        with patch.object(CacheNamespace, 'LOCK_WAIT', 0.1):
+            self.assertEqual(self.menus.get_or_compute(key, lambda: 'fallback'), 'fallback')
+
+    def test_release_lock_on_error(self):
+        """計算が失敗してもロックは解放される"""
+        def compute():
+            raise RuntimeError('failed')
+
+        key = self.menus.key('list')
+        with self.assertRaises(RuntimeError):
+            self.menus.get_or_compute(key, compute)
+        self.assertIsNone(cache.get(f'{key}:lock'))
+
+
+class LocalLRUCacheTests(SimpleTestCase):
+    """プロセス内LRUキャッシュのテスト"""
+
+    def test_evicts_least_recently_used(self):
+        lru = LocalLRUCache(max_size=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), (1, None, 3))
+
+    def test_entries_expire(self):
+        lru = LocalLRUCache(ttl=10)
+        with patch('record_app.cache.time.monotonic', return_value=100.0):
+            lru.set('a', 1)
+        with patch('record_app.cache.time.monotonic', return_value=109.0):
+            self.assertEqual(lru.get('a'), 1)
+        with patch('record_app.cache.time.monotonic', return_value=110.0):
+            self.assertIsNone(lru.get('a'))
+
+    def test_delete(self):
+        lru = LocalLRUCache()
+        lru.set('a', 1)
+        lru.delete('a')
+        lru.delete('missing')
+        self.assertIsNone(lru.get('a'))
+
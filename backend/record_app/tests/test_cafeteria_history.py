@@ -0,0 +1,105 @@
+from datetime import date
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.test import TestCase
+from freezegun import freeze_time
+from rest_framework.test import APIClient
+from record_app.models import Cafeteria, CafeteriaMenuHistory
+from record_app.business_logic.cafeteria_scraping import CafeteriaScraper
+from record_app.tests.test_cafeteria_scraper import FakeSite
+
+
+class CafeteriaMenuHistoryTests(TestCase):
+    """食堂メニューの提供履歴のテスト"""
+
+    def setUp(self):
+        self.site = FakeSite(
+            categories={'on_a': [('101', 'ハンバーグ'), ('102', '唐揚げ')]},
+            details={'101': 650, '102': 700, '103': 500},
+        )
+
+    def _scrape_on(self, day):
+        with freeze_time(day):
+            scraper = CafeteriaScraper(requests_per_second=0)
+            with patch.object(scraper.session, 'get', side_effect=self.site.get):
+                return scraper.fetch_and_update_menus()
+
+    def _available(self, day):
+        return sorted(
+            (row.menu_id, row.calories) for row in CafeteriaMenuHistory.available_on(day)
+        )
+
+    def test_history_records_only_deltas(self):
+        """変更・追加・削除のあったメニューのみ履歴行が増える"""
+        self._scrape_on('2026-04-01')
+        self.assertEqual(CafeteriaMenuHistory.objects.count(), 2)
+
+        # 変更なし
+        self._scrape_on('2026-04-02')
+        self.assertEqual(CafeteriaMenuHistory.objects.count(), 2)
+
+        # 102 の栄養素変更、101 の提供終了、103 の追加
+        self.site.categories = {'on_a': [('102', '唐揚げ'), ('103', 'サラダ')]}
+        self.site.details['102'] = 720
+        self._scrape_on('2026-04-10')
+        self.assertEqual(CafeteriaMenuHistory.objects.count(), 4)
+
+        self.assertEqual(self._available(date(2026, 4, 5)), [('101', 650), ('102', 700)])
+        self.assertEqual(self._available(date(2026, 4, 10)), [('102', 720), ('103', 500)])
+        self.assertEqual(self._available(date(2026, 3, 31)), [])
+
+    def test_same_day_change_rewrites_open_row(self):
+        """同じ日の再変更は期間が空の行を作らず書き換える"""
+        self._scrape_on('2026-04-01')
+        self.site.details['101'] = 600
+        self._scrape_on('2026-04-01')
+
+        self.assertEqual(CafeteriaMenuHistory.objects.filter(menu_id='101').count(), 1)
+        self.assertEqual(self._available(date(2026, 4, 1)), [('101', 600), ('102', 700)])
+
+    def test_reappearing_menu_starts_new_interval(self):
+        """一度消えたメニューが再登場すると新しい期間になる"""
+        self._scrape_on('2026-04-01')
+        self.site.categories = {'on_a': [('102', '唐揚げ')]}
+        self._scrape_on('2026-04-03')
+        self.site.categories = {'on_a': [('101', 'ハンバーグ'), ('102', '唐揚げ')]}
+        self._scrape_on('2026-04-07')
+
+        periods = list(
+            CafeteriaMenuHistory.objects.filter(menu_id='101').values_list('valid_from', 'valid_to')
+        )
+        self.assertEqual(periods, [
+            (date(2026, 4, 1), date(2026, 4, 3)),
+            (date(2026, 4, 7), None),
+        ])
+        self.assertEqual(self._available(date(2026, 4, 5)), [('102', 700)])
+
+
+class AvailableMenusAPITests(TestCase):
+    """指定日の提供メニューAPIのテスト"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='testuser', password='testpass123'))
+        cafeteria = Cafeteria.get_default()
+        nutrition = {'calories': 600, 'protein': 20, 'fat': 10, 'carbohydrates': 80}
+        CafeteriaMenuHistory.objects.create(
+            cafeteria=cafeteria, menu_id='101', name='ハンバーグ', category='main',
+            valid_from=date(2026, 4, 1), valid_to=date(2026, 4, 10), **nutrition
+        )
+        CafeteriaMenuHistory.objects.create(
+            cafeteria=cafeteria, menu_id='201', name='ラーメン', category='noodle',
+            valid_from=date(2026, 4, 5), **nutrition
+        )
+
+    def test_menus_available_on_date(self):
+        response = self.client.get('/api/cafeteria/available/', {'date': '2026-04-06'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['name'] for m in response.data['menus']], ['ハンバーグ', 'ラーメン'])
+
+        response = self.client.get('/api/cafeteria/available/', {'date': '2026-04-10', 'category': 'noodle'})
+        self.assertEqual([m['menu_id'] for m in response.data['menus']], ['201'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/cafeteria/available/', {'date': '4/6'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/cafeteria/available/', {'cafeteria': 'x'}).status_code, 400)
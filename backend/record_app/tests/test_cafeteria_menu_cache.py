@@ -0,0 +1,93 @@
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from record_app.models import Cafeteria, CafeteriaMenu
+from record_app.responses import PreRenderedJSONResponse
+from record_app.services import CafeteriaMenuListService
+
+
+class CafeteriaMenuListCacheTests(APITestCase):
+    """食堂メニュー一覧のキャッシュのテスト"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = '/api/cafeteria/list/'
+        self.curry = self._create_menu('001', 'チキンカレー', 'rice')
+        self._create_menu('002', 'ハンバーグ定食', 'main')
+
+    def _create_menu(self, menu_id, name, category, **extra):
+        return CafeteriaMenu.objects.create(
+            menu_id=menu_id, name=name, category=category,
+            calories=600, protein=20, fat=15, carbohydrates=80, **extra
+        )
+
+    def test_cache_hit_issues_no_menu_queries(self):
+        """2回目以降はメニューテーブルを参照しない"""
+        first = self.client.get(self.url)
+        self.assertIsInstance(first, PreRenderedJSONResponse)
+
+        # 認証もキャッシュ済みのため、クエリは発行しない
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(len(second.data), 2)
+
+    def test_payload_matches_serializer_output(self):
+        """キャッシュ済みJSONは従来のシリアライザ出力と同じ"""
+        response = self.client.get(self.url, {'category': 'rice'})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['name'], 'チキンカレー')
+        self.assertEqual(response.data[0]['category_display'], '丼・カレー')
+
+    def test_etag_not_modified(self):
+        """ETagが一致すれば304"""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_menu_change_invalidates(self):
+        """メニューの変更で一覧とETagが更新される"""
+        etag = self.client.get(self.url)['ETag']
+        self.curry.calories = 720
+        self.curry.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        curry = next(menu for menu in response.data if menu['menu_id'] == '001')
+        self.assertEqual(curry['calories'], 720)
+
+    def test_refresh_precomputes_every_category(self):
+        """更新後の事前作成で全カテゴリーの一覧がキャッシュされる"""
+        cafeteria_id = Cafeteria.get_default().id
+        CafeteriaMenuListService.refresh(cafeteria_id)
+
+        # 初回の認証（トークン）のみ
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {'category': 'noodle'})
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.url, {'cafeteria': cafeteria_id, 'category': 'main'}
+            )
+        self.assertEqual([menu['name'] for menu in response.data], ['ハンバーグ定食'])
+
+    def test_payloads_expire(self):
+        """古い世代のエントリが残り続けないよう、有限のTTLで保存する"""
+        with patch('record_app.services.cache.set_many', wraps=cache.set_many) as set_many:
+            CafeteriaMenuListService.refresh()
+        self.assertEqual(set_many.call_args.kwargs['timeout'], CafeteriaMenuListService.CACHE_TIMEOUT)
+        self.assertIsNotNone(CafeteriaMenuListService.CACHE_TIMEOUT)
+
+    def test_unknown_category_and_cafeteria(self):
+        """存在しないカテゴリー・食堂は空の一覧"""
+        self.assertEqual(self.client.get(self.url, {'category': 'unknown'}).data, [])
+        self.assertEqual(self.client.get(self.url, {'cafeteria': 9999}).data, [])
@@ -0,0 +1,691 @@
+import threading
+import time
+import requests
+from io import StringIO
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from celery import current_app
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+from record_app.models import Cafeteria, CafeteriaMenu, CafeteriaMenuDetailCache
+from record_app.business_logic.cafeteria_scraping import (
+    CafeteriaScraper, RateLimitedRetry, RateLimiter, ScrapeMetrics, ScrapingError, SharedRateLimiter
+)
+from record_app.business_logic.scraper_replay import FixtureAdapter
+from record_app.tasks import (
+    update_cafeteria_menus_task, update_cafeteria_site_task, summarize_cafeteria_updates_task
+)
+
+
+def _category_html(menus):
+    items = ''.join(
+        f'<li><a href="detail.php?t=650118&c={menu_id}"><h3>{name}<span>¥400</span></h3></a></li>'
+        for menu_id, name in menus
+    )
+    return f'<!-- Loaded --><ul>{items}</ul>'
+
+
+def _detail_html(calories, protein=10.0):
+    return (
+        '<ul class="detail">'
+        f'<li><strong>エネルギー</strong><span class="price">{calories}kcal</span></li>'
+        f'<li><strong>たんぱく質</strong><span class="price">{protein}g</span></li>'
+        '</ul>'
+    )
+
+
+class FakeResponse:
+    def __init__(self, text='', status_code=200, headers=None):
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.encoding = None
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} Error')
+
+
+class FakeSite:
+    """
+    カテゴリー一覧・詳細ページを返すスタブ（session.getの置き換え）
+
+    etags=True の場合、詳細ページは内容に応じたETagを返し、
+    If-None-Match が一致すれば304を返す。
+    failing に含まれるカテゴリーID・メニューIDは通信エラーになる。
+    error_pages に含まれるカテゴリーID・メニューIDは一覧・栄養素の表のないページを200で返す。
+    """
+
+    def __init__(self, categories, details, latency=0.0, etags=False):
+        self.categories = categories
+        self.details = details
+        self.latency = latency
+        self.etags = etags
+        self.failing = set()
+        self.error_pages = set()
+        self.urls = []
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None, headers=None):
+        with self._lock:
+            self.urls.append(url)
+        time.sleep(self.latency)
+        if params:
+            if params['a'] in self.failing:
+                raise requests.ConnectionError(params['a'])
+            if params['a'] in self.error_pages:
+                return FakeResponse('<html><body><p>ただいまメンテナンス中です</p></body></html>')
+            return FakeResponse(_category_html(self.categories.get(params['a'], [])))
+
+        menu_id = url.split('c=')[-1]
+        if menu_id in self.failing:
+            raise requests.ConnectionError(menu_id)
+        if menu_id in self.error_pages:
+            return FakeResponse('<html><body><p>ただいまメンテナンス中です</p></body></html>')
+        html = _detail_html(self.details[menu_id])
+        if not self.etags:
+            return FakeResponse(html)
+
+        etag = f'"{hash(html) & 0xffffffff:x}"'
+        if (headers or {}).get('If-None-Match') == etag:
+            with self._lock:
+                self.not_modified += 1
+            return FakeResponse(status_code=304, headers={'ETag': etag})
+        return FakeResponse(html, headers={'ETag': etag})
+
+
+class RateLimiterTests(TestCase):
+    """リクエスト間隔制御のテスト"""
+
+    def test_requests_are_spaced_across_threads(self):
+        """複数スレッドから呼んでも全体で上限を超えない"""
+        limiter = RateLimiter(rate=50)
+        threads = [threading.Thread(target=limiter.wait) for _ in range(6)]
+
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 6回目の枠は最初の枠から 5 × 0.02秒 後
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+    def test_zero_rate_disables_limit(self):
+        """rate=0 は待機しない"""
+        limiter = RateLimiter(rate=0)
+        start = time.monotonic()
+        for _ in range(100):
+            limiter.wait()
+        self.assertLess(time.monotonic() - start, 0.05)
+
+
+class SharedRateLimiterTests(TestCase):
+    """プロセス間で共有するレート制限のテスト"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_limit_is_shared_between_limiters_for_same_host(self):
+        """別々のスクレイパー（別プロセス相当）から同じホストに送っても合計で上限を超えない"""
+        limiters = [SharedRateLimiter('west2-univ.jp', rate=50) for _ in range(3)]
+        threads = [threading.Thread(target=limiters[index % 3].wait) for index in range(6)]
+
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 6回のリクエストは別々の0.02秒の枠を使う（最初の枠は途中から始まりうる）
+        self.assertGreaterEqual(time.monotonic() - start, 0.08)
+
+    def test_hosts_are_limited_separately(self):
+        first = SharedRateLimiter('a.example', rate=1)
+        second = SharedRateLimiter('b.example', rate=1)
+        start = time.monotonic()
+        first.wait()
+        second.wait()
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_cache_error_falls_back_to_local_limit(self):
+        limiter = SharedRateLimiter('west2-univ.jp', rate=50)
+        with patch('record_app.business_logic.cafeteria_scraping.cache.add', side_effect=ConnectionError), \
+                self.assertLogs('record_app.business_logic.cafeteria_scraping', level='WARNING'):
+            limiter.wait()
+
+    def test_retries_wait_for_rate_limit(self):
+        """urllib3の再試行もバックオフの後にレート制限の枠を待つ"""
+        scraper = CafeteriaScraper()
+        retry = scraper.session.get_adapter('https://west2-univ.jp/').max_retries
+        self.assertIsInstance(retry, RateLimitedRetry)
+        self.assertIs(retry.rate_limiter, scraper.rate_limiter)
+
+        limiter = MagicMock()
+        retry = RateLimitedRetry(total=3, rate_limiter=limiter).new(total=2)
+        self.assertIs(retry.rate_limiter, limiter)
+        retry.sleep()
+        limiter.wait.assert_called_once()
+
+
+class CafeteriaScraperTests(TestCase):
+    """並行スクレイピングのテスト"""
+
+    def setUp(self):
+        self.site = FakeSite(
+            categories={
+                'on_a': [('101', 'ハンバーグ'), ('102', '唐揚げ')],
+                'on_c': [('201', 'ラーメン')],
+            },
+            details={'101': 650, '102': 700, '201': 550},
+        )
+
+    def _scrape(self, **kwargs):
+        scraper = CafeteriaScraper(requests_per_second=0, **kwargs)
+        with patch.object(scraper.session, 'get', side_effect=self.site.get):
+            return scraper.fetch_and_update_menus()
+
+    def test_fetches_all_categories_and_details(self):
+        """全カテゴリーと各メニューの詳細を取得して保存"""
+        summary = self._scrape()
+        self.assertEqual(summary, {'total': 3, 'added': 3, 'changed': 0, 'removed': 0})
+
+        menu = CafeteriaMenu.objects.get(menu_id='101')
+        self.assertEqual(menu.name, 'ハンバーグ')
+        self.assertEqual(menu.category, 'main')
+        self.assertEqual(menu.calories, 650)
+        self.assertEqual(menu.protein, 10.0)
+        self.assertEqual(CafeteriaMenu.objects.get(menu_id='201').category, 'noodle')
+
+        detail_requests = [url for url in self.site.urls if 'detail.php' in url]
+        self.assertEqual(len(self.site.urls), len(CafeteriaScraper.CATEGORY_MAP) + 3)
+        self.assertEqual(len(detail_requests), 3)
+
+    def test_wall_time_bounded_by_concurrency(self):
+        """詳細ページの取得は並行で行われ、レイテンシの合計より速い"""
+        self.site.latency = 0.05
+        start = time.monotonic()
+        self._scrape(max_workers=8)
+        elapsed = time.monotonic() - start
+
+        # 逐次なら 12リクエスト × 0.05秒 = 0.6秒
+        self.assertLess(elapsed, 0.4)
+
+
+class CafeteriaMenuUpsertTests(TestCase):
+    """メニューの差分upsertのテスト"""
+
+    def setUp(self):
+        self.site = FakeSite(
+            categories={'on_a': [('101', 'ハンバーグ'), ('102', '唐揚げ')]},
+            details={'101': 650, '102': 700, '103': 500},
+        )
+        self._scrape()
+
+    def _scrape(self):
+        scraper = CafeteriaScraper(requests_per_second=0)
+        with patch.object(scraper.session, 'get', side_effect=self.site.get):
+            return scraper.fetch_and_update_menus()
+
+    def test_unchanged_menus_are_not_rewritten(self):
+        """変更がなければ行は書き換えず、主キーも維持される"""
+        before = dict(CafeteriaMenu.objects.values_list('menu_id', 'updated_at'))
+        pks = dict(CafeteriaMenu.objects.values_list('menu_id', 'pk'))
+
+        summary = self._scrape()
+        self.assertEqual(summary, {'total': 2, 'added': 0, 'changed': 0, 'removed': 0})
+        self.assertEqual(dict(CafeteriaMenu.objects.values_list('menu_id', 'updated_at')), before)
+        self.assertEqual(dict(CafeteriaMenu.objects.values_list('menu_id', 'pk')), pks)
+
+    def test_added_changed_and_removed(self):
+        """追加・変更・削除がそれぞれ反映される"""
+        pk = CafeteriaMenu.objects.get(menu_id='102').pk
+        self.site.categories = {'on_a': [('102', '唐揚げ'), ('103', 'サラダ')]}
+        self.site.details['102'] = 720
+
+        summary = self._scrape()
+        self.assertEqual(summary, {'total': 2, 'added': 1, 'changed': 1, 'removed': 1})
+        self.assertEqual(
+            sorted(CafeteriaMenu.objects.values_list('menu_id', flat=True)), ['102', '103']
+        )
+        menu = CafeteriaMenu.objects.get(menu_id='102')
+        self.assertEqual(menu.pk, pk)
+        self.assertEqual(menu.calories, 720)
+
+    def test_duplicate_menu_across_categories(self):
+        """複数カテゴリーに同じメニューがあっても1件として保存"""
+        self.site.categories['on_e'] = [('101', 'ハンバーグ')]
+        summary = self._scrape()
+        self.assertEqual(summary['total'], 2)
+        self.assertEqual(CafeteriaMenu.objects.get(menu_id='101').category, 'main')
+
+    def test_empty_result_keeps_existing_menus(self):
+        """1件も取得できなければ既存データを残す"""
+        self.site.categories = {}
+        summary = self._scrape()
+        self.assertEqual(summary['total'], 0)
+        self.assertEqual(CafeteriaMenu.objects.count(), 2)
+
+    def test_changes_refresh_menu_list_cache(self):
+        """変更があればコミット後に一覧のキャッシュを作り直す"""
+        self.site.details['101'] = 600
+        with patch('record_app.business_logic.cafeteria_scraping.CafeteriaMenuListService.refresh') as refresh, \
+                self.captureOnCommitCallbacks(execute=True):
+            self._scrape()
+        refresh.assert_called_once_with(Cafeteria.get_default().id)
+
+        with patch('record_app.business_logic.cafeteria_scraping.CafeteriaMenuListService.refresh') as refresh, \
+                self.captureOnCommitCallbacks(execute=True):
+            self._scrape()
+        refresh.assert_not_called()
+
+    def test_site_task_returns_summary(self):
+        """食堂ごとのタスクは追加・変更・削除件数を返す"""
+        self.site.details['101'] = 600
+        cafeteria = Cafeteria.get_default()
+        with patch.object(CafeteriaScraper, '_get', side_effect=lambda url, **kw: self.site.get(url, **kw)):
+            result = update_cafeteria_site_task(cafeteria.id)
+        self.assertIn('timings_ms', result.pop('metrics'))
+        self.assertEqual(result, {
+            'cafeteria_id': cafeteria.id, 'site_id': cafeteria.site_id,
+            'total': 2, 'added': 0, 'changed': 1, 'removed': 0,
+        })
+
+
+class ScrapeResilienceTests(TestCase):
+    """取得失敗時の再試行・既存データの保持・チェックポイントのテスト"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.site = FakeSite(
+            categories={
+                'on_a': [('101', 'ハンバーグ'), ('102', '唐揚げ')],
+                'on_c': [('201', 'ラーメン')],
+            },
+            details={'101': 650, '102': 700, '201': 550, '103': 500},
+        )
+        self._scrape()
+        self.site.urls.clear()
+
+    def _scrape(self):
+        scraper = CafeteriaScraper(requests_per_second=0)
+        with patch.object(scraper.session, 'get', side_effect=self.site.get):
+            return scraper.fetch_and_update_menus()
+
+    def test_session_retries_with_backoff(self):
+        """セッションには指数バックオフ付きの再試行が設定されている"""
+        scraper = CafeteriaScraper()
+        retry = scraper.session.get_adapter('https://west2-univ.jp/').max_retries
+        self.assertEqual(retry.total, CafeteriaScraper.MAX_RETRIES)
+        self.assertEqual(retry.backoff_factor, CafeteriaScraper.RETRY_BACKOFF)
+        self.assertIn(503, retry.status_forcelist)
+        self.assertTrue(retry.respect_retry_after_header)
+
+    def test_failed_detail_keeps_previous_value(self):
+        """詳細の取得に失敗したメニューは前回の栄養素を保持する"""
+        self.site.failing = {'101'}
+        self.site.details['102'] = 720
+        summary = self._scrape()
+
+        self.assertEqual(summary, {'total': 3, 'added': 0, 'changed': 1, 'removed': 0})
+        self.assertEqual(CafeteriaMenu.objects.get(menu_id='101').calories, 650)
+        self.assertEqual(CafeteriaMenu.objects.get(menu_id='102').calories, 720)
+
+    def test_failed_detail_without_cache_uses_saved_menu(self):
+        """詳細キャッシュがなくても登録済みメニューの値を使い、0で上書きしない"""
+        CafeteriaMenuDetailCache.objects.all().delete()
+        self.site.failing = {'101'}
+        summary = self._scrape()
+
+        self.assertEqual(summary['changed'], 0)
+        self.assertEqual(CafeteriaMenu.objects.get(menu_id='101').calories, 650)
+
+    def test_page_without_nutrition_keeps_previous_value(self):
+        """200で返ったエラーページ（栄養素の表がない）では0で上書きせず、キャッシュもしない"""
+        self.site.error_pages = {'101'}
+        summary = self._scrape()
+
+        self.assertEqual(summary['changed'], 0)
+        self.assertEqual(CafeteriaMenu.objects.get(menu_id='101').calories, 650)
+        self.assertEqual(CafeteriaMenuDetailCache.objects.get(menu_id='101').nutrition['calories'], 650)
+
+    def test_new_menu_with_failed_detail_is_skipped(self):
+        """前回の値がない新規メニューは詳細を取得できるまで登録しない"""
+        self.site.categories['on_a'].append(('103', 'サラダ'))
+        self.site.failing = {'103'}
+        summary = self._scrape()
+
+        self.assertEqual(summary['added'], 0)
+        self.assertFalse(CafeteriaMenu.objects.filter(menu_id='103').exists())
+
+    def test_failed_category_keeps_its_menus(self):
+        """一覧の取得に失敗したカテゴリーのメニューは削除しない"""
+        self.site.failing = {'on_a'}
+        self.site.categories['on_c'] = []
+        summary = self._scrape()
+
+        self.assertEqual(summary['removed'], 0)
+        self.assertEqual(
+            sorted(CafeteriaMenu.objects.values_list('menu_id', flat=True)), ['101', '102', '201']
+        )
+
+    def test_category_error_page_keeps_its_menus(self):
+        """200で返った一覧のないページ（メンテナンス中など）は取得失敗として扱い、メニューを削除しない"""
+        self.site.error_pages = {'on_a'}
+        scraper = CafeteriaScraper(requests_per_second=0)
+        with patch.object(scraper.session, 'get', side_effect=self.site.get):
+            summary = scraper.fetch_and_update_menus()
+
+        self.assertEqual(summary['removed'], 0)
+        self.assertEqual(scraper.metrics.counters['category_errors'], 1)
+        self.assertEqual(
+            sorted(CafeteriaMenu.objects.values_list('menu_id', flat=True)), ['101', '102', '201']
+        )
+
+    def test_all_categories_failed_raises(self):
+        """全カテゴリーの取得に失敗した場合は例外にして既存データを残す"""
+        self.site.failing = set(CafeteriaScraper.CATEGORY_MAP)
+        with self.assertRaises(ScrapingError):
+            self._scrape()
+        self.assertEqual(CafeteriaMenu.objects.count(), 3)
+
+    def test_retry_resumes_from_checkpoint(self):
+        """保存前に失敗した場合、再実行は取得済みの詳細ページを取り直さない"""
+        self.site.details.update({'101': 600, '201': 580})
+        scraper = CafeteriaScraper(requests_per_second=0)
+        with patch.object(scraper.session, 'get', side_effect=self.site.get), \
+                patch.object(scraper, '_save_menus', side_effect=RuntimeError('db down')):
+            with self.assertRaises(ScrapingError):
+                scraper.fetch_and_update_menus()
+        self.assertEqual(len([url for url in self.site.urls if 'detail.php' in url]), 3)
+
+        self.site.urls.clear()
+        summary = self._scrape()
+        self.assertEqual([url for url in self.site.urls if 'detail.php' in url], [])
+        self.assertEqual(summary['changed'], 2)
+        self.assertEqual(CafeteriaMenu.objects.get(menu_id='101').calories, 600)
+
+        # 成功後はチェックポイントを破棄し、次回は全件取得する
+        self.site.urls.clear()
+        self._scrape()
+        self.assertEqual(len([url for url in self.site.urls if 'detail.php' in url]), 3)
+
+    def test_site_task_retries_then_reports_error(self):
+        """食堂ごとのタスクは失敗時に再試行し、上限を超えたらエラーを返す"""
+        self.site.failing = set(CafeteriaScraper.CATEGORY_MAP)
+        cafeteria = Cafeteria.get_default()
+        with patch.object(CafeteriaScraper, '_get', side_effect=lambda url, **kw: self.site.get(url, **kw)):
+            result = update_cafeteria_site_task.apply(args=(cafeteria.id,)).get()
+
+        self.assertEqual(result['cafeteria_id'], cafeteria.id)
+        self.assertIn('error', result)
+        attempts = update_cafeteria_site_task.max_retries + 1
+        self.assertEqual(len(self.site.urls), attempts * len(CafeteriaScraper.CATEGORY_MAP))
+
+
+class DetailCacheTests(TestCase):
+    """詳細ページの条件付き取得・キャッシュのテスト"""
+
+    def setUp(self):
+        self.site = FakeSite(
+            categories={'on_a': [('101', 'ハンバーグ'), ('102', '唐揚げ')]},
+            details={'101': 650, '102': 700},
+            etags=True,
+        )
+
+    def _scrape(self):
+        scraper = CafeteriaScraper(requests_per_second=0)
+        with patch.object(scraper.session, 'get', side_effect=self.site.get), \
+                patch.object(scraper, '_parse_nutrition', wraps=scraper._parse_nutrition) as parse:
+            summary = scraper.fetch_and_update_menus()
+        return summary, parse.call_count
+
+    def test_first_run_populates_cache(self):
+        """初回は全詳細ページをパースしてキャッシュする"""
+        _, parsed = self._scrape()
+        self.assertEqual(parsed, 2)
+        cache = CafeteriaMenuDetailCache.objects.get(menu_id='101')
+        self.assertTrue(cache.etag)
+        self.assertEqual(cache.nutrition['calories'], 650)
+
+    def test_unchanged_pages_are_not_parsed(self):
+        """ETagが一致すれば304となり、パースせず前回の栄養素を使う"""
+        self._scrape()
+        summary, parsed = self._scrape()
+
+        self.assertEqual(parsed, 0)
+        self.assertEqual(self.site.not_modified, 2)
+        self.assertEqual(summary['changed'], 0)
+        self.assertEqual(CafeteriaMenu.objects.get(menu_id='101').calories, 650)
+
+    def test_changed_page_is_parsed(self):
+        """内容が変わったページのみパースする"""
+        self._scrape()
+        self.site.details['102'] = 720
+        summary, parsed = self._scrape()
+
+        self.assertEqual(parsed, 1)
+        self.assertEqual(summary['changed'], 1)
+        self.assertEqual(CafeteriaMenuDetailCache.objects.get(menu_id='102').nutrition['calories'], 720)
+
+    def test_same_content_without_validators_skips_parse(self):
+        """ETagを返さないサーバーでも内容のハッシュが同じならパースしない"""
+        self.site.etags = False
+        self._scrape()
+        _, parsed = self._scrape()
+        self.assertEqual(parsed, 0)
+
+
+class ScrapeMetricsTests(TestCase):
+    """スクレイピングの計測値のテスト"""
+
+    def setUp(self):
+        self.site = FakeSite(
+            categories={'on_a': [('101', 'ハンバーグ'), ('102', '唐揚げ')]},
+            details={'101': 650, '102': 700},
+            etags=True,
+        )
+
+    def _scrape(self):
+        scraper = CafeteriaScraper(requests_per_second=0)
+        with patch.object(scraper.session, 'get', side_effect=self.site.get):
+            scraper.fetch_and_update_menus()
+        return scraper.metrics.as_dict()
+
+    def test_counts_requests_and_bytes_per_phase(self):
+        """カテゴリー・詳細ごとにリクエスト数と転送量、各フェーズの時間を記録する"""
+        metrics = self._scrape()
+
+        self.assertEqual(metrics['category_requests'], len(CafeteriaScraper.CATEGORY_MAP))
+        self.assertEqual(metrics['detail_requests'], 2)
+        self.assertGreater(metrics['category_bytes'], 0)
+        self.assertGreater(metrics['detail_bytes'], 0)
+        self.assertEqual(metrics['detail_errors'], 0)
+        self.assertEqual(set(metrics['timings_ms']), set(ScrapeMetrics.TIMINGS))
+        self.assertGreater(metrics['timings_ms']['db_write'], 0)
+        self.assertGreaterEqual(metrics['elapsed_ms'], metrics['timings_ms']['db_write'])
+
+    def test_counts_not_modified_and_errors(self):
+        """2回目は304の件数を、通信エラーはエラー数を記録する"""
+        self._scrape()
+        self.site.failing = {'102'}
+        metrics = self._scrape()
+
+        self.assertEqual(metrics['detail_not_modified'], 1)
+        self.assertEqual(metrics['detail_errors'], 1)
+        self.assertEqual(metrics['detail_bytes'], 0)
+
+    def test_progress_is_logged_not_printed(self):
+        """進捗は標準出力ではなくロガーに出力する"""
+        with patch('sys.stdout', new_callable=StringIO) as stdout, \
+                self.assertLogs('record_app.business_logic.cafeteria_scraping', level='INFO') as logs:
+            self._scrape()
+        self.assertEqual(stdout.getvalue(), '')
+        self.assertTrue(any('detail_requests=2' in line for line in logs.output))
+
+    def test_combine(self):
+        """複数食堂の計測値は経過時間を最大値、それ以外を合計で集約する"""
+        first, second = ScrapeMetrics(), ScrapeMetrics()
+        first.elapsed, second.elapsed = 0.5, 0.2
+        first.timings['detail_fetch'], second.timings['detail_fetch'] = 0.3, 0.1
+        first.counters['detail_requests'], second.counters['detail_requests'] = 4, 3
+
+        combined = ScrapeMetrics.combine([first.as_dict(), second.as_dict()])
+        self.assertEqual(combined['elapsed_ms'], 500.0)
+        self.assertEqual(combined['timings_ms']['detail_fetch'], 400.0)
+        self.assertEqual(combined['detail_requests'], 7)
+
+
+class FixtureReplayTests(TestCase):
+    """保存済みHTMLを使ったオフライン再生のテスト"""
+
+    FIXTURES = Path(settings.BASE_DIR) / 'data' / 'cafeteria_fixtures'
+
+    def setUp(self):
+        self.adapter = FixtureAdapter(self.FIXTURES)
+
+    def _scrape(self):
+        scraper = CafeteriaScraper(requests_per_second=0)
+        scraper.session.mount('https://', self.adapter)
+        return scraper.fetch_and_update_menus()
+
+    def test_full_pipeline_against_fixtures(self):
+        """全カテゴリー・詳細ページを取得して保存"""
+        detail_pages = len(list((self.FIXTURES / 'detail').glob('*.html')))
+        summary = self._scrape()
+
+        self.assertEqual(summary['added'], detail_pages)
+        self.assertEqual(self.adapter.stats['category']['requests'], len(CafeteriaScraper.CATEGORY_MAP))
+        self.assertEqual(self.adapter.stats['detail']['requests'], detail_pages)
+        self.assertFalse(CafeteriaMenu.objects.filter(calories=0).exists())
+
+    def test_second_run_uses_conditional_requests(self):
+        """2回目は詳細ページが304となり転送量がなくなる"""
+        self._scrape()
+        self.adapter.reset_stats()
+        summary = self._scrape()
+
+        detail = self.adapter.stats['detail']
+        self.assertEqual(detail['not_modified'], detail['requests'])
+        self.assertEqual(detail['bytes'], 0)
+        self.assertEqual(summary['changed'], 0)
+
+    def test_benchmark_command_rolls_back(self):
+        """ベンチマークコマンドは計測後に書き込みをロールバックする"""
+        out = StringIO()
+        call_command('benchmark_cafeteria_scraper', runs=1, stdout=out)
+        self.assertIn('DB書き込み', out.getvalue())
+        self.assertFalse(CafeteriaMenu.objects.exists())
+
+
+class MultiCafeteriaTests(TestCase):
+    """複数食堂の並列更新のテスト"""
+
+    def setUp(self):
+        self.main = Cafeteria.get_default()
+        self.north = Cafeteria.objects.create(site_id='650200', name='北食堂')
+        self.sites = {
+            self.main.site_id: FakeSite(
+                categories={'on_a': [('101', 'ハンバーグ')]}, details={'101': 650},
+            ),
+            self.north.site_id: FakeSite(
+                categories={'on_a': [('101', 'カレー'), ('102', '唐揚げ')]}, details={'101': 700, '102': 720},
+            ),
+        }
+
+    def _route(self, url, params=None, **kwargs):
+        """URLの t パラメータで食堂ごとのスタブに振り分ける"""
+        site_id = params['t'] if params else url.split('t=')[1].split('&')[0]
+        return self.sites[site_id].get(url, params=params, **kwargs)
+
+    def test_same_menu_id_in_different_cafeterias(self):
+        """同じmenu_idでも食堂ごとに別のメニューとして保存"""
+        for cafeteria in (self.main, self.north):
+            scraper = CafeteriaScraper(cafeteria, requests_per_second=0)
+            with patch.object(scraper.session, 'get', side_effect=self._route):
+                scraper.fetch_and_update_menus()
+
+        self.assertEqual(CafeteriaMenu.objects.get(cafeteria=self.main, menu_id='101').name, 'ハンバーグ')
+        self.assertEqual(CafeteriaMenu.objects.get(cafeteria=self.north, menu_id='101').name, 'カレー')
+
+    def test_refresh_only_touches_own_cafeteria(self):
+        """ある食堂の更新で他の食堂のメニューは削除されない"""
+        for cafeteria in (self.main, self.north):
+            scraper = CafeteriaScraper(cafeteria, requests_per_second=0)
+            with patch.object(scraper.session, 'get', side_effect=self._route):
+                scraper.fetch_and_update_menus()
+
+        self.sites[self.main.site_id].categories = {'on_a': [('103', '焼き魚')]}
+        self.sites[self.main.site_id].details['103'] = 400
+        scraper = CafeteriaScraper(self.main, requests_per_second=0)
+        with patch.object(scraper.session, 'get', side_effect=self._route):
+            summary = scraper.fetch_and_update_menus()
+
+        self.assertEqual(summary['removed'], 1)
+        self.assertEqual(CafeteriaMenu.objects.filter(cafeteria=self.north).count(), 2)
+
+    def test_task_fans_out_per_cafeteria(self):
+        """更新タスクは有効な食堂ごとにサブタスクを発行し、結果を集計する"""
+        Cafeteria.objects.create(site_id='650300', name='休止中', is_active=False)
+
+        eager = current_app.conf.task_always_eager
+        current_app.conf.task_always_eager = True
+        try:
+            with patch.object(CafeteriaScraper, '_get', side_effect=lambda url, **kw: self._route(url, **kw)):
+                result = update_cafeteria_menus_task()
+        finally:
+            current_app.conf.task_always_eager = eager
+
+        self.assertEqual(result['cafeterias'], 2)
+        self.assertEqual(CafeteriaMenu.objects.filter(cafeteria=self.main).count(), 1)
+        self.assertEqual(CafeteriaMenu.objects.filter(cafeteria=self.north).count(), 2)
+        self.assertFalse(CafeteriaMenu.objects.filter(cafeteria__site_id='650300').exists())
+
+    def test_summarize_results(self):
+        """食堂ごとの結果を合計し、失敗数を数える"""
+        summary = summarize_cafeteria_updates_task([
+            {'cafeteria_id': 1, 'site_id': '650118', 'total': 3, 'added': 1, 'changed': 1, 'removed': 0},
+            {'cafeteria_id': 2, 'site_id': '650200', 'total': 2, 'added': 0, 'changed': 0, 'removed': 1},
+            {'cafeteria_id': 3, 'error': '失敗'},
+        ])
+        self.assertEqual(
+            {key: summary[key] for key in ('total', 'added', 'changed', 'removed', 'failed')},
+            {'total': 5, 'added': 1, 'changed': 1, 'removed': 1, 'failed': 1},
+        )
+        self.assertEqual(len(summary['sites']), 3)
+
+
+class CafeteriaMenuFilterTests(TestCase):
+    """食堂による一覧の絞り込みのテスト"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=user)
+        self.main = Cafeteria.get_default()
+        self.north = Cafeteria.objects.create(site_id='650200', name='北食堂')
+        for cafeteria, menu_id, name in ((self.main, '1', 'カレー'), (self.north, '1', 'ラーメン')):
+            CafeteriaMenu.objects.create(
+                cafeteria=cafeteria, menu_id=menu_id, name=name, category='main',
+                calories=500, protein=20, fat=10, carbohydrates=60,
+            )
+
+    def test_filter_by_cafeteria(self):
+        response = self.client.get('/api/cafeteria/list/', {'cafeteria': self.north.id})
+        self.assertEqual([menu['name'] for menu in response.data], ['ラーメン'])
+
+    def test_invalid_cafeteria(self):
+        response = self.client.get('/api/cafeteria/list/', {'cafeteria': 'north'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_cafeterias(self):
+        response = self.client.get('/api/cafeteria/sites/')
+        self.assertEqual([c['site_id'] for c in response.data], ['650118', '650200'])
@@ -0,0 +1,100 @@
+from datetime import date
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from record_app.models import MealRecord, WeightRecord, CustomFood, UserDataVersion
+
+
+class ConditionalGetTests(APITestCase):
+    """ETag / Last-Modifiedによる条件付きGETのテスト"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.meal = MealRecord.objects.create(
+            user=self.user, record_date=date.today(), meal_timing='lunch',
+            meal_name='昼食', calories=600,
+        )
+
+    def test_list_response_has_validators(self):
+        """一覧レスポンスにETagとLast-Modifiedが付与される"""
+        response = self.client.get('/api/meals/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_if_none_match_returns_304(self):
+        """ETagが一致すれば304を返す"""
+        etag = self.client.get('/api/meals/')['ETag']
+
+        response = self.client.get('/api/meals/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_not_modified_does_not_touch_data_tables(self):
+        """304の判定はバージョン参照のみで完結する（認証はキャッシュ済み）"""
+        etag = self.client.get('/api/meals/')['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/meals/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_write_changes_etag(self):
+        """作成・更新・削除でETagが変わる"""
+        etag = self.client.get('/api/meals/')['ETag']
+
+        self.client.patch(f'/api/meals/{self.meal.id}/', {'meal_name': '変更後'})
+        response = self.client.get('/api/meals/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        self.client.delete(f'/api/meals/{self.meal.id}/')
+        response = self.client.get('/api/meals/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 0)
+
+    def test_write_to_any_collection_bumps_version(self):
+        """体重記録やMyアイテムへの書き込みでもバージョンが加算される"""
+        version = UserDataVersion.get_for_user(self.user).version
+
+        WeightRecord.objects.create(user=self.user, record_date=date.today(), weight=60)
+        CustomFood.objects.create(
+            user=self.user, name='テスト食品', calories_per_100g=100,
+            protein_per_100g=1, fat_per_100g=1, carbs_per_100g=1,
+        )
+        self.assertEqual(UserDataVersion.get_for_user(self.user).version, version + 2)
+
+    def test_other_users_write_does_not_change_etag(self):
+        """他ユーザーの書き込みではETagは変わらない"""
+        etag = self.client.get('/api/weights/')['ETag']
+
+        other = User.objects.create_user(username='other', password='otherpass123')
+        UserDataVersion.get_for_user(other)
+        WeightRecord.objects.create(user=other, record_date=date.today(), weight=70)
+
+        response = self.client.get('/api/weights/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_differs_per_query(self):
+        """クエリパラメータが異なればETagも異なる"""
+        etag_all = self.client.get('/api/meals/')['ETag']
+        etag_page = self.client.get('/api/meals/?meal_timing=lunch')['ETag']
+        self.assertNotEqual(etag_all, etag_page)
+
+    def test_retrieve_supports_conditional_get(self):
+        """詳細取得でも条件付きGETが使える"""
+        url = f'/api/meals/{self.meal.id}/'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_not_found_has_no_etag(self):
+        """404レスポンスにはETagを付与しない"""
+        response = self.client.get('/api/meals/999999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
@@ -0,0 +1,139 @@
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from record_app.models import MealRecord, MealRecordItem, WeightRecord
+
+
+class DashboardAPITests(APITestCase):
+    """ダッシュボード一括取得APIのテスト"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = '/api/dashboard/'
+        self.today = date.today()
+
+    def _create_meal(self, record_date, calories, items=0, timing='lunch'):
+        meal = MealRecord.objects.create(
+            user=self.user,
+            record_date=record_date,
+            meal_timing=timing,
+            meal_name=f'{record_date} {timing}',
+            calories=calories, protein=10, fat=5, carbohydrates=30,
+        )
+        MealRecordItem.objects.bulk_create([
+            MealRecordItem(
+                meal_record=meal, item_type='standard', item_id=i,
+                item_name=f'食品{i}', amount_grams=100, display_order=i,
+                calories=calories / max(items, 1),
+            )
+            for i in range(items)
+        ])
+        return meal
+
+    def test_dashboard_returns_all_sections(self):
+        """食事・サマリー・体重・カロリー推移が1レスポンスで返る"""
+        self._create_meal(self.today, 500, items=2, timing='breakfast')
+        self._create_meal(self.today, 700, items=1, timing='dinner')
+        WeightRecord.objects.create(user=self.user, record_date=self.today, weight=65.0)
+
+        response = self.client.get(self.url, {'date': self.today.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(len(response.data['meals']), 2)
+        self.assertEqual(
+            sorted(len(m['items']) for m in response.data['meals']), [1, 2]
+        )
+        self.assertEqual(response.data['nutrition_summary']['calories'], 1200)
+        self.assertEqual(len(response.data['weights']), 1)
+        self.assertEqual(len(response.data['calorie_series']), 7)
+
+    def test_calorie_series_fills_missing_days(self):
+        """記録のない日は0kcalとして7日分返す"""
+        self._create_meal(self.today, 600)
+        self._create_meal(self.today - timedelta(days=2), 400)
+        self._create_meal(self.today - timedelta(days=2), 100, timing='snack')
+        self._create_meal(self.today - timedelta(days=10), 999)
+
+        response = self.client.get(self.url, {'date': self.today.isoformat()})
+        series = response.data['calorie_series']
+
+        self.assertEqual(series[0]['date'], self.today - timedelta(days=6))
+        self.assertEqual(series[-1]['date'], self.today)
+        self.assertEqual(series[-1]['calories'], 600)
+        self.assertEqual(series[-3]['calories'], 500)
+        self.assertEqual(sum(day['calories'] for day in series), 1100)
+
+    def test_weights_limited_to_recent_days(self):
+        """weight_daysより古い体重記録は含まれない"""
+        for days_ago in (0, 5, 40):
+            WeightRecord.objects.create(
+                user=self.user,
+                record_date=self.today - timedelta(days=days_ago),
+                weight=60.0 + days_ago,
+            )
+
+        response = self.client.get(self.url, {'weight_days': 30})
+        self.assertEqual(len(response.data['weights']), 2)
+        self.assertEqual(response.data['weights'][0]['weight'], 60.0)
+
+    def test_query_count_is_constant(self):
+        """食事・アイテム数に関わらずクエリ数が一定"""
+        for days_ago in range(7):
+            for timing in ('breakfast', 'lunch', 'dinner'):
+                self._create_meal(
+                    self.today - timedelta(days=days_ago), 300, items=3, timing=timing
+                )
+            WeightRecord.objects.create(
+                user=self.user, record_date=self.today - timedelta(days=days_ago), weight=60
+            )
+
+        # 認証1回 + 食事・アイテム・体重・カロリー推移の4回
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['meals']), 3)
+
+    def test_invalid_date(self):
+        """不正な日付形式は400"""
+        response = self.client.get(self.url, {'date': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_weight_days(self):
+        """不正なweight_daysは400"""
+        response = self.client.get(self.url, {'weight_days': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'weight_days': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_weight_days_upper_bound(self):
+        """大きすぎるweight_daysは日付の計算がオーバーフローするため400"""
+        response = self.client.get(self.url, {'weight_days': 1000000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'weight_days': 3650})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.url, {'date': '0001-01-05', 'weight_days': 30})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_data_excluded(self):
+        """他ユーザーのデータは含まれない"""
+        other = User.objects.create_user(username='other', password='otherpass123')
+        MealRecord.objects.create(
+            user=other, record_date=self.today, meal_timing='lunch',
+            meal_name='他人の昼食', calories=800,
+        )
+        WeightRecord.objects.create(user=other, record_date=self.today, weight=80)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['meals'], [])
+        self.assertEqual(response.data['weights'], [])
+        self.assertEqual(response.data['nutrition_summary']['calories'], 0)
+
+    def test_unauthenticated_access_denied(self):
+        """未認証でのアクセスは拒否"""
+        response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,105 @@
+import os
+from unittest.mock import MagicMock, patch
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from dishboard_project.settings import base
+from record_app.db_pool import get_pool_stats, reset_inherited_pools
+
+CONNECTION = {'NAME': 'dishboard', 'USER': 'app', 'PASSWORD': 'secret', 'HOST': 'db', 'PORT': '5432'}
+
+
+class PostgresDatabaseSettingsTests(SimpleTestCase):
+    """環境変数からのPostgreSQL接続設定のテスト"""
+
+    def _database(self, process_type='web', **env):
+        with patch.dict(os.environ, env), patch.object(base, 'PROCESS_TYPE', process_type):
+            return base.postgres_database(**CONNECTION)
+
+    def test_native_pool_by_default(self):
+        """既定はプロセスごとのpsycopgプール（持続接続は使わない）"""
+        with patch.dict(os.environ):
+            os.environ.pop('DB_POOL_MODE', None)
+            database = self._database()
+        self.assertEqual(database['NAME'], 'dishboard')
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        pool = database['OPTIONS']['pool']
+        self.assertEqual((pool['min_size'], pool['max_size']), base.DB_POOL_SIZES['web'])
+        self.assertEqual(pool['timeout'], 10)
+
+    def test_pool_size_per_process_type(self):
+        pool = self._database('celery', DB_POOL_MODE='pool')['OPTIONS']['pool']
+        self.assertEqual((pool['min_size'], pool['max_size']), (1, 2))
+
+        pool = self._database('celery', DB_POOL_MODE='pool', DB_POOL_MAX_SIZE='8', DB_POOL_TIMEOUT='2.5')['OPTIONS']['pool']
+        self.assertEqual((pool['max_size'], pool['timeout']), (8, 2.5))
+
+    def test_pgbouncer(self):
+        """PgBouncer経由ではサーバー側カーソルとプリペアドステートメントを使わない"""
+        database = self._database(DB_POOL_MODE='pgbouncer', DB_CONN_MAX_AGE='60')
+        self.assertNotIn('pool', database['OPTIONS'])
+        self.assertTrue(database['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertIsNone(database['OPTIONS']['prepare_threshold'])
+        self.assertEqual(database['CONN_MAX_AGE'], 60)
+
+    def test_persistent(self):
+        database = self._database(DB_POOL_MODE='persistent')
+        self.assertNotIn('pool', database['OPTIONS'])
+        self.assertEqual(database['CONN_MAX_AGE'], 600)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+
+    def test_invalid_values(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self._database(DB_POOL_MODE='pgpool')
+        with self.assertRaises(ImproperlyConfigured):
+            self._database('scheduler', DB_POOL_MODE='pool')
+
+
+class PoolStatsTests(APITestCase):
+    """コネクションプールの統計のテスト"""
+
+    def _fake_pool(self):
+        pool = MagicMock(min_size=2, max_size=4)
+        pool.get_stats.return_value = {
+            'pool_size': 3, 'pool_available': 1, 'requests_waiting': 0,
+            'requests_num': 40, 'requests_queued': 4, 'requests_wait_ms': 30,
+        }
+        return pool
+
+    def _pools(self, pools):
+        # テストはSQLiteのため、PostgreSQLのバックエンドと同じ属性を持たせる
+        return patch.object(connections['default'], '_connection_pools', pools, create=True)
+
+    def test_no_pool(self):
+        """プールを使わない接続ではNone"""
+        self.assertIsNone(get_pool_stats())
+
+    def test_stats_include_average_wait(self):
+        with self._pools({'default': self._fake_pool()}):
+            stats = get_pool_stats()
+        self.assertEqual(stats['pool_max'], 4)
+        self.assertEqual(stats['requests_num'], 40)
+        self.assertEqual(stats['requests_errors'], 0)
+        self.assertEqual(stats['requests_wait_ms_avg'], 7.5)
+
+    def test_reset_inherited_pools_does_not_close(self):
+        """fork元のプールは閉じずに参照だけ外す"""
+        pool = self._fake_pool()
+        pools = {'default': pool}
+        with self._pools(pools):
+            reset_inherited_pools()
+        self.assertEqual(pools, {})
+        pool.close.assert_not_called()
+
+    def test_health_check_shows_pool_stats_to_staff_only(self):
+        self.assertNotIn('database', self.client.get('/api/health/').json())
+
+        staff = User.objects.create_user(username='ops', password='pass12345', is_staff=True)
+        self.client.force_authenticate(staff)
+        with self._pools({'default': self._fake_pool()}):
+            data = self.client.get('/api/health/').json()
+        self.assertEqual(data['status'], 'healthy')
+        self.assertEqual(data['database']['pool']['pool_size'], 3)
@@ -0,0 +1,72 @@
+"""
+合成データ（record_app.factories）とエンドポイントのベンチマークコマンドのテスト
+"""
+import pytest
+from datetime import date
+from io import StringIO
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from record_app.factories import DatasetSize, create_standard_foods, create_user_dataset
+from record_app.models import CustomMenu, MealRecord, MealRecordItem, StandardFood, WeightRecord
+
+SIZE = DatasetSize(days=10, meals_per_day=3, items_per_meal=2, custom_foods=5, custom_menus=4, items_per_menu=3)
+
+
+@pytest.mark.django_db
+def test_create_user_dataset_counts(user):
+    foods = create_standard_foods(20)
+    counts = create_user_dataset(user, SIZE, foods, end_date=date(2025, 4, 10))
+
+    assert counts == {
+        'meals': 30, 'meal_items': 60, 'weights': 10,
+        'custom_foods': 5, 'custom_menus': 4, 'custom_menu_items': 12,
+    }
+    assert MealRecord.objects.filter(user=user).count() == 30
+    assert MealRecordItem.objects.filter(meal_record__user=user).count() == 60
+    dates = WeightRecord.objects.filter(user=user).values_list('record_date', flat=True)
+    assert (min(dates), max(dates)) == (date(2025, 4, 1), date(2025, 4, 10))
+
+
+@pytest.mark.django_db
+def test_totals_match_items(user):
+    create_user_dataset(user, SIZE, create_standard_foods(20))
+
+    meal = MealRecord.objects.filter(user=user).prefetch_related('items').first()
+    assert meal.calories == pytest.approx(sum(item.calories for item in meal.items.all()), abs=0.01)
+    menu = CustomMenu.objects.filter(user=user).prefetch_related('items').first()
+    assert menu.total_protein == pytest.approx(sum(item.protein for item in menu.items.all()), abs=0.01)
+
+
+@pytest.mark.django_db
+def test_same_seed_same_data(user):
+    foods = create_standard_foods(20)
+    other = User.objects.create_user(username='other')
+    create_user_dataset(user, SIZE, foods, seed=7)
+    create_user_dataset(other, SIZE, foods, seed=7)
+
+    def calories(owner):
+        return list(MealRecord.objects.filter(user=owner).order_by('id').values_list('calories', flat=True))
+    assert calories(user) == calories(other)
+
+    # 同じ食品番号の標準食品は作り直さない
+    assert create_standard_foods(20) == foods
+    assert StandardFood.objects.filter(food_number__startswith='S').count() == 20
+
+
+@pytest.mark.django_db
+def test_benchmark_endpoints_command_rolls_back():
+    out = StringIO()
+    # テスト環境は pytest-django が準備済み
+    with patch('record_app.management.commands.benchmark_endpoints.setup_test_environment'):
+        call_command(
+            'benchmark_endpoints', days=3, custom_foods=2, custom_menus=2, standard_foods=10,
+            repeat=2, warmup=0, endpoints=['meal-records', 'custom-menu-detail'], stdout=out,
+        )
+
+    output = out.getvalue()
+    assert '食事記録 9件' in output
+    assert 'meal-records' in output and 'custom-menu-detail' in output
+    assert 'daily-summary' not in output
+    assert not MealRecord.objects.exists()
+    assert not StandardFood.objects.filter(food_number__startswith='BENCH').exists()
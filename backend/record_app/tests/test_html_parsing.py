@@ -0,0 +1,59 @@
+from pathlib import Path
+from django.conf import settings
+from django.test import SimpleTestCase
+from record_app.business_logic import html_parsing
+
+
+FIXTURES = Path(settings.BASE_DIR) / 'data' / 'cafeteria_fixtures'
+
+
+def _available_parsers():
+    parsers = ['html.parser']
+    if html_parsing.DEFAULT_PARSER != 'html.parser':
+        parsers.append(html_parsing.DEFAULT_PARSER)
+    return parsers
+
+
+class HtmlParsingTests(SimpleTestCase):
+    """食堂ページのHTMLパースのテスト"""
+
+    def test_parse_menu_list(self):
+        """カテゴリーページからメニューIDと名前を抽出"""
+        html = (FIXTURES / 'menu_load' / 'on_a.html').read_text(encoding='utf-8')
+        for parser in _available_parsers():
+            with self.subTest(parser=parser):
+                menus = html_parsing.parse_menu_list(html, parser=parser)
+                self.assertEqual(len(menus), 6)
+                self.assertEqual(menus[0]['name'], 'ハンバーグデミグラスソース')
+                self.assertTrue(menus[0]['menu_id'].isdigit())
+
+    def test_parse_menu_list_without_ul(self):
+        """ulタグがなければNone"""
+        html = (FIXTURES / 'menu_load' / 'on_bunrui3.html').read_text(encoding='utf-8')
+        self.assertIsNone(html_parsing.parse_menu_list(html))
+
+    def test_parse_nutrition(self):
+        """詳細ページからul.detailの栄養素のみを抽出"""
+        html = next((FIXTURES / 'detail').glob('*.html')).read_text(encoding='utf-8')
+        for parser in _available_parsers():
+            with self.subTest(parser=parser):
+                nutrition = html_parsing.parse_nutrition(html, parser=parser)
+                self.assertEqual(len(nutrition), 12)
+                self.assertGreater(nutrition['calories'], 0)
+
+    def test_parse_nutrition_without_detail(self):
+        """ul.detailがなければNone"""
+        self.assertIsNone(html_parsing.parse_nutrition('<ul><li>ok</li></ul>'))
+
+    def test_partial_parse_matches_full_parse(self):
+        """部分パースとページ全体のパースで結果が一致する"""
+        for path in sorted(FIXTURES.glob('*/*.html')):
+            html = path.read_text(encoding='utf-8')
+            parse = (
+                html_parsing.parse_menu_list if path.parent.name == 'menu_load'
+                else html_parsing.parse_nutrition
+            )
+            expected = parse(html, parser='html.parser', partial=False)
+            for parser in _available_parsers():
+                with self.subTest(path=path.name, parser=parser):
+                    self.assertEqual(parse(html, parser=parser), expected)
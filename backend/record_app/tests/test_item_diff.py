@@ -0,0 +1,236 @@
+import pytest
+from record_app.models import MealRecordItem, CustomMenuItem
+from record_app.business_logic.item_diff import ItemDiff
+
+
+def _item_payload(item, **overrides):
+    data = {
+        'id': item.id,
+        'item_type': item.item_type,
+        'item_id': item.item_id,
+        'item_name': item.item_name,
+        'amount_grams': item.amount_grams,
+        'display_order': item.display_order,
+        'calories': item.calories,
+        'protein': item.protein,
+        'fat': item.fat,
+        'carbohydrates': item.carbohydrates,
+    }
+    data.update(overrides)
+    return data
+
+
+def _meal_payload(meal, items):
+    return {
+        'record_date': meal.record_date.isoformat(),
+        'meal_timing': meal.meal_timing,
+        'meal_name': meal.meal_name,
+        'calories': meal.calories,
+        'protein': meal.protein,
+        'fat': meal.fat,
+        'carbohydrates': meal.carbohydrates,
+        'items': items,
+    }
+
+
+# =============================================================================
+# ItemDiff 単体テスト
+# =============================================================================
+
+@pytest.mark.django_db
+class TestItemDiffPlan:
+    """差分計算の単体テスト"""
+
+    def test_unchanged_items_produce_no_writes(self, meal_record_with_items):
+        """変更がなければ何も書き込まない"""
+        items = list(meal_record_with_items.items.all())
+        diff = ItemDiff.plan(
+            MealRecordItem, 'meal_record', meal_record_with_items, items,
+            [_item_payload(item) for item in items],
+        )
+        assert not diff.has_changes
+
+    def test_only_changed_fields_are_updated(self, meal_record_with_items):
+        """変更された行・フィールドのみ更新対象になる"""
+        items = list(meal_record_with_items.items.all())
+        diff = ItemDiff.plan(
+            MealRecordItem, 'meal_record', meal_record_with_items, items,
+            [_item_payload(items[0], amount_grams=300), _item_payload(items[1])],
+        )
+        assert diff.to_update == [items[0]]
+        assert diff.update_fields == {'amount_grams'}
+        assert diff.to_create == []
+        assert diff.to_delete == []
+
+    def test_match_by_display_order_without_id(self, meal_record_with_items):
+        """idがない場合はdisplay_orderで対応付ける"""
+        items = list(meal_record_with_items.items.all())
+        payload = [_item_payload(item) for item in items]
+        for data in payload:
+            del data['id']
+        payload[1]['item_name'] = '鶏もも肉'
+
+        diff = ItemDiff.plan(MealRecordItem, 'meal_record', meal_record_with_items, items, payload)
+        assert diff.to_update == [items[1]]
+        assert diff.to_create == []
+
+    def test_explicit_ids_are_matched_before_display_order(self, meal_record_with_items):
+        """後ろのアイテムがidで指定した行は、前のidのないアイテムにdisplay_orderで取られない"""
+        items = list(meal_record_with_items.items.all())
+        added = _item_payload(items[0], item_name='ブロッコリー')
+        del added['id']
+        payload = [added, _item_payload(items[0]), _item_payload(items[1])]
+
+        diff = ItemDiff.plan(MealRecordItem, 'meal_record', meal_record_with_items, items, payload)
+        assert diff.to_update == []
+        assert [item.item_name for item in diff.to_create] == ['ブロッコリー']
+        assert diff.to_delete == []
+
+    def test_display_order_match_resets_omitted_fields(self, meal_record_with_items):
+        """display_orderで別の食品に置き換えた場合、省略したフィールドに前の食品の値を残さない"""
+        items = list(meal_record_with_items.items.all())
+        items[0].iron = 2
+        items[0].vitamin_c = 30
+        items[0].save()
+        bread = _item_payload(items[0], item_id=items[0].item_id + 100, item_name='食パン')
+        del bread['id']
+
+        diff = ItemDiff.plan(
+            MealRecordItem, 'meal_record', meal_record_with_items, items,
+            [bread, _item_payload(items[1])],
+        )
+        assert diff.to_update == [items[0]]
+        assert {'item_id', 'item_name', 'iron', 'vitamin_c'} <= diff.update_fields
+        assert items[0].iron == 0
+        assert items[0].vitamin_c == 0
+
+    def test_unknown_id_raises(self, meal_record_with_items):
+        """親に属さないidはエラー"""
+        items = list(meal_record_with_items.items.all())
+        with pytest.raises(ValueError):
+            ItemDiff.plan(
+                MealRecordItem, 'meal_record', meal_record_with_items, items,
+                [_item_payload(items[0], id=999999)],
+            )
+
+
+# =============================================================================
+# シリアライザ経由の差分更新テスト
+# =============================================================================
+
+@pytest.mark.django_db
+class TestMealRecordItemDiffUpdate:
+    """食事記録更新時のアイテム差分更新"""
+
+    def test_single_amount_change_keeps_ids(self, authenticated_client, meal_record_with_items):
+        """1件の分量変更ではアイテムidが維持される"""
+        items = list(meal_record_with_items.items.all())
+        payload = _meal_payload(meal_record_with_items, [
+            _item_payload(items[0], amount_grams=300),
+            _item_payload(items[1]),
+        ])
+
+        response = authenticated_client.put(
+            f'/api/meal-records/{meal_record_with_items.id}/', payload, format='json'
+        )
+        assert response.status_code == 200
+        assert sorted(i['id'] for i in response.data['items']) == sorted(i.id for i in items)
+        assert MealRecordItem.objects.get(id=items[0].id).amount_grams == 300
+
+    def test_removed_item_is_deleted(self, authenticated_client, meal_record_with_items):
+        """送られなかったアイテムのみ削除される"""
+        items = list(meal_record_with_items.items.all())
+        payload = _meal_payload(meal_record_with_items, [_item_payload(items[0])])
+
+        authenticated_client.put(
+            f'/api/meal-records/{meal_record_with_items.id}/', payload, format='json'
+        )
+        assert list(meal_record_with_items.items.values_list('id', flat=True)) == [items[0].id]
+
+    def test_new_item_is_inserted(self, authenticated_client, meal_record_with_items):
+        """新しいアイテムは追加される"""
+        items = list(meal_record_with_items.items.all())
+        new_item = _item_payload(items[0], item_name='味噌汁', display_order=3)
+        del new_item['id']
+        payload = _meal_payload(
+            meal_record_with_items, [_item_payload(item) for item in items] + [new_item]
+        )
+
+        authenticated_client.put(
+            f'/api/meal-records/{meal_record_with_items.id}/', payload, format='json'
+        )
+        assert meal_record_with_items.items.count() == 3
+        assert set(i.id for i in items) < set(meal_record_with_items.items.values_list('id', flat=True))
+
+    def test_replacing_item_without_id_drops_old_nutrients(self, authenticated_client, meal_record_with_items):
+        """idなしで同じ表示順の食品を置き換えると、送らなかった栄養素は既定値になる"""
+        items = list(meal_record_with_items.items.all())
+        MealRecordItem.objects.filter(id=items[0].id).update(iron=2, vitamin_c=30)
+        bread = _item_payload(items[0], item_id=items[0].item_id + 100, item_name='食パン')
+        del bread['id']
+
+        response = authenticated_client.patch(
+            f'/api/meal-records/{meal_record_with_items.id}/',
+            {'items': [bread, _item_payload(items[1])]}, format='json'
+        )
+        assert response.status_code == 200
+        replaced = MealRecordItem.objects.get(meal_record=meal_record_with_items, display_order=1)
+        assert replaced.item_name == '食パン'
+        assert replaced.iron == 0
+        assert replaced.vitamin_c == 0
+
+    def test_unchanged_items_issue_no_item_writes(
+        self, authenticated_client, meal_record_with_items, django_assert_max_num_queries
+    ):
+        """アイテムに変更がなければアイテムテーブルへの書き込みは発生しない"""
+        items = list(meal_record_with_items.items.all())
+        payload = _meal_payload(meal_record_with_items, [_item_payload(item) for item in items])
+
+        with django_assert_max_num_queries(10) as captured:
+            authenticated_client.put(
+                f'/api/meal-records/{meal_record_with_items.id}/', payload, format='json'
+            )
+        item_writes = [
+            q['sql'] for q in captured.captured_queries
+            if 'record_app_mealrecorditem' in q['sql']
+            and q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ]
+        assert item_writes == []
+
+    def test_other_meals_item_id_rejected(
+        self, authenticated_client, meal_record, meal_record_with_items
+    ):
+        """他の食事記録のアイテムidは指定できない"""
+        other_item = meal_record_with_items.items.first()
+        payload = _meal_payload(meal_record, [_item_payload(other_item)])
+
+        response = authenticated_client.put(
+            f'/api/meal-records/{meal_record.id}/', payload, format='json'
+        )
+        assert response.status_code == 400
+        assert MealRecordItem.objects.get(id=other_item.id).meal_record_id == meal_record_with_items.id
+
+
+@pytest.mark.django_db
+class TestCustomMenuItemDiffUpdate:
+    """Myメニュー更新時のアイテム差分更新"""
+
+    def test_change_updates_totals_and_keeps_ids(self, authenticated_client, custom_menu_with_items):
+        """分量変更でidを維持したまま合計が再計算される"""
+        items = list(custom_menu_with_items.items.all())
+        payload = {
+            'name': custom_menu_with_items.name,
+            'items': [
+                _item_payload(items[0], calories=356),
+                _item_payload(items[1]),
+            ],
+        }
+
+        response = authenticated_client.put(
+            f'/api/custom-menus/{custom_menu_with_items.id}/', payload, format='json'
+        )
+        assert response.status_code == 200
+        assert sorted(CustomMenuItem.objects.values_list('id', flat=True)) == sorted(i.id for i in items)
+
+        custom_menu_with_items.refresh_from_db()
+        assert custom_menu_with_items.total_calories == pytest.approx(356 + 162)
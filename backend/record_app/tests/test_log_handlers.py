@@ -0,0 +1,118 @@
+import copy
+import logging
+import logging.config
+import logging.handlers
+import shutil
+import tempfile
+from pathlib import Path
+from django.conf import settings
+from django.test import SimpleTestCase
+from record_app.log_handlers import DebugSampleFilter, QueueListenerHandler
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class QueueListenerHandlerTests(SimpleTestCase):
+    """キュー経由のログハンドラーのテスト"""
+
+    def _logger(self, handler):
+        logger = logging.getLogger(f'test_log_handlers.{id(handler)}')
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        return logger
+
+    def test_records_are_written_by_listener(self):
+        target = ListHandler()
+        handler = QueueListenerHandler([target])
+        self._logger(handler).info('食事 %d件', 3)
+        handler.close()
+
+        self.assertEqual(target.messages, ['食事 3件'])
+        self.assertIsNone(handler.listener)
+
+    def test_full_queue_drops_only_low_levels(self):
+        target = ListHandler()
+        handler = QueueListenerHandler([target], queue_size=1)
+        # 書き込みスレッドを止めてキューを溜める
+        handler.listener.stop()
+        logger = self._logger(handler)
+
+        logger.info('1件目')
+        logger.info('捨てられる')
+        self.assertEqual(handler.dropped, 1)
+
+        handler.queue.get_nowait()
+        handler._start_listener()
+        logger.warning('警告')
+        handler.close()
+        self.assertEqual(target.messages, ['警告'])
+
+    def test_restart_in_child_uses_new_queue(self):
+        target = ListHandler()
+        handler = QueueListenerHandler([target])
+        parent_queue = handler.queue
+        handler.listener.stop()
+
+        handler._restart_in_child()
+        self.assertIsNot(handler.queue, parent_queue)
+        self._logger(handler).info('子プロセス')
+        handler.close()
+        self.assertEqual(target.messages, ['子プロセス'])
+
+        # 閉じたハンドラーは作り直さない
+        handler._restart_in_child()
+        self.assertIsNone(handler.listener)
+
+
+class LoggingSettingsTests(SimpleTestCase):
+    """settings.LOGGING の読み込みのテスト"""
+
+    def test_dict_config_builds_queue_handler(self):
+        """Python 3.12以降の dictConfig でも cfg:// で書き込み先を指定できる"""
+        log_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, log_dir)
+        config = copy.deepcopy(settings.LOGGING)
+        config['handlers']['file']['filename'] = str(log_dir / 'django.log')
+        # テスト後は起動時と同じ設定に戻す
+        self.addCleanup(logging.config.dictConfig, settings.LOGGING)
+
+        logging.config.dictConfig(config)
+        handler = logging.getLogger('record_app').handlers[0]
+        self.assertIsInstance(handler, QueueListenerHandler)
+        self.assertEqual(
+            [type(target) for target in handler.targets],
+            [logging.StreamHandler, logging.handlers.RotatingFileHandler]
+        )
+
+        logging.getLogger('record_app.tests').warning('設定の確認 %d', 1)
+        handler.close()
+        self.assertIn('設定の確認 1', (log_dir / 'django.log').read_text(encoding='utf-8'))
+
+
+class DebugSampleFilterTests(SimpleTestCase):
+    """DEBUGログの間引きのテスト"""
+
+    def _record(self, level):
+        return logging.LogRecord('record_app', level, __file__, 1, 'msg', None, None)
+
+    def test_rate_zero_drops_debug_only(self):
+        sample = DebugSampleFilter(rate=0)
+        self.assertFalse(sample.filter(self._record(logging.DEBUG)))
+        self.assertTrue(sample.filter(self._record(logging.INFO)))
+
+    def test_rate_is_applied(self):
+        sample = DebugSampleFilter(rate=0.2)
+        kept = sum(sample.filter(self._record(logging.DEBUG)) for _ in range(5000))
+        self.assertTrue(700 < kept < 1300, kept)
+
+    def test_default_keeps_everything(self):
+        self.assertTrue(DebugSampleFilter().filter(self._record(logging.DEBUG)))
@@ -0,0 +1,155 @@
+from datetime import date
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from record_app.models import MealRecord, MealRecordItem, UserDataVersion
+
+
+def _make_meal(name, timing='lunch', items=2, **extra):
+    return {
+        'record_date': date.today().isoformat(),
+        'meal_timing': timing,
+        'meal_name': name,
+        'calories': 500,
+        'protein': 20,
+        'fat': 10,
+        'carbohydrates': 60,
+        'items': [
+            {
+                'item_type': 'standard',
+                'item_id': i + 1,
+                'item_name': f'食品{i}',
+                'amount_grams': 100,
+                'display_order': i,
+                'calories': 250,
+            }
+            for i in range(items)
+        ],
+        **extra,
+    }
+
+
+class MealRecordBulkTests(APITestCase):
+    """食事記録の一括登録・更新APIのテスト"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = '/api/meal-records/bulk/'
+
+    def test_bulk_create_meals_with_items(self):
+        """複数の食事記録をアイテム付きで一括作成"""
+        payload = [_make_meal('朝食', 'breakfast'), _make_meal('昼食'), _make_meal('夕食', 'dinner', items=0)]
+
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['updated'], 0)
+
+        ids = response.data['ids']
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(
+            list(MealRecord.objects.filter(id__in=ids).order_by('id').values_list('meal_name', flat=True)),
+            ['朝食', '昼食', '夕食'],
+        )
+        self.assertEqual(MealRecordItem.objects.filter(meal_record_id=ids[0]).count(), 2)
+        self.assertEqual(MealRecordItem.objects.filter(meal_record_id=ids[2]).count(), 0)
+        self.assertTrue(all(meal.user == self.user for meal in MealRecord.objects.all()))
+
+    def test_bulk_update_existing_meals(self):
+        """idを指定した要素は既存記録を更新し、アイテムを置き換える"""
+        ids = self.client.post(self.url, [_make_meal('昼食')], format='json').data['ids']
+
+        payload = [
+            _make_meal('昼食（更新）', items=1, id=ids[0]),
+            _make_meal('夕食', 'dinner'),
+        ]
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['ids'][0], ids[0])
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['created'], 1)
+
+        meal = MealRecord.objects.get(id=ids[0])
+        self.assertEqual(meal.meal_name, '昼食（更新）')
+        self.assertEqual(meal.items.count(), 1)
+        self.assertEqual(MealRecord.objects.count(), 2)
+
+    def test_update_only_returns_200(self):
+        """新規作成がなければ201ではなく200"""
+        ids = self.client.post(self.url, [_make_meal('昼食')], format='json').data['ids']
+
+        response = self.client.post(self.url, [_make_meal('昼食（更新）', id=ids[0])], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(response.data['updated'], 1)
+
+    def test_update_without_items_keeps_items(self):
+        """itemsを省略した更新ではアイテムを変更しない"""
+        ids = self.client.post(self.url, [_make_meal('昼食')], format='json').data['ids']
+        payload = _make_meal('昼食（更新）', id=ids[0])
+        del payload['items']
+
+        self.client.post(self.url, [payload], format='json')
+        self.assertEqual(MealRecord.objects.get(id=ids[0]).items.count(), 2)
+
+    def test_validation_error_writes_nothing(self):
+        """1件でも不正な要素があれば何も書き込まない"""
+        invalid = _make_meal('不正')
+        del invalid['meal_timing']
+
+        response = self.client.post(self.url, [_make_meal('昼食'), invalid], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(MealRecord.objects.count(), 0)
+
+    def test_cannot_update_other_users_meal(self):
+        """他ユーザーの食事記録は更新できない"""
+        other = User.objects.create_user(username='other', password='otherpass123')
+        other_meal = MealRecord.objects.create(
+            user=other, record_date=date.today(), meal_timing='lunch', meal_name='他人の昼食',
+        )
+
+        payload = [_make_meal('新規'), _make_meal('乗っ取り', id=other_meal.id)]
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(MealRecord.objects.get(id=other_meal.id).meal_name, '他人の昼食')
+        self.assertFalse(MealRecord.objects.filter(user=self.user).exists())
+
+    def test_duplicate_ids_rejected(self):
+        """同じidの重複は拒否"""
+        ids = self.client.post(self.url, [_make_meal('昼食')], format='json').data['ids']
+        payload = [_make_meal('A', id=ids[0]), _make_meal('B', id=ids[0])]
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_empty_and_oversized_payload_rejected(self):
+        """空リストと上限超過は拒否"""
+        response = self.client.post(self.url, [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        payload = [_make_meal(f'食事{i}', items=0) for i in range(501)]
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_independent_of_size(self):
+        """件数に関わらずクエリ数は一定"""
+        UserDataVersion.get_for_user(self.user)
+        # 認証をキャッシュしておく
+        self.client.get('/api/meal-timings/')
+
+        # 食事記録・アイテム・バージョン加算（+ セーブポイント2回）
+        with self.assertNumQueries(5):
+            self.client.post(self.url, [_make_meal('昼食')], format='json')
+        with self.assertNumQueries(5):
+            self.client.post(
+                self.url, [_make_meal(f'食事{i}') for i in range(20)], format='json'
+            )
+
+    def test_bulk_write_bumps_data_version(self):
+        """一括書き込みでも条件付きGETのバージョンが加算される"""
+        version = UserDataVersion.get_for_user(self.user).version
+        self.client.post(self.url, [_make_meal('昼食')], format='json')
+        self.assertEqual(UserDataVersion.get_for_user(self.user).version, version + 1)
@@ -1,3 +1,5 @@
+import tempfile
+import cv2
 import numpy as np
 from unittest.mock import patch, MagicMock, PropertyMock
 from django.test import TestCase
@@ -13,6 +15,7 @@ from record_app.business_logic.ocr_processor import (
     OCRPostProcessor,
     NutritionExtractor,
     NutritionValidator,
+    OCRTimings,
     SemanticBlock,
     TextBox,
 )
@@ -280,6 +283,47 @@ class NutritionLabelOCRTests(TestCase):
 # OCR APIテスト
 # =============================================================================
 
+class OCRTimingsTests(TestCase):
+    """段階ごとの所要時間の計測テスト"""
+    
+    def test_preprocess_records_sub_steps(self):
+        """前処理の各処理の時間を記録する"""
+        image = np.full((200, 300, 3), 255, dtype=np.uint8)
+        with tempfile.NamedTemporaryFile(suffix='.png') as tmp:
+            cv2.imwrite(tmp.name, image)
+            timings = OCRTimings()
+            AdaptiveImagePreprocessor.preprocess(tmp.name, timings)
+        
+        for stage in OCRTimings.PREPROCESS_STAGES:
+            self.assertGreater(timings.timings[stage], 0, stage)
+        self.assertEqual(timings.timings['readtext'], 0)
+    
+    @patch.object(NutritionOCRProcessor, 'reader', new_callable=PropertyMock)
+    @patch('record_app.business_logic.ocr_processor.AdaptiveImagePreprocessor')
+    def test_timings_in_result_only_with_debug(self, mock_preprocessor_cls, mock_reader):
+        """debug=True のときだけ結果に timings を含め、ログには毎回出力する"""
+        mock_preprocessor_cls.return_value.preprocess.return_value = np.ones((100, 100), dtype=np.uint8)
+        mock_reader.return_value.readtext.return_value = [
+            ([[0,0],[200,0],[200,30],[0,30]], 'エネルギー 250kcal', 0.95),
+            ([[0,40],[200,40],[200,70],[0,70]], 'たんぱく質 15g', 0.90),
+        ]
+        processor = NutritionOCRProcessor(gpu=False)
+        
+        with self.assertLogs('record_app.business_logic.ocr_processor', level='INFO') as logs:
+            result = processor.process_nutrition_label('/tmp/test.jpg', debug=True)
+        timings = result['timings']
+        self.assertEqual(list(timings['timings_ms']), list(OCRTimings.STAGES))
+        self.assertEqual(timings['text_boxes'], 2)
+        self.assertGreaterEqual(timings['blocks'], 1)
+        self.assertGreaterEqual(timings['elapsed_ms'], timings['timings_ms']['readtext'])
+        
+        record = next(r for r in logs.records if r.getMessage().startswith('OCR処理時間'))
+        self.assertIn('readtext_ms=', record.getMessage())
+        self.assertEqual(record.ocr_timings['text_boxes'], 2)
+        
+        self.assertNotIn('timings', processor.process_nutrition_label('/tmp/test.jpg'))
+
+
 class OCRAPITests(APITestCase):
     """OCR APIエンドポイントのテスト"""
     
@@ -320,6 +364,31 @@ class OCRAPITests(APITestCase):
         response = self.client.post(self.ocr_url, {'image': image}, format='multipart')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(response.data['success'])
+        self.assertNotIn('timings', response.data)
+
+    @patch('record_app.business_logic.ocr_processor.NutritionOCRProcessor')
+    def test_debug_timings_for_staff_only(self, mock_processor_cls):
+        """?debug=true で段階ごとの所要時間を返すのはスタッフユーザーのみ"""
+        mock_processor = mock_processor_cls.return_value
+        mock_processor.process_nutrition_label.return_value = {
+            'success': True,
+            'nutrition': {'calories': 250.0},
+            'validation': {'is_valid': True, 'warnings': []},
+            'timings': {'elapsed_ms': 12.0, 'timings_ms': {'readtext': 8.0}},
+        }
+
+        def upload():
+            image = SimpleUploadedFile('test.png', b'\x89PNG\r\n\x1a\n' + b'\x00' * 100, content_type='image/png')
+            return self.client.post(f'{self.ocr_url}?debug=true', {'image': image}, format='multipart')
+
+        upload()
+        self.assertFalse(mock_processor.process_nutrition_label.call_args.kwargs['debug'])
+
+        self.user.is_staff = True
+        self.user.save()
+        response = upload()
+        self.assertTrue(mock_processor.process_nutrition_label.call_args.kwargs['debug'])
+        self.assertEqual(response.data['timings']['timings_ms'], {'readtext': 8.0})
 
     def test_upload_oversized_image_fails(self):
         """10MBを超える画像は400エラー"""
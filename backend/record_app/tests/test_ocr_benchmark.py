@@ -0,0 +1,85 @@
+import json
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+from pathlib import Path
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from record_app.business_logic.ocr_benchmark import (
+    CorpusReader, generate_corpus, load_corpus, run_stages, score_fields,
+)
+from record_app.business_logic.ocr_processor import NutritionOCRProcessor, OCRTimings
+
+# 文字の形は正解率に関係しない（CorpusReader はラベルの文字を返す）ため、手元にあるフォントで描画する
+TEST_FONT = '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+
+
+@unittest.skipUnless(Path(TEST_FONT).is_file(), 'テスト用のフォントがありません')
+class OCRBenchmarkCorpusTests(SimpleTestCase):
+    """OCRベンチマーク用コーパスのテスト"""
+
+    def setUp(self):
+        self.corpus_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.corpus_dir)
+
+    def test_generate_and_load_corpus(self):
+        generate_corpus(self.corpus_dir, 6, TEST_FONT, seed=3)
+
+        samples = load_corpus(self.corpus_dir)
+        self.assertEqual(len(samples), 6)
+        self.assertEqual({sample['layout'] for sample in samples}, {'table', 'compact', 'inline'})
+        for sample in samples:
+            self.assertTrue(sample['path'].is_file())
+            nutrition = sample['nutrition']
+            # エネルギーはAtwater係数で計算した値
+            self.assertAlmostEqual(
+                nutrition['calories'],
+                nutrition['protein'] * 4 + nutrition['fat'] * 9 + nutrition['carbohydrates'] * 4,
+                delta=0.5
+            )
+        labels = json.loads((self.corpus_dir / 'labels.json').read_text(encoding='utf-8'))
+        self.assertEqual(labels['seed'], 3)
+
+    def test_run_stages_with_corpus_reader(self):
+        """ラベルの文字を使うと、表示名と値が同じ文字列のレイアウトは全項目を読み取れる"""
+        generate_corpus(self.corpus_dir, 3, TEST_FONT)
+        processor = NutritionOCRProcessor()
+        reader = CorpusReader()
+        processor._reader = reader
+
+        for sample in load_corpus(self.corpus_dir):
+            reader.use(sample)
+            result = run_stages(processor, sample['path'])
+            self.assertEqual(list(result.timings), list(OCRTimings.STAGES))
+            self.assertTrue(all(value > 0 for value in result.timings.values()))
+            if sample['layout'] != 'table':
+                scores = score_fields(sample['nutrition'], result.nutrition)
+                self.assertEqual(set(scores.values()), {'correct'}, sample)
+                self.assertTrue(result.validation['is_valid'])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            'benchmark_ocr', corpus=str(self.corpus_dir), generate=3, font=TEST_FONT,
+            reader='corpus', stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn('bilateral_filter', output)
+        self.assertIn('項目ごとの正解率', output)
+        self.assertIn('compact    100.0%', output)
+
+
+class ScoreFieldsTests(SimpleTestCase):
+    """項目ごとの判定のテスト"""
+
+    def test_score_fields(self):
+        scores = score_fields(
+            {'calories': 120.0, 'protein': 4.5, 'fat': 3.0},
+            {'calories': 120.0, 'protein': 45.0, 'fat': None, 'sugar': 1.0},
+        )
+        self.assertEqual(scores, {'calories': 'correct', 'protein': 'wrong', 'fat': 'missing'})
+
+    def test_no_result(self):
+        self.assertEqual(score_fields({'calories': 120.0}, None), {'calories': 'missing'})
@@ -0,0 +1,220 @@
+import threading
+from unittest.mock import patch
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, SimpleTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase, APIClient
+from record_app import performance
+from record_app.middleware import PerformanceMiddleware
+from record_app.models import CafeteriaMenu
+from record_app.performance import MetricsRegistry, RequestProfile, fingerprint_sql
+
+
+class FingerprintTests(SimpleTestCase):
+    """SQLのフィンガープリントのテスト"""
+
+    def test_literals_are_replaced(self):
+        self.assertEqual(
+            fingerprint_sql("SELECT * FROM t WHERE id = 12 AND name = 'カレー''s'  AND x > 1.5"),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND x > ?'
+        )
+
+    def test_in_lists_are_collapsed(self):
+        self.assertEqual(
+            fingerprint_sql('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            fingerprint_sql('SELECT * FROM t WHERE id IN (%s)'),
+        )
+
+    def test_identifiers_with_digits_are_kept(self):
+        self.assertEqual(fingerprint_sql('SELECT "t"."col1" FROM t'), 'SELECT "t"."col1" FROM t')
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    """メトリクスの集計と出力のテスト"""
+
+    def _profile(self, duration, queries=0):
+        profile = RequestProfile()
+        profile.duration = duration
+        profile.query_count = queries
+        profile.query_time = queries * 0.002
+        profile.response_bytes = 100
+        return profile
+
+    def test_render_prometheus(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.record('meal-list', 'GET', 200, self._profile(0.05, queries=3))
+        registry.record('meal-list', 'GET', 200, self._profile(0.5, queries=2), slow=True)
+        registry.record('meal-list', 'POST', 400, self._profile(0.02))
+
+        text = registry.render_prometheus(gauges={'db_pool_size': ('接続数', 3)})
+        self.assertIn('dishboard_requests_total{view="meal-list",method="GET",status="2xx",worker=', text)
+        self.assertRegex(text, r'dishboard_request_duration_seconds_bucket\{view="meal-list",worker="[^"]+",le="0.1"\} 2')
+        self.assertRegex(text, r'dishboard_request_duration_seconds_bucket\{view="meal-list",worker="[^"]+",le="1.0"\} 3')
+        self.assertRegex(text, r'dishboard_request_duration_seconds_count\{view="meal-list",worker="[^"]+"\} 3')
+        self.assertRegex(text, r'dishboard_db_queries_total\{view="meal-list",worker="[^"]+"\} 5\n')
+        self.assertRegex(text, r'dishboard_slow_requests_total\{view="meal-list",worker="[^"]+"\} 1\n')
+        self.assertRegex(text, r'dishboard_db_pool_size\{worker="[^"]+"\} 3\n')
+
+    def test_snapshots_of_all_workers_are_rendered(self):
+        """共有キャッシュに保存された他のワーカーの累計もまとめて出力する"""
+        other = MetricsRegistry()
+        other.record('meal-list', 'GET', 200, self._profile(0.05, queries=4))
+        with patch('record_app.performance.worker_id', return_value='web-2:41'):
+            other.publish(force=True)
+
+        registry = MetricsRegistry()
+        registry.record('meal-list', 'GET', 200, self._profile(0.05, queries=1))
+        snapshots = registry.collect()
+        self.assertEqual(set(snapshots), {'web-2:41', performance.worker_id()})
+
+        text = registry.render_prometheus(snapshots=snapshots)
+        self.assertIn('dishboard_db_queries_total{view="meal-list",worker="web-2:41"} 4\n', text)
+        self.assertIn(f'dishboard_db_queries_total{{view="meal-list",worker="{performance.worker_id()}"}} 1\n', text)
+
+    def test_record_does_not_touch_shared_cache(self):
+        """記録はリクエストの処理中に行うため、共有キャッシュ（Redis）の障害で止まらない"""
+        registry = MetricsRegistry()
+        outage = ConnectionError('Redis is unavailable')
+        with patch.object(registry, '_start_publisher'), \
+                patch('record_app.performance.cache.set', side_effect=outage) as cache_set, \
+                patch('record_app.performance.cache.get', side_effect=outage) as cache_get:
+            registry.record('meal-list', 'GET', 200, self._profile(0.01))
+        cache_set.assert_not_called()
+        cache_get.assert_not_called()
+
+    def test_publish_only_after_new_records(self):
+        registry = MetricsRegistry()
+        with patch.object(registry, '_start_publisher'), \
+                patch('record_app.performance.cache.set') as cache_set:
+            registry.publish()
+            registry.record('meal-list', 'GET', 200, self._profile(0.01))
+            registry.publish()
+            registry.publish()
+        # 記録後の1回目でスナップショットとワーカー一覧を保存し、記録のない保存では何もしない
+        self.assertEqual(cache_set.call_count, 2)
+
+    def test_publish_failure_is_retried(self):
+        """共有キャッシュに保存できなければ警告を出し、次の保存で保存し直す"""
+        registry = MetricsRegistry()
+        with patch.object(registry, '_start_publisher'):
+            registry.record('meal-list', 'GET', 200, self._profile(0.01))
+        with patch('record_app.performance.cache.set', side_effect=ConnectionError) as cache_set, \
+                self.assertLogs('record_app.performance', level='WARNING'):
+            registry.publish()
+        self.assertEqual(cache_set.call_count, 1)
+        with patch('record_app.performance.cache.set') as cache_set:
+            registry.publish()
+        self.assertEqual(cache_set.call_count, 2)
+
+    def test_publisher_thread_saves_snapshot(self):
+        """最初の記録でスレッドを起動し、PUBLISH_INTERVAL ごとに共有キャッシュに保存する"""
+        registry = MetricsRegistry()
+        saved = threading.Event()
+        with patch.object(registry, 'PUBLISH_INTERVAL', 0.01), \
+                patch.object(registry, 'publish', side_effect=saved.set), \
+                patch('record_app.performance.threading.Thread', wraps=threading.Thread) as thread:
+            registry.record('meal-list', 'GET', 200, self._profile(0.01))
+            registry.record('meal-list', 'GET', 200, self._profile(0.01))
+            self.assertTrue(saved.wait(5))
+        thread.assert_called_once()
+
+    def test_cache_errors_fall_back_to_this_worker(self):
+        registry = MetricsRegistry()
+        with patch('record_app.performance.cache.get', side_effect=ConnectionError), \
+                self.assertLogs('record_app.performance', level='WARNING'):
+            snapshots = registry.collect()
+        self.assertEqual(list(snapshots), [performance.worker_id()])
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.record('a"b', 'GET', 200, self._profile(0.01))
+        self.assertIn('view="a\\"b"', registry.render_prometheus())
+
+
+class PerformanceMiddlewareTests(APITestCase):
+    """性能計測ミドルウェアのテスト"""
+
+    def setUp(self):
+        performance.registry.reset()
+        self.addCleanup(performance.registry.reset)
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        CafeteriaMenu.objects.create(
+            menu_id='001', name='チキンカレー', category='rice',
+            calories=600, protein=20, fat=15, carbohydrates=80
+        )
+
+    def _counter(self, name, view):
+        counters = performance.registry._counters[view]
+        return counters[name]
+
+    def test_records_queries_cache_and_size_per_view(self):
+        """View名ごとにクエリ数・キャッシュのヒット/ミス・レスポンスサイズを集計する"""
+        first = self.client.get('/api/cafeteria/list/')
+        second = self.client.get('/api/cafeteria/list/')
+
+        self.assertEqual(performance.registry._requests[('list-cafeteria', 'GET', '2xx')], 2)
+        self.assertGreater(self._counter('db_queries', 'list-cafeteria'), 0)
+        self.assertGreater(self._counter('cache_hits', 'list-cafeteria'), 0)
+        self.assertGreater(self._counter('cache_misses', 'list-cafeteria'), 0)
+        self.assertEqual(
+            self._counter('response_bytes', 'list-cafeteria'), len(first.content) + len(second.content)
+        )
+
+    async def test_async_requests_record_queries(self):
+        """非同期のチェーンでは非同期のまま処理し、sync_to_async で実行したクエリも記録する"""
+        async def get_response(request):
+            await CafeteriaMenu.objects.acount()
+            return HttpResponse('ok')
+
+        middleware = PerformanceMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(AsyncRequestFactory().get('/api/no-such-endpoint/'))
+
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(performance.registry._requests[('unmatched', 'GET', '2xx')], 1)
+        self.assertEqual(self._counter('db_queries', 'unmatched'), 1)
+        self.assertEqual(self._counter('response_bytes', 'unmatched'), 2)
+
+    def test_unmatched_urls(self):
+        self.client.get('/api/no-such-endpoint/')
+        self.assertEqual(performance.registry._requests[('unmatched', 'GET', '4xx')], 1)
+
+    @override_settings(PERFORMANCE_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_with_fingerprints(self):
+        with self.assertLogs('record_app.middleware', level='WARNING') as logs:
+            self.client.get('/api/cafeteria/list/')
+        self.assertIn('view=list-cafeteria', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+        self.assertEqual(self._counter('slow_requests', 'list-cafeteria'), 1)
+
+
+class MetricsEndpointTests(APITestCase):
+    """メトリクス出力エンドポイントのテスト"""
+
+    url = '/api/metrics/'
+
+    def test_forbidden_without_credentials(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        user = User.objects.create_user(username='user', password='pass12345')
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_bearer_token(self):
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+        response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE dishboard_requests_total counter', response.content.decode())
+
+    def test_staff_user(self):
+        staff = User.objects.create_user(username='ops', password='pass12345', is_staff=True)
+        self.client.force_authenticate(staff)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
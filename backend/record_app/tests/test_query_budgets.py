@@ -0,0 +1,135 @@
+"""
+APIの一覧・詳細・サマリーのクエリ数の上限
+
+データ件数（N件の食事記録・アイテムなど）に比例してクエリが増えないことを確認する。
+上限はデータ件数より十分小さく、N+1が入り込むと必ず超える。
+"""
+import pytest
+from datetime import date, timedelta
+from django.db import connection
+from record_app.models import (
+    Cafeteria, CafeteriaMenu, CafeteriaMenuHistory, CustomFood, CustomMenu, CustomMenuItem,
+    MealRecord, MealRecordItem, WeightRecord,
+)
+
+N = 20
+ITEMS_PER_RECORD = 3
+
+
+@pytest.fixture
+def busy_user(user, standard_foods):
+    """N件ずつ記録を持つユーザー（食事記録・Myメニューはアイテム付き）"""
+    today = date.today()
+    for i in range(N):
+        meal = MealRecord.objects.create(
+            user=user, record_date=today - timedelta(days=i % 7), meal_timing='lunch',
+            meal_name=f'食事{i}', calories=600, protein=20, fat=15, carbohydrates=80,
+        )
+        MealRecordItem.objects.bulk_create([
+            MealRecordItem(
+                meal_record=meal, item_type='standard', item_id=food.id, item_name=food.name,
+                amount_grams=100, display_order=order, calories=200, protein=5, fat=5, carbohydrates=25,
+            )
+            for order, food in enumerate(standard_foods[:ITEMS_PER_RECORD], 1)
+        ])
+
+        menu = CustomMenu.objects.create(user=user, name=f'メニュー{i}')
+        CustomMenuItem.objects.bulk_create([
+            CustomMenuItem(
+                custom_menu=menu, item_type='standard', item_id=food.id, item_name=food.name,
+                amount_grams=100, display_order=order, calories=200, protein=5, fat=5, carbohydrates=25,
+            )
+            for order, food in enumerate(standard_foods[:ITEMS_PER_RECORD], 1)
+        ])
+
+        WeightRecord.objects.create(user=user, record_date=today - timedelta(days=i), weight=60 + i / 10)
+        CustomFood.objects.create(
+            user=user, name=f'Myアイテム{i}', calories_per_100g=100,
+            protein_per_100g=5, fat_per_100g=5, carbs_per_100g=10,
+        )
+
+    cafeteria, _ = Cafeteria.objects.get_or_create(
+        site_id=Cafeteria.DEFAULT_SITE_ID, defaults={'name': '中央食堂'}
+    )
+    for i in range(N):
+        menu_fields = dict(
+            menu_id=f'{i:03d}', name=f'定食{i}', category='main',
+            calories=700, protein=25, fat=20, carbohydrates=90,
+        )
+        CafeteriaMenu.objects.create(cafeteria=cafeteria, **menu_fields)
+        CafeteriaMenuHistory.objects.create(cafeteria=cafeteria, valid_from=today, **menu_fields)
+    return user
+
+
+@pytest.fixture
+def client(authenticated_client, busy_user):
+    # トークン認証の結果と変更バージョンの行は初回に作られるため、先に1回アクセスしておく
+    authenticated_client.get('/api/weights/')
+    return authenticated_client
+
+
+def _first_id(model, user):
+    return model.objects.filter(user=user).values_list('id', flat=True).first()
+
+
+# (パス, クエリ数の上限)
+LIST_ENDPOINTS = [
+    ('/api/meal-timings/', 0),
+    ('/api/meals/', 3),
+    ('/api/meal-records/', 3),
+    ('/api/weights/', 2),
+    ('/api/foods/custom/', 2),
+    ('/api/foods/custom/list/', 2),
+    ('/api/custom-menus/', 3),
+    ('/api/custom-menus/search/?q=メニュー', 2),
+    ('/api/foods/suggestions/?q=白米', 1),
+    ('/api/nutrition/daily-summary/', 1),
+    ('/api/dashboard/', 4),
+    ('/api/sync/', 6),
+    ('/api/cafeteria/list/', 1),
+    ('/api/cafeteria/sites/', 1),
+    ('/api/cafeteria/available/', 1),
+]
+
+
+@pytest.mark.parametrize('path, max_queries', LIST_ENDPOINTS)
+def test_list_endpoints(client, query_budget, path, max_queries):
+    with query_budget(max_queries):
+        response = client.get(path)
+    assert response.status_code == 200
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='食品検索はpg_trgmを使う')
+def test_search_foods(client, query_budget):
+    with query_budget(1):
+        response = client.get('/api/foods/search/?q=白米')
+    assert response.status_code == 200
+
+
+def test_custom_food_list_is_not_shadowed_by_detail_route(client, busy_user):
+    """foods/custom/list/ がルーターの詳細（pk='list'）として扱われない"""
+    response = client.get('/api/foods/custom/list/')
+    assert response.status_code == 200
+    assert len(response.data) == N
+
+
+@pytest.mark.parametrize('path, model, max_queries', [
+    ('/api/meals/{id}/', MealRecord, 3),
+    ('/api/weights/{id}/', WeightRecord, 2),
+    ('/api/foods/custom/{id}/', CustomFood, 2),
+    ('/api/custom-menus/{id}/', CustomMenu, 3),
+])
+def test_detail_endpoints(client, busy_user, query_budget, path, model, max_queries):
+    url = path.format(id=_first_id(model, busy_user))
+    with query_budget(max_queries):
+        response = client.get(url)
+    assert response.status_code == 200
+
+
+def test_budget_failure_lists_queries(client, query_budget):
+    """上限を超えると発行されたSQLを表示して失敗する"""
+    with pytest.raises(pytest.fail.Exception) as excinfo:
+        with query_budget(0):
+            client.get('/api/meals/')
+    assert 'クエリ数が上限を超えました' in str(excinfo.value)
+    assert 'record_app_mealrecord' in str(excinfo.value)
@@ -0,0 +1,146 @@
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from record_app.models import (
+    MealRecord, MealRecordItem, WeightRecord, CustomFood, DeletedRecord
+)
+from record_app.services import SyncService
+
+
+class SyncAPITests(APITestCase):
+    """差分同期APIのテスト"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = '/api/sync/'
+        self.old_meal = self._create_meal('古い昼食')
+        self.old_weight = WeightRecord.objects.create(
+            user=self.user, record_date=date.today() - timedelta(days=1), weight=60
+        )
+        # 既存データは1時間前に更新されたものとする
+        self.since = timezone.now() - timedelta(minutes=30)
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        MealRecord.objects.update(updated_at=an_hour_ago)
+        WeightRecord.objects.update(updated_at=an_hour_ago)
+
+    def _create_meal(self, name):
+        meal = MealRecord.objects.create(
+            user=self.user, record_date=date.today(), meal_timing='lunch',
+            meal_name=name, calories=500,
+        )
+        MealRecordItem.objects.create(
+            meal_record=meal, item_type='standard', item_id=1,
+            item_name='白米', amount_grams=150, calories=250,
+        )
+        return meal
+
+    def _sync(self, since=None):
+        params = {'since': since.isoformat()} if since else {}
+        return self.client.get(self.url, params)
+
+    def test_full_sync_without_watermark(self):
+        """since省略時は全件を返す"""
+        response = self._sync()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['full'])
+        self.assertEqual(len(response.data['meal_records']), 1)
+        self.assertEqual(len(response.data['meal_records'][0]['items']), 1)
+        self.assertEqual(len(response.data['weight_records']), 1)
+        self.assertIn('watermark', response.data)
+
+    def test_incremental_sync_returns_only_changes(self):
+        """ウォーターマーク以降の変更のみを返す"""
+        new_meal = self._create_meal('新しい夕食')
+
+        response = self._sync(self.since)
+        self.assertFalse(response.data['full'])
+        self.assertEqual([m['id'] for m in response.data['meal_records']], [new_meal.id])
+        self.assertEqual(response.data['weight_records'], [])
+        self.assertEqual(response.data['custom_foods'], [])
+
+    def test_updated_rows_are_returned(self):
+        """更新された行も差分に含まれる"""
+        self.old_weight.weight = 59.5
+        self.old_weight.save()
+
+        response = self._sync(self.since)
+        self.assertEqual(len(response.data['weight_records']), 1)
+        self.assertEqual(response.data['weight_records'][0]['weight'], 59.5)
+
+    def test_deleted_rows_are_returned_as_tombstones(self):
+        """削除された行はIDのみdeletedに含まれる"""
+        meal_id = self.old_meal.id
+        self.client.delete(f'/api/meals/{meal_id}/')
+
+        response = self._sync(self.since)
+        self.assertEqual(response.data['deleted']['meal_record'], [meal_id])
+        self.assertEqual(response.data['deleted']['weight_record'], [])
+        self.assertEqual(response.data['meal_records'], [])
+
+    def test_tombstones_before_watermark_excluded(self):
+        """ウォーターマークより前の削除は含まれない"""
+        self.old_meal.delete()
+        DeletedRecord.objects.update(deleted_at=timezone.now() - timedelta(hours=1))
+
+        response = self._sync(self.since)
+        self.assertEqual(response.data['deleted']['meal_record'], [])
+
+    def test_stale_watermark_falls_back_to_full_sync(self):
+        """保持期間より古いウォーターマークは全件同期になる"""
+        stale = timezone.now() - timedelta(days=SyncService.TOMBSTONE_RETENTION_DAYS + 1)
+        response = self._sync(stale)
+        self.assertTrue(response.data['full'])
+        self.assertEqual(len(response.data['meal_records']), 1)
+
+    def test_unencoded_plus_in_watermark(self):
+        """URLエンコードされていないタイムゾーンの '+' も受け付ける"""
+        since = timezone.localtime(self.since).isoformat()
+        response = self.client.get(f'{self.url}?since={since}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['full'])
+
+    def test_invalid_watermark(self):
+        """不正な日時形式は400"""
+        response = self.client.get(self.url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_impossible_watermark(self):
+        """形式は正しいが存在しない日時も400"""
+        response = self.client.get(self.url, {'since': '2025-02-30T00:00:00'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_changes_excluded(self):
+        """他ユーザーの変更・削除は含まれない"""
+        other = User.objects.create_user(username='other', password='otherpass123')
+        food = CustomFood.objects.create(
+            user=other, name='他人の食品', calories_per_100g=100,
+            protein_per_100g=1, fat_per_100g=1, carbs_per_100g=1,
+        )
+        food.delete()
+
+        response = self._sync(self.since)
+        self.assertEqual(response.data['custom_foods'], [])
+        self.assertEqual(response.data['deleted']['custom_food'], [])
+
+    def test_user_deletion_does_not_create_tombstones(self):
+        """ユーザー自体の削除ではトゥームストーンを作らない"""
+        self.user.delete()
+        self.assertEqual(DeletedRecord.objects.count(), 0)
+        self.assertEqual(MealRecord.objects.count(), 0)
+
+    def test_prune_tombstones(self):
+        """保持期間を過ぎたトゥームストーンを削除"""
+        self.old_meal.delete()
+        self.old_weight.delete()
+        DeletedRecord.objects.filter(model_name='meal_record').update(
+            deleted_at=timezone.now() - timedelta(days=SyncService.TOMBSTONE_RETENTION_DAYS + 1)
+        )
+
+        self.assertEqual(SyncService.prune_tombstones(), 1)
+        self.assertEqual(DeletedRecord.objects.get().model_name, 'weight_record')
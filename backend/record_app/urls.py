@@ -3,11 +3,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token
 from .views import (
-    MealTimingChoicesView, MealRecordViewSet, WeightRecordViewSet, CustomFoodViewSet, UserRegistrationView, CustomMenuViewSet,
+    MealTimingChoicesView, MealRecordViewSet, WeightRecordViewSet, CustomFoodViewSet, UserRegistrationView, CustomMenuViewSet, logout,
     search_foods, food_suggestions, calculate_nutrition, daily_nutrition_summary, create_custom_food, 
-    list_custom_foods, update_custom_food, delete_custom_food, list_cafeteria_menus, health_check,
-    process_nutrition_label
+    list_custom_foods, update_custom_food, delete_custom_food, list_cafeterias, list_cafeteria_menus, available_cafeteria_menus, health_check,
+    process_nutrition_label, dashboard, sync, metrics
 )
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'meals', MealRecordViewSet, basename='meal')
@@ -19,28 +20,51 @@ router.register(r'custom-menus', CustomMenuViewSet, basename='custommenu')
 urlpatterns = [
     # 基本URL
     path('meal-timings/', MealTimingChoicesView.as_view(), name='meal-timing-choices'),
+    # ルーターの foods/custom/<pk>/ に一致しないよう、ルーターより前に置く
+    path('foods/custom/list/', list_custom_foods, name='list-custom-foods'),
     path('', include(router.urls)),
     path('register/', UserRegistrationView.as_view(), name='register'),
     path('login/', obtain_auth_token, name='login'),
+    path('logout/', logout, name='logout'),
     
     # 食品検索・栄養計算関連
     path('foods/search/', search_foods, name='search-foods'),
     path('foods/suggestions/', food_suggestions, name='food-suggestions'),
     path('foods/calculate/', calculate_nutrition, name='calculate-nutrition'),
     path('foods/custom/', create_custom_food, name='create-custom-food'),
-    path('foods/custom/list/', list_custom_foods, name='list-custom-foods'),
     path('foods/custom/<int:food_id>/', update_custom_food, name='update-custom-food'),
     path('foods/custom/<int:food_id>/delete/', delete_custom_food, name='delete-custom-food'),
     
     # 栄養サマリー
     path('nutrition/daily-summary/', daily_nutrition_summary, name='daily-nutrition-summary'),
 
+    # ダッシュボード
+    path('dashboard/', dashboard, name='dashboard'),
+
+    # オフライン同期
+    path('sync/', sync, name='sync'),
+
     # 食堂メニュー
     path('cafeteria/list/', list_cafeteria_menus, name='list-cafeteria'),
+    path('cafeteria/sites/', list_cafeterias, name='list-cafeterias'),
+    path('cafeteria/available/', available_cafeteria_menus, name='available-cafeteria-menus'),
 
     # OCR エンドポイント
     path('ocr/nutrition-label/', process_nutrition_label, name='ocr-nutrition-label'),
+    path('ocr/jobs/', async_views.submit_ocr_job, name='ocr-job-submit'),
+    path('ocr/jobs/<str:job_id>/', async_views.ocr_job_status, name='ocr-job-status'),
 
     # 本番環境用ヘルスチェック
     path('health/', health_check, name='health-check'),
-]
\ No newline at end of file
+
+    # 性能メトリクス（Prometheus形式）
+    path('metrics/', metrics, name='metrics'),
+]
+
+# ASGIで動かす場合（dishboard_project.asgi_urls）は、I/O待ちの長いエンドポイントを非同期Viewで処理する
+# 先に一致したパターンが使われるため、同じパスの同期Viewより前に置く
+asgi_urlpatterns = [
+    path('foods/search/', async_views.search_foods, name='search-foods'),
+    path('cafeteria/list/', async_views.list_cafeteria_menus, name='list-cafeteria'),
+    *urlpatterns,
+]
@@ -1,3 +1,4 @@
+import hmac
 import os
 import logging
 import tempfile
@@ -10,18 +11,31 @@ from rest_framework import status, viewsets, generics, permissions
 from rest_framework.decorators import api_view, action, permission_classes, parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import AllowAny
-from django.http import JsonResponse
+from rest_framework.authtoken.models import Token
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags
 from django.views.decorators.csrf import csrf_exempt
 
-from .models import MealRecord, WeightRecord, CustomFood, CafeteriaMenu, CustomMenu
+from .models import MealRecord, WeightRecord, CustomFood, Cafeteria, CafeteriaMenuHistory, CustomMenu
 from .serializers import (
-    MealRecordSerializer, MealRecordListSerializer, 
+    MealRecordSerializer, MealRecordListSerializer, MealRecordBulkSerializer,
     UserRegistrationSerializer, WeightRecordSerializer,
-    CustomFoodSerializer, CafeteriaMenuSerializer,
+    CustomFoodSerializer, CafeteriaSerializer, CafeteriaMenuHistorySerializer,
     CustomMenuSerializer, CustomMenuListSerializer
 )
 from .business_logic.nutrition_calculator import NutritionCalculatorService
-from .services import MealService, WeightService, CustomFoodService
+from .conditional import ConditionalGetMixin
+from . import performance
+from .db_pool import get_pool_stats
+from .responses import PreRenderedJSONResponse
+from .services import (
+    MealService, WeightService, CustomFoodService, DashboardService, SyncService,
+    CafeteriaMenuListService
+)
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +44,72 @@ logger = logging.getLogger(__name__)
 # OCR処理エンドポイント
 # =============================================================================
 
+# アップロード画像の上限サイズと許可する形式
+OCR_MAX_IMAGE_SIZE = 10 * 1024 * 1024
+OCR_ALLOWED_CONTENT_TYPES = ['image/jpeg', 'image/png', 'image/webp']
+
+
+def validate_ocr_image(files):
+    """
+    OCRのアップロード画像を検証
+    
+    Returns:
+        tuple: (画像ファイル, エラーメッセージ。問題なければNone)
+    """
+    if 'image' not in files:
+        logger.warning("画像ファイルが送信されていません")
+        return None, '画像ファイルが必要です'
+    
+    image_file = files['image']
+    if image_file.size > OCR_MAX_IMAGE_SIZE:
+        logger.warning("ファイルサイズが制限を超えています: %d bytes", image_file.size)
+        return image_file, 'ファイルサイズは10MB以下にしてください'
+    
+    if image_file.content_type not in OCR_ALLOWED_CONTENT_TYPES:
+        logger.warning("サポートされていないファイル形式: %s", image_file.content_type)
+        return image_file, 'サポートされている形式: JPEG, PNG, WebP'
+    
+    return image_file, None
+
+
+def ocr_debug_requested(request):
+    """
+    OCRの段階ごとの所要時間をレスポンスに含めるか
+    
+    デバッグモード、またはスタッフユーザーが ?debug=true を指定した場合に含める。
+    """
+    if os.getenv('DEBUG', 'False').lower() == 'true':
+        return True
+    return request.user.is_staff and request.GET.get('debug', '').lower() in ('1', 'true')
+
+
+def format_ocr_result(result):
+    """
+    OCR処理結果をAPIレスポンスの形式に変換
+    
+    抽出テキストは成功時はデバッグモードのみ。段階ごとの所要時間（timings）は
+    debug を指定して処理した場合のみ含まれる。
+    """
+    if result.get('success'):
+        response_data = {
+            'success': True,
+            'nutrition': result['nutrition'],
+            'validation': result.get('validation', {}),
+        }
+        if os.getenv('DEBUG', 'False').lower() == 'true':
+            response_data['detected_texts'] = result.get('detected_texts', [])
+    else:
+        response_data = {
+            'success': False,
+            'error': result.get('error', 'OCR処理に失敗しました'),
+            'nutrition': result.get('nutrition'),
+            'detected_texts': result.get('detected_texts', [])
+        }
+    if 'timings' in result:
+        response_data['timings'] = result['timings']
+    return response_data
+
+
 @api_view(['POST'])
 @parser_classes([MultiPartParser, FormParser])
 @permission_classes([permissions.IsAuthenticated])
@@ -50,38 +130,14 @@ def process_nutrition_label(request):
         
         image: 栄養成分表示の画像ファイル (JPEG/PNG)
     
+    スタッフユーザーは ?debug=true で段階ごとの所要時間（timings）を取得できる。
     """
-    logger.info("=== OCR処理開始（意味ブロックアプローチ）===")
-    logger.info(f"User: {request.user}")
-    logger.info(f"FILES: {list(request.FILES.keys())}")
-    
-    # 画像ファイルの検証
-    if 'image' not in request.FILES:
-        logger.warning("画像ファイルが送信されていません")
-        return Response(
-            {'error': '画像ファイルが必要です', 'success': False},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    logger.debug("OCR処理開始: user=%s files=%s", request.user.pk, list(request.FILES))
     
-    image_file = request.FILES['image']
-    
-    # ファイルサイズ制限（10MB）
-    max_size = 10 * 1024 * 1024
-    if image_file.size > max_size:
-        logger.warning(f"ファイルサイズが制限を超えています: {image_file.size} bytes")
-        return Response(
-            {'error': 'ファイルサイズは10MB以下にしてください', 'success': False},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    # MIMEタイプの検証
-    allowed_types = ['image/jpeg', 'image/png', 'image/webp']
-    if image_file.content_type not in allowed_types:
-        logger.warning(f"サポートされていないファイル形式: {image_file.content_type}")
-        return Response(
-            {'error': 'サポートされている形式: JPEG, PNG, WebP', 'success': False},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    # 画像ファイルの検証（10MB以下のJPEG/PNG/WebP）
+    image_file, error = validate_ocr_image(request.FILES)
+    if error:
+        return Response({'error': error, 'success': False}, status=status.HTTP_400_BAD_REQUEST)
     
     tmp_path = None
     
@@ -93,44 +149,24 @@ def process_nutrition_label(request):
                 tmp.write(chunk)
             tmp_path = tmp.name
         
-        logger.info(f"一時ファイル作成: {tmp_path}")
+        logger.debug("一時ファイル作成: %s", tmp_path)
         
         # OCRプロセッサをインスタンス化
         from .business_logic.ocr_processor import NutritionOCRProcessor
         processor = NutritionOCRProcessor(gpu=False)
         
         # OCR処理実行
-        result = processor.process_nutrition_label(tmp_path)
-        
-        logger.info(f"OCR処理完了: success={result.get('success')}")
+        result = processor.process_nutrition_label(tmp_path, debug=ocr_debug_requested(request))
         
+        # 処理時間は NutritionOCRProcessor が1行でログに出す
         if result.get('success'):
-            logger.info(f"抽出された栄養成分: {result.get('nutrition')}")
-            
-            # デバッグモードでのみ追加情報を返す
-            debug_mode = os.getenv('DEBUG', 'False').lower() == 'true'
-            
-            response_data = {
-                'success': True,
-                'nutrition': result['nutrition'],
-                'validation': result.get('validation', {}),
-            }
-            
-            if debug_mode:
-                response_data['detected_texts'] = result.get('detected_texts', [])
-            
-            return Response(response_data, status=status.HTTP_200_OK)
+            logger.debug("抽出された栄養成分: %s", result.get('nutrition'))
         else:
-            logger.warning(f"OCR処理失敗: {result.get('error')}")
-            return Response({
-                'success': False,
-                'error': result.get('error', 'OCR処理に失敗しました'),
-                'nutrition': result.get('nutrition'),
-                'detected_texts': result.get('detected_texts', [])
-            }, status=status.HTTP_200_OK)
+            logger.warning("OCR処理失敗: %s", result.get('error'))
+        return Response(format_ocr_result(result), status=status.HTTP_200_OK)
     
     except ImportError as e:
-        logger.error(f"OCRライブラリのインポートエラー: {str(e)}")
+        logger.error("OCRライブラリのインポートエラー: %s", e)
         return Response(
             {
                 'error': 'OCR機能が利用できません。システム管理者に連絡してください。',
@@ -151,16 +187,16 @@ def process_nutrition_label(request):
         if tmp_path and os.path.exists(tmp_path):
             try:
                 os.unlink(tmp_path)
-                logger.info(f"一時ファイル削除: {tmp_path}")
+                logger.debug("一時ファイル削除: %s", tmp_path)
             except Exception as e:
-                logger.warning(f"一時ファイル削除失敗: {str(e)}")
+                logger.warning("一時ファイル削除失敗: %s", e)
 
 
 # =============================================================================
 # ViewSets
 # =============================================================================
 
-class MealRecordViewSet(viewsets.ModelViewSet):
+class MealRecordViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """食事記録のCRUD操作を提供するViewSet"""
     permission_classes = [permissions.IsAuthenticated]
     
@@ -177,9 +213,43 @@ class MealRecordViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        食事記録を一括で作成・更新
+        
+        Request:
+            POST /api/meal-records/bulk/
+            [{"meal_name": ..., "items": [...]}, {"id": 12, "meal_name": ...}, ...]
+        
+        idを含む要素は更新、含まない要素は新規作成。全件を検証してから
+        1トランザクションで書き込み、入力と同じ順序のidを返す。
+        1件以上作成した場合は201、更新のみの場合は200。
+        """
+        serializer = MealRecordBulkSerializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=MealRecordBulkSerializer.MAX_BULK_SIZE,
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            meals = MealService.bulk_save_meals(request.user, serializer.validated_data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        
+        created = sum(1 for meal_data in serializer.validated_data if 'id' not in meal_data)
+        return Response({
+            'ids': [meal.id for meal in meals],
+            'created': created,
+            'updated': len(serializer.validated_data) - created,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
 
-class WeightRecordViewSet(viewsets.ModelViewSet):
+class WeightRecordViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """体重記録のCRUD操作を提供するViewSet"""
     serializer_class = WeightRecordSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -206,7 +276,7 @@ class WeightRecordViewSet(viewsets.ModelViewSet):
         return Response(response_serializer.data, status=status_code)
 
 
-class CustomFoodViewSet(viewsets.ModelViewSet):
+class CustomFoodViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """MyアイテムのCRUD操作を提供するViewSet"""
     serializer_class = CustomFoodSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -237,7 +307,7 @@ class CustomFoodViewSet(viewsets.ModelViewSet):
             return Response({'error': str(e)}, status=400)
 
 
-class CustomMenuViewSet(viewsets.ModelViewSet):
+class CustomMenuViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """MyメニューのCRUD操作を提供するViewSet"""
     permission_classes = [permissions.IsAuthenticated]
     
@@ -305,6 +375,19 @@ class UserRegistrationView(generics.CreateAPIView):
     permission_classes = [permissions.AllowAny]
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def logout(request):
+    """
+    ログアウト
+    
+    ユーザーのトークンを削除する。認証キャッシュはトークン削除時のシグナルで破棄され、
+    以降同じトークンでのリクエストは401になる。
+    """
+    Token.objects.filter(user=request.user).delete()
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 # =============================================================================
 # API Functions - 食品検索・栄養計算
 # =============================================================================
@@ -372,6 +455,89 @@ def daily_nutrition_summary(request):
     return Response({'date': target_date, 'nutrition_summary': summary})
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def dashboard(request):
+    """
+    ダッシュボードの初期表示データを一括取得
+    
+    指定日の食事記録（アイテム付き）、日次サマリー、直近の体重記録、
+    7日間のカロリー推移を1レスポンスで返す。
+    
+    Request:
+        GET /api/dashboard/?date=YYYY-MM-DD&weight_days=90
+    """
+    target_date_str = request.GET.get('date')
+    if target_date_str:
+        try:
+            target_date = date.fromisoformat(target_date_str)
+        except ValueError:
+            return Response({'error': '日付形式が正しくありません'}, status=400)
+    else:
+        target_date = date.today()
+    
+    try:
+        weight_days = int(request.GET.get('weight_days', DashboardService.WEIGHT_DAYS))
+    except ValueError:
+        return Response({'error': 'weight_daysは整数で指定してください'}, status=400)
+    if not 0 < weight_days <= DashboardService.MAX_WEIGHT_DAYS:
+        return Response(
+            {'error': f'weight_daysは1〜{DashboardService.MAX_WEIGHT_DAYS}の整数で指定してください'}, status=400
+        )
+    
+    try:
+        data = DashboardService.build_dashboard(request.user, target_date, weight_days)
+    except OverflowError:
+        # 0001-01-01 付近の日付では期間の開始日が表せない
+        return Response({'error': '日付が範囲外です'}, status=400)
+    return Response({
+        'date': data['date'],
+        'meals': MealRecordSerializer(data['meals'], many=True).data,
+        'nutrition_summary': data['nutrition_summary'],
+        'weights': WeightRecordSerializer(data['weights'], many=True).data,
+        'calorie_series': data['calorie_series'],
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def sync(request):
+    """
+    オフライン対応クライアント向けの差分同期
+    
+    前回レスポンスのwatermarkをsinceに指定すると、それ以降に作成・更新された
+    データと、削除されたデータのID（deleted）のみを返す。
+    sinceを省略すると全件を返す（full: true）。
+    
+    Request:
+        GET /api/sync/?since=2025-01-01T00:00:00%2B09:00
+    """
+    since = None
+    since_str = request.GET.get('since')
+    if since_str:
+        # URLエンコードされていない '+' は空白として届くため復元する
+        try:
+            since = parse_datetime(since_str.replace(' ', '+'))
+        except ValueError:
+            # 形式は正しいが存在しない日時（2月30日など）
+            since = None
+        if since is None:
+            return Response({'error': '日時形式が正しくありません'}, status=400)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+    
+    changes = SyncService.get_changes(request.user, since)
+    return Response({
+        'watermark': changes['watermark'],
+        'full': changes['full'],
+        'meal_records': MealRecordSerializer(changes['meal_records'], many=True).data,
+        'weight_records': WeightRecordSerializer(changes['weight_records'], many=True).data,
+        'custom_foods': CustomFoodSerializer(changes['custom_foods'], many=True).data,
+        'custom_menus': CustomMenuSerializer(changes['custom_menus'], many=True).data,
+        'deleted': changes['deleted'],
+    })
+
+
 # =============================================================================
 # API Functions - カスタム食品
 # =============================================================================
@@ -436,14 +602,70 @@ def delete_custom_food(request, food_id):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
-def list_cafeteria_menus(request):
-    """食堂メニュー一覧を取得"""
+def list_cafeterias(request):
+    """更新対象の食堂一覧を取得"""
+    serializer = CafeteriaSerializer(Cafeteria.objects.filter(is_active=True), many=True)
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def available_cafeteria_menus(request):
+    """
+    指定日に提供されていた食堂メニューを提供履歴から取得
+    
+    Request:
+        GET /api/cafeteria/available/?date=YYYY-MM-DD&cafeteria=<食堂ID>&category=<カテゴリー>
+    """
+    target_date_str = request.GET.get('date')
+    if target_date_str:
+        try:
+            target_date = date.fromisoformat(target_date_str)
+        except ValueError:
+            return Response({'error': '日付形式が正しくありません'}, status=400)
+    else:
+        target_date = timezone.localdate()
+    
+    cafeteria = request.GET.get('cafeteria')
+    if cafeteria and not cafeteria.isdigit():
+        return Response({'error': 'cafeteria は食堂IDで指定してください'}, status=400)
+    
+    history = CafeteriaMenuHistory.available_on(target_date, int(cafeteria) if cafeteria else None)
     category = request.GET.get('category')
-    menus = CafeteriaMenu.objects.all()
     if category:
-        menus = menus.filter(category=category)
-    serializer = CafeteriaMenuSerializer(menus, many=True)
-    return Response(serializer.data)
+        history = history.filter(category=category)
+    
+    serializer = CafeteriaMenuHistorySerializer(history.order_by('category', 'name'), many=True)
+    return Response({'date': target_date, 'menus': serializer.data})
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def list_cafeteria_menus(request):
+    """
+    食堂メニュー一覧を取得
+    
+    一覧はスクレイピング時にしか変わらないため、キャッシュ済みのエンコード済みJSONを返す。
+    ETagが一致する場合は304を返す。
+    """
+    category = request.GET.get('category') or None
+    cafeteria = request.GET.get('cafeteria')
+    cafeteria_id = None
+    if cafeteria:
+        if not cafeteria.isdigit():
+            return Response({'error': 'cafeteria は食堂IDで指定してください'}, status=status.HTTP_400_BAD_REQUEST)
+        cafeteria_id = int(cafeteria)
+    
+    payload = CafeteriaMenuListService.get_payload(cafeteria_id, category)
+    
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and payload['etag'] in parse_etags(if_none_match):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = PreRenderedJSONResponse(payload['body'])
+    response['ETag'] = payload['etag']
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 # =============================================================================
@@ -454,5 +676,52 @@ def list_cafeteria_menus(request):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def health_check(request):
-    """本番環境用ヘルスチェックエンドポイント"""
-    return JsonResponse({'status': 'healthy', 'service': 'kilogram-api'})
\ No newline at end of file
+    """
+    本番環境用ヘルスチェックエンドポイント
+
+    スタッフユーザーには、応答したプロセスのコネクションプールの統計
+    （接続数・接続待ちの回数と時間）も返す。
+    """
+    data = {'status': 'healthy', 'service': 'kilogram-api'}
+    if request.user.is_staff:
+        data['database'] = {'pool': get_pool_stats()}
+    return JsonResponse(data)
+
+
+# =============================================================================
+# 性能メトリクス
+# =============================================================================
+
+# Prometheusに出力するコネクションプールの値
+POOL_GAUGES = {
+    'pool_size': '接続数',
+    'pool_available': '空いている接続数',
+    'requests_waiting': '接続を待っているリクエスト数',
+    'requests_queued': '接続を待ったリクエストの累計',
+    'requests_wait_ms': '接続を待った時間の累計（ミリ秒）',
+}
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def metrics(request):
+    """
+    View名ごとの性能メトリクス（Prometheusのテキスト形式）
+
+    全ワーカーの累計を worker ラベル付きで出力する（各ワーカーが共有キャッシュに保存した値。
+    他のワーカーの値は最大 PUBLISH_INTERVAL 秒前のもの）。DBプールのゲージは応答したプロセスの値。
+    METRICS_TOKEN を Authorization: Bearer で渡すか、スタッフユーザーで認証した場合のみ取得できる。
+    """
+    auth = request.META.get('HTTP_AUTHORIZATION', '')
+    token_ok = bool(settings.METRICS_TOKEN) and hmac.compare_digest(auth, f'Bearer {settings.METRICS_TOKEN}')
+    if not (token_ok or request.user.is_staff):
+        return Response({'error': '権限がありません'}, status=status.HTTP_403_FORBIDDEN)
+
+    gauges = {}
+    pool_stats = get_pool_stats()
+    if pool_stats is not None:
+        gauges = {f'db_{key}': (label, pool_stats[key]) for key, label in POOL_GAUGES.items()}
+    return HttpResponse(
+        performance.registry.render_prometheus(gauges=gauges, snapshots=performance.registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
\ No newline at end of file